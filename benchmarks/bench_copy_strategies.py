@@ -0,0 +1,68 @@
+"""
+Compare the copy strategies of the copy engine on one filesystem.
+
+    python benchmarks/bench_copy_strategies.py --dir /dev/shm   # tmpfs
+    python benchmarks/bench_copy_strategies.py --dir /var/tmp   # ext4
+
+Every strategy is forced in turn on the same set of shortcuts; "auto" shows
+what the engine picks on its own. Strategies the filesystem does not support
+are reported as such instead of timed.
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from taskbar_saver.copy_engine import CopyEngine, STRATEGIES  # noqa: E402
+
+TEMPLATE = Path(__file__).resolve().parent.parent / "taskbar_backup" / "CCleaner 7.lnk"
+
+
+def make_shortcuts(folder, count, size):
+    data = TEMPLATE.read_bytes()
+    data = (data * (size // len(data) + 1))[:size] if size else data
+    folder.mkdir(parents=True, exist_ok=True)
+    for i in range(count):
+        (folder / f"App {i:06d}.lnk").write_bytes(data)
+
+
+def run(base, count, size, workers):
+    with tempfile.TemporaryDirectory(dir=base) as tmp:
+        tmp = Path(tmp)
+        src = tmp / "src"
+        make_shortcuts(src, count, size)
+        sources = sorted(src.glob("*.lnk"))
+        print(f"{count} files of {sources[0].stat().st_size} bytes in {base}")
+
+        for strategy in STRATEGIES + ("auto",):
+            out = tmp / f"out_{strategy}"
+            out.mkdir()
+            engine = CopyEngine(workers=workers, strategy=strategy)
+            immutable = strategy in ("hardlink", "auto")
+            start = time.perf_counter()
+            report = engine.copy_many([(p, out / p.name) for p in sources], immutable=immutable)
+            elapsed = time.perf_counter() - start
+            engine.shutdown()
+            if not report.ok:
+                print(f"{strategy:>16}: unsupported ({report.errors[0][1]})")
+                continue
+            print(f"{strategy:>16}: {elapsed:8.3f}s  ({count / elapsed:9.0f} files/s)"
+                  f"  used: {report.strategy_summary()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dir", default=None, help="filesystem to test (default: system temp)")
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=0,
+                        help="bytes per file (default: size of the template shortcut)")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    run(args.dir, args.count, args.size, args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Throughput and fuzzing for the .lnk parser.
+
+    python benchmarks/bench_lnk.py                 # parses per second
+    python benchmarks/bench_lnk.py --fuzz 50000    # random mutations
+
+The fuzz mode flips, truncates, inserts and overwrites bytes of the template
+shortcut and of synthetic variants. Any exception other than LnkError fails
+the run (exit code 1) and prints the reproducing seed. An empty and a
+truncated file also go through parse_file(), read and memory-mapped.
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from taskbar_saver import lnk  # noqa: E402
+
+TEMPLATE = Path(__file__).resolve().parent.parent / "taskbar_backup" / "CCleaner 7.lnk"
+
+
+def variants():
+    data = TEMPLATE.read_bytes()
+    yield "template", data
+    # Same link without ExtraData: the header flags stay, the blocks are cut
+    extra = data.find(b"\x14\x03\x00\x00\x07\x00\x00\xa0")
+    if extra > 0:
+        yield "no-extra-data", data[:extra] + b"\0\0\0\0"
+    # Force the LinkInfo to be ignored
+    flags = int.from_bytes(data[20:24], "little") | lnk.FORCE_NO_LINK_INFO
+    yield "force-no-link-info", data[:20] + flags.to_bytes(4, "little") + data[24:]
+
+
+def bench(seconds):
+    for label, data in variants():
+        link = lnk.parse(data)
+        count = 0
+        start = time.perf_counter()
+        deadline = start + seconds
+        mv = memoryview(data)
+        while time.perf_counter() < deadline:
+            for _ in range(200):
+                lnk.parse(mv)
+            count += 200
+        elapsed = time.perf_counter() - start
+        print(f"{label:>20}: {count / elapsed:10.0f} parses/s  target={link.target!r}")
+
+
+def mutate(rng, data):
+    data = bytearray(data)
+    for _ in range(rng.randint(1, 8)):
+        op = rng.random()
+        pos = rng.randrange(len(data)) if data else 0
+        if op < 0.4 and data:
+            data[pos] = rng.randrange(256)
+        elif op < 0.55:
+            del data[pos:]
+        elif op < 0.7:
+            data[pos:pos] = bytes(rng.randrange(256) for _ in range(rng.randint(1, 16)))
+        elif op < 0.85 and len(data) >= pos + 4:
+            # Offsets and sizes are u16/u32: write extreme values into them
+            data[pos:pos + 4] = rng.choice([b"\xff\xff\xff\xff", b"\0\0\0\0", b"\x4c\0\0\0"])
+        elif data:
+            del data[pos:pos + rng.randint(1, 32)]
+    return bytes(data)
+
+
+def fuzz(iterations, seed):
+    bases = [data for _, data in variants()]
+    errors = ok = 0
+    for i in range(iterations):
+        rng = random.Random(seed + i)
+        data = mutate(rng, rng.choice(bases))
+        try:
+            link = lnk.parse(data)
+            link.target
+            ok += 1
+        except lnk.LnkError:
+            errors += 1
+        except Exception as e:
+            print(f"FAIL seed={seed + i}: {type(e).__name__}: {e}")
+            return 1
+    print(f"fuzz: {iterations} inputs, {ok} parsed, {errors} rejected with LnkError")
+    return fuzz_files()
+
+
+def fuzz_files():
+    data = TEMPLATE.read_bytes()
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, content in (("empty", b""), ("truncated", data[:40])):
+            path = Path(tmp) / f"{label}.lnk"
+            path.write_bytes(content)
+            for use_mmap in (False, True):
+                try:
+                    lnk.parse_file(path, use_mmap=use_mmap)
+                except lnk.LnkError:
+                    continue
+                except Exception as e:
+                    print(f"FAIL {label} file (use_mmap={use_mmap}): {type(e).__name__}: {e}")
+                    return 1
+                print(f"FAIL {label} file (use_mmap={use_mmap}) parsed")
+                return 1
+    print("files: empty and truncated rejected with LnkError, read and mapped")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=1.0, help="time per variant")
+    parser.add_argument("--fuzz", type=int, default=0, help="number of fuzz inputs")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.fuzz:
+        return fuzz(args.fuzz, args.seed)
+    bench(args.seconds)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Round-trip check and throughput for the .lnk writer.
+
+    python benchmarks/bench_lnk_writer.py                    # write speed
+    python benchmarks/bench_lnk_writer.py --roundtrip 20000  # parse(build(x)) == x
+
+The round-trip mode builds random but consistent metadata (local and network
+targets, non-ANSI names, environment and known-folder blocks), writes it with
+lnk_writer.build() and parses it back. Any field in ROUNDTRIP_FIELDS that
+comes back different fails the run (exit code 1) and prints the seed. The
+template shortcut is always checked first.
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from taskbar_saver.lnk import ShellLink, parse_file  # noqa: E402
+from taskbar_saver.lnk_writer import (DRIVE_TYPE_CODES, build, roundtrip_errors,  # noqa: E402
+                                      to_record, write_many)
+
+TEMPLATE = Path(__file__).resolve().parent.parent / "taskbar_backup" / "CCleaner 7.lnk"
+CHARS = "abcdefghijklmnopqrstuvwxyz ABCXYZ0123456789-_.()éüß中文😀"
+
+
+def word(rng, lo=1, hi=16):
+    text = "".join(rng.choice(CHARS) for _ in range(rng.randint(lo, hi))).strip(" .")
+    return text or "x"
+
+
+def maybe(rng, value):
+    return value if rng.random() < 0.6 else None
+
+
+def random_link(rng):
+    link = ShellLink()
+    link.flags = rng.choice([0, 0x2000, 0x80000])  # RunAsUser, EnableTargetMetadata
+    link.file_attributes = rng.choice([0x20, 0x80, 0x10, 0x21])
+    link.creation_time = rng.getrandbits(63)
+    link.access_time = rng.getrandbits(63)
+    link.write_time = rng.getrandbits(63)
+    link.file_size = rng.getrandbits(32)
+    link.icon_index = rng.randint(-2**31, 2**31 - 1)
+    link.show_command = rng.choice([1, 3, 7])
+    link.hotkey = rng.getrandbits(16)
+
+    if rng.random() < 0.8:
+        drive = rng.choice("CDEZ") + ":"
+        parts = [word(rng) for _ in range(rng.randint(0, 5))] + [word(rng) + ".exe"]
+        path = "\\".join([drive] + parts)
+        link.local_base_path = path
+        link.id_list_path = path
+        link.drive_type = rng.choice(list(DRIVE_TYPE_CODES))
+        link.drive_serial = f"{rng.getrandbits(32):08X}"
+        link.volume_label = maybe(rng, word(rng))
+        if len(parts) > 1 and rng.random() < 0.5:
+            link.known_folder_path = "\\".join([drive] + parts[:rng.randint(1, len(parts) - 1)])
+            link.known_folder_id = str(uuid.UUID(int=rng.getrandbits(128)))
+            link.special_folder_id = maybe(rng, rng.randint(0, 60))
+    else:
+        link.net_name = f"\\\\{word(rng)}\\{word(rng)}"
+        link.device_name = maybe(rng, rng.choice("XYZ") + ":")
+        link.common_path_suffix = maybe(rng, f"{word(rng)}\\{word(rng)}.exe")
+
+    link.name = maybe(rng, word(rng, 0, 40))
+    link.relative_path = maybe(rng, f"..\\{word(rng)}.exe")
+    link.working_dir = maybe(rng, f"C:\\{word(rng)}")
+    link.arguments = maybe(rng, word(rng, 0, 60))
+    link.icon_location = maybe(rng, f"%SystemRoot%\\{word(rng)}.dll")
+    link.env_target = maybe(rng, f"%ProgramFiles%\\{word(rng)}\\{word(rng)}.exe")
+    link.icon_env_target = maybe(rng, f"%ProgramFiles%\\{word(rng)}.exe")
+    return link
+
+
+def roundtrip(iterations, seed):
+    errors = roundtrip_errors(parse_file(TEMPLATE))
+    if errors:
+        print(f"FAIL template: {errors}")
+        return 1
+    for i in range(iterations):
+        link = random_link(random.Random(seed + i))
+        errors = roundtrip_errors(link)
+        if errors:
+            print(f"FAIL seed={seed + i}:")
+            for field, wrote, read in errors:
+                print(f"  {field}: wrote {wrote!r}, read {read!r}")
+            return 1
+    print(f"roundtrip: template + {iterations} random shortcuts, all fields preserved")
+    return 0
+
+
+def bench(count):
+    template = parse_file(TEMPLATE)
+    start = time.perf_counter()
+    for _ in range(count):
+        build(template)
+    elapsed = time.perf_counter() - start
+    print(f"build:      {count / elapsed:10.0f} shortcuts/s")
+
+    records = {f"App {i:06d}.lnk": to_record(template) for i in range(count)}
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        written, errors = write_many(records, tmp)
+        elapsed = time.perf_counter() - start
+    print(f"write_many: {len(written) / elapsed:10.0f} shortcuts/s ({len(errors)} errors)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=5000, help="shortcuts to write")
+    parser.add_argument("--roundtrip", type=int, default=0, help="random shortcuts to round-trip")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.roundtrip:
+        return roundtrip(args.roundtrip, args.seed)
+    bench(args.count)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+Memory and latency of the copy pipeline on a very large pinned folder.
+
+    python benchmarks/bench_pipeline.py                 # 100k pins
+    python benchmarks/bench_pipeline.py --pins 10000
+
+For the first backup (mirror + snapshot) and a restore of the snapshot into
+an empty folder, reports the wall time and the time until the first file
+copy started, then runs both again under tracemalloc for the peak of Python
+allocations (tracing slows the run down too much to time it).
+"""
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from bench_suite import make_tree  # noqa: E402
+from taskbar_saver import core  # noqa: E402
+from taskbar_saver.copy_engine import CopyEngine, get_engine  # noqa: E402
+
+FIRST_COPY = []
+
+
+def _watch_copies():
+    real = CopyEngine.copy_file
+
+    def copy_file(self, *args, **kwargs):
+        if not FIRST_COPY:
+            FIRST_COPY.append(time.perf_counter())
+        return real(self, *args, **kwargs)
+    CopyEngine.copy_file = copy_file
+
+
+def measure(label, func):
+    FIRST_COPY.clear()
+    start = time.perf_counter()
+    func(0)
+    elapsed = time.perf_counter() - start
+    first = (FIRST_COPY[0] - start) if FIRST_COPY else float("nan")
+
+    tracemalloc.start()
+    func(1)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<10}{elapsed:9.2f} s   first copy after {first * 1000:9.1f} ms"
+          f"   peak {peak / 2**20:8.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pins", type=int, default=100_000)
+    args = parser.parse_args()
+
+    _watch_copies()
+    print(f"{args.pins} pins:")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        src = tmp / "pins"
+        make_tree(src, args.pins)
+        measure("backup", lambda run: core.backup(src, tmp / f"backup{run}"))
+        measure("restore", lambda run: core.restore(tmp / "backup0", tmp / f"restored{run}"))
+    get_engine().shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""
+Encode time against file size for every screenshot codec and level.
+
+    python benchmarks/bench_screenshot.py                       # synthetic 3840x2160 desktop
+    python benchmarks/bench_screenshot.py --size 7680x2160      # two 4K monitors
+    python benchmarks/bench_screenshot.py --image shot.png      # a real screenshot
+    python benchmarks/bench_screenshot.py --phash               # duplicate check instead
+
+The synthetic desktop has what real ones have: flat window chrome, text,
+gradients and a photo-like noisy area, so the codecs rank the same way.
+Each option is encoded with screenshots.encode() to a temporary file; the
+best of --repeat runs is reported. Needs Pillow.
+
+--phash times phash.fingerprint() and prints the Hamming distance of the
+frame to edited copies of itself: the ones that should count as the same
+screenshot must stay within phash.DEFAULT_DISTANCE, the others above it.
+It then pastes the bench_taskbar_check taskbars onto the desktop and looks
+each one up in a ScreenshotIndex holding the original, with its taskbar
+strip: a changed pin must not be taken for a duplicate, though the hash
+alone hardly moves. Needs NumPy as well.
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from PIL import Image, ImageDraw, ImageFilter  # noqa: E402
+
+from bench_taskbar_check import fixtures  # noqa: E402
+from taskbar_saver import phash  # noqa: E402
+from taskbar_saver.screenshots import EncodeOptions, encode  # noqa: E402
+from taskbar_saver.taskbar_check import TaskbarReference, crop_taskbar  # noqa: E402
+
+TASKBAR_HEIGHT = 48  # of synthetic_desktop()
+
+OPTIONS = [
+    "png:0", "png:1", "png:3", "png:6", "png:9", "png:9:optimize",
+    "webp:0", "webp:2", "webp:4", "webp:6",
+    "jpeg:75", "jpeg:90", "jpeg:95", "jpeg:95:optimize",
+]
+
+
+def synthetic_desktop(width, height, seed=0):
+    rng = random.Random(seed)
+    img = Image.new("RGB", (width, height))
+    draw = ImageDraw.Draw(img)
+    # Wallpaper gradient
+    for y in range(height):
+        shade = 40 + 120 * y // height
+        draw.line([(0, y), (width, y)], fill=(shade // 2, shade // 2 + 20, shade + 40))
+    # Photo-like area (noise over a gradient) in one corner
+    pw, ph = width // 4, height // 3
+    photo = Image.frombytes("RGB", (pw, ph), rng.randbytes(pw * ph * 3))
+    img.paste(Image.blend(photo, img.crop((0, 0, pw, ph)), 0.6), (width - pw - 40, 60))
+    # Windows with title bars and lines of "text"
+    for _ in range(6):
+        x, y = rng.randrange(0, width // 2), rng.randrange(0, height // 2)
+        w, h = rng.randrange(width // 5, width // 2), rng.randrange(height // 5, height // 2)
+        draw.rectangle([x, y, x + w, y + h], fill=(250, 250, 250), outline=(120, 120, 120))
+        draw.rectangle([x, y, x + w, y + 30], fill=(rng.randrange(256), 90, 160))
+        for line in range(y + 45, y + h - 10, 18):
+            words = x + 10
+            while words < x + w - 60:
+                length = rng.randrange(15, 60)
+                draw.rectangle([words, line, words + length, line + 9], fill=(30, 30, 30))
+                words += length + 8
+    # Taskbar
+    draw.rectangle([0, height - 48, width, height], fill=(32, 32, 32))
+    for i in range(12):
+        draw.rectangle([60 + i * 56, height - 40, 92 + i * 56, height - 8],
+                       fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    return img
+
+
+def _variants(img):
+    """(label, frame, should look the same) edits of a desktop frame."""
+    w, h = img.size
+    clock = img.copy()
+    ImageDraw.Draw(clock).rectangle([w - 120, h - 40, w - 20, h - 8], fill=(200, 200, 200))
+    window = img.copy()
+    ImageDraw.Draw(window).rectangle([w // 3, h // 4, w * 5 // 6, h * 3 // 4], fill=(250, 250, 250))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "lossy.jpg"
+        encode(img, path, EncodeOptions("jpeg", 60))
+        with Image.open(path) as f:
+            lossy = f.convert("RGB")
+    scaled = img.resize((w // 2, h // 2)).filter(ImageFilter.GaussianBlur(1))
+    return [
+        ("clock changed", clock, True),
+        ("jpeg quality 60", lossy, True),
+        ("half size, blurred", scaled, True),
+        ("window opened", window, False),
+        ("other desktop", synthetic_desktop(w, h, seed=1), False),
+    ]
+
+
+def check_phash(img, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fp = phash.fingerprint(img)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"fingerprint {fp:016x} in {best * 1000:.1f} ms")
+    failed = 0
+    for label, other, same in _variants(img):
+        d = phash.distance(fp, phash.fingerprint(other))
+        ok = (d <= phash.DEFAULT_DISTANCE) == same
+        failed += not ok
+        print(f"{label:<20}{d:4d} bits  {'same' if same else 'different':<10}{'ok' if ok else 'FAIL'}")
+    failed += check_taskbar_edits(img)
+    return 1 if failed else 0
+
+
+def check_taskbar_edits(img):
+    """Desktop screenshots that differ only in the taskbar, through ScreenshotIndex.find()."""
+    w, h = img.size
+    base, cases = fixtures(w, TASKBAR_HEIGHT, 14)
+
+    def desktop(strip):
+        frame = img.copy()
+        frame.paste(strip, (0, h - TASKBAR_HEIGHT))
+        return frame
+
+    original = desktop(base)
+    print("\ntaskbar edits (hash distance, then index lookup with the strip):")
+    failed = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        shot = Path(tmp) / "original.png"
+        shot.touch()
+        index = phash.ScreenshotIndex(Path(tmp) / phash.INDEX_NAME)
+        fp = phash.fingerprint(original)
+        index.add(fp, shot, taskbar=TaskbarReference.from_image(crop_taskbar(original)))
+        for label, strip, same in cases:
+            frame = desktop(strip)
+            other = phash.fingerprint(frame)
+            found = index.find(other, taskbar=crop_taskbar(frame)) is not None
+            ok = found == same
+            failed += not ok
+            print(f"{label:<20}{phash.distance(fp, other):4d} bits  "
+                  f"{'duplicate' if found else 'kept':<10}{'ok' if ok else 'FAIL'}")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", default="3840x2160", help="synthetic desktop WIDTHxHEIGHT")
+    parser.add_argument("--image", type=Path, help="encode this image instead")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--options", default=",".join(OPTIONS),
+                        help="comma separated codec[:level[:optimize]] list")
+    parser.add_argument("--phash", action="store_true",
+                        help="time the perceptual hash and check its distances")
+    args = parser.parse_args()
+
+    if args.image:
+        img = Image.open(args.image)
+        img.load()
+    else:
+        width, height = (int(v) for v in args.size.lower().split("x"))
+        img = synthetic_desktop(width, height)
+    if args.phash:
+        return check_phash(img.convert("RGB"), args.repeat)
+    raw = img.width * img.height * len(img.getbands())
+    print(f"{img.width}x{img.height} {img.mode}, raw frame {raw / 2**20:.1f} MB")
+    print(f"{'option':<18}{'encode':>10}{'size':>12}{'of raw':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for text in args.options.split(","):
+            options = EncodeOptions.parse(text)
+            path = Path(tmp) / f"shot{options.extension}"
+            best = None
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                size = encode(img, path, options)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            print(f"{str(options):<18}{best * 1000:8.0f} ms{size / 2**20:9.2f} MB{size / raw:9.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""
+End-to-end benchmark suite with a stored baseline.
+
+    python benchmarks/bench_suite.py                      # run and compare
+    python benchmarks/bench_suite.py --sizes 10,1000      # quicker run
+    python benchmarks/bench_suite.py --update-baseline    # accept new numbers
+
+Builds synthetic pinned-shortcut folders (copies of taskbar_backup/CCleaner 7.lnk
+pointing at distinct targets, with some "(n).lnk" duplicates mixed in) and
+times:
+
+    backup            first backup into an empty folder (mirror + snapshot)
+    backup_nochange   the same backup again, nothing changed
+    restore           restore of the latest snapshot into an empty folder
+    dedupe            find_duplicates() over the folder (parse + target index)
+    dedupe_cached     the same with a warm LnkCache loaded from disk
+    import_core       python -c "import taskbar_saver.core" (fresh process)
+
+Results are written to benchmarks/results.json and compared with
+benchmarks/baseline.json. A metric slower than baseline * (1 + tolerance)
+is reported as a regression and makes the script exit with 1.
+
+A change that makes something faster or slower on purpose re-records the
+baseline (--update-baseline, at all sizes) in the same commit, so every
+commit is compared with numbers from its own code. backup and restore
+create thousands of files, so they swing with the state of the disk: right
+after a 100k run, leave it a few minutes before comparing.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from taskbar_saver import core  # noqa: E402
+from taskbar_saver.copy_engine import get_engine  # noqa: E402
+from taskbar_saver.dedupe import find_duplicates  # noqa: E402
+from taskbar_saver.lnk_cache import cache_for  # noqa: E402
+
+TEMPLATE = ROOT / "taskbar_backup" / "CCleaner 7.lnk"
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+RESULTS = Path(__file__).resolve().parent / "results.json"
+
+DEFAULT_SIZES = (10, 1000, 100000)
+DUPLICATE_EVERY = 20  # one "App (2).lnk" style name per 20 shortcuts
+
+
+def variant(data, i):
+    # Same-length swap of the "CCleaner 7" folder keeps every offset valid
+    folder = f"App{i:07d}"
+    return (data.replace(b"CCleaner 7", folder.encode("ascii"))
+                .replace("CCleaner 7".encode("utf-16-le"), folder.encode("utf-16-le")))
+
+
+def make_tree(folder, count):
+    data = TEMPLATE.read_bytes()
+    folder.mkdir(parents=True, exist_ok=True)
+    for i in range(count):
+        if i % DUPLICATE_EVERY == DUPLICATE_EVERY - 1:
+            # A second pin to the previous shortcut's target
+            (folder / f"App {i - 1:06d} (2).lnk").write_bytes(variant(data, i - 1))
+        else:
+            (folder / f"App {i:06d}.lnk").write_bytes(variant(data, i))
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def best_of(repeat, setup, func):
+    times = []
+    for _ in range(repeat):
+        state = setup()
+        times.append(timed(lambda: func(state)))
+    return min(times)
+
+
+def bench_size(count, repeat):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        src = tmp / "pins"
+        make_tree(src, count)
+
+        runs = iter(range(1_000_000))
+
+        def fresh_backup():
+            return tmp / f"backup_{next(runs)}"
+
+        results["backup"] = best_of(repeat, fresh_backup,
+                                    lambda dst: core.backup(src, dst))
+
+        warm = tmp / "backup_warm"
+        core.backup(src, warm)
+        results["backup_nochange"] = best_of(repeat, lambda: warm,
+                                             lambda dst: core.backup(src, dst))
+
+        results["restore"] = best_of(repeat, lambda: tmp / f"restore_{next(runs)}",
+                                     lambda dst: core.restore(warm, dst))
+
+        results["dedupe"] = best_of(repeat, lambda: src, find_duplicates)
+        # The warm backup already filled its cache; loading it is part of the cost
+        results["dedupe_cached"] = best_of(
+            repeat, lambda: None,
+            lambda _: find_duplicates(src, cache=cache_for(warm)))
+    return results
+
+
+def bench_import(repeat):
+    cmd = [sys.executable, "-c", "import taskbar_saver.core"]
+    return best_of(repeat, lambda: None,
+                   lambda _: subprocess.run(cmd, cwd=ROOT, check=True))
+
+
+def run(sizes):
+    metrics = {}
+    for count in sizes:
+        repeat = 3 if count <= 1000 else 1
+        print(f"-- {count} shortcuts")
+        for name, seconds in bench_size(count, repeat).items():
+            key = f"{name}[{count}]"
+            metrics[key] = seconds
+            print(f"  {key:<28}{seconds * 1000:10.2f} ms")
+    metrics["import_core"] = bench_import(5)
+    print(f"  {'import_core':<28}{metrics['import_core'] * 1000:10.2f} ms")
+    get_engine().shutdown()
+    return {
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "metrics": metrics,
+    }
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    print(f"\nCompared with baseline (tolerance {tolerance:.0%}):")
+    for key, seconds in results["metrics"].items():
+        base = baseline.get("metrics", {}).get(key)
+        if base is None:
+            print(f"  {key:<28} new metric")
+            continue
+        ratio = seconds / base if base else float("inf")
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        print(f"  {key:<28}{ratio:8.2f}x{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma separated shortcut counts")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown before a metric counts as a regression")
+    parser.add_argument("--output", type=Path, default=RESULTS)
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    results = run(sizes)
+    args.output.write_text(json.dumps(results, indent=1, sort_keys=True) + "\n")
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(results, indent=1, sort_keys=True) + "\n")
+        print(f"\nBaseline updated: {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}, run with --update-baseline first.")
+        return 0
+    regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
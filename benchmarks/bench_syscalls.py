@@ -0,0 +1,282 @@
+"""
+Count the file system calls one backup makes.
+
+    python benchmarks/bench_syscalls.py             # 1000 pins
+    python benchmarks/bench_syscalls.py --pins 100
+    python benchmarks/bench_syscalls.py --check     # folder signature cases
+
+Wraps os.stat / os.lstat / os.fstat / os.scandir / os.listdir, counts the
+first DirEntry.stat() of every scandir entry (the later ones are cached by
+Python) and counts opens through an audit hook. Measured on a synthetic
+pinned folder: the first backup, a backup with nothing changed (in full,
+then through the folder signature with both trust policies) and one with a
+single edited pin.
+
+--check runs the cases where the folder signature must not be trusted, on
+fine and on simulated coarse (whole / 2 second) mtimes, and exits with 1
+when a change goes unnoticed.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from bench_suite import TEMPLATE, make_tree, variant  # noqa: E402
+from taskbar_saver import core, dirsig  # noqa: E402
+from taskbar_saver.copy_engine import get_engine  # noqa: E402
+from taskbar_saver.snapshots import store_for  # noqa: E402
+
+COUNTS = Counter()
+ACTIVE = [False]
+
+
+class _Entry:
+    """DirEntry proxy that counts the one stat() Python does not cache."""
+
+    def __init__(self, entry):
+        self._entry = entry
+        self._stat_done = set()
+
+    def stat(self, *, follow_symlinks=True):
+        if follow_symlinks not in self._stat_done:
+            self._stat_done.add(follow_symlinks)
+            if ACTIVE[0]:
+                COUNTS["DirEntry.stat"] += 1
+        return self._entry.stat(follow_symlinks=follow_symlinks)
+
+    def __getattr__(self, name):
+        return getattr(self._entry, name)
+
+    def __fspath__(self):
+        return self._entry.path
+
+
+class _ScandirIterator:
+    def __init__(self, it):
+        self._it = it
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return _Entry(next(self._it))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._it.close()
+
+    def close(self):
+        self._it.close()
+
+
+def _counted(name, func):
+    def wrapper(*args, **kwargs):
+        if ACTIVE[0]:
+            COUNTS[name] += 1
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def install():
+    for name in ("stat", "lstat", "fstat", "listdir"):
+        setattr(os, name, _counted(name, getattr(os, name)))
+    real_scandir = os.scandir
+    counted_scandir = _counted("scandir", real_scandir)
+    os.scandir = lambda *a, **k: _ScandirIterator(counted_scandir(*a, **k))
+
+    def hook(event, args):
+        if ACTIVE[0] and event == "open":
+            COUNTS["open"] += 1
+    sys.addaudithook(hook)
+
+
+def measure(label, func):
+    COUNTS.clear()
+    ACTIVE[0] = True
+    try:
+        func()
+    finally:
+        ACTIVE[0] = False
+    total = sum(COUNTS.values())
+    detail = ", ".join(f"{k} {v}" for k, v in sorted(COUNTS.items()))
+    print(f"{label:<18}{total:8d}  ({detail})")
+    return total
+
+
+def settle(folder, age=10.0, coarse=False):
+    """
+    Date the folder and its files back by age seconds, as if nothing had
+    touched them since. coarse rounds the mtimes to 2 seconds like FAT.
+    """
+    when = time.time_ns() - int(age * 1e9)
+    if coarse:
+        when -= when % 2_000_000_000
+    for path in list(folder.iterdir()) + [folder]:
+        os.utime(path, ns=(when, when))
+    return when
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pins", type=int, default=1000)
+    parser.add_argument("--check", action="store_true", help="run the signature checks")
+    args = parser.parse_args()
+    if args.check:
+        return check()
+
+    install()
+    print(f"File system calls per backup, {args.pins} pins:")
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / "pins"
+        backup = Path(tmp) / "backup"
+        make_tree(src, args.pins)
+        settle(src)
+        measure("first backup", lambda: core.backup(src, backup))
+        measure("nothing changed", lambda: core.backup(src, backup, policy=None))
+        measure("  signature", lambda: core.backup(src, backup))
+        measure("  quick signature", lambda: core.backup(src, backup, policy=dirsig.QUICK))
+        edited = next(src.glob("*.lnk"))
+        edited.write_bytes(edited.read_bytes() + b"\0\0\0\0")
+        measure("one pin edited", lambda: core.backup(src, backup))
+    get_engine().shutdown()
+    return 0
+
+
+def check():
+    failures = []
+    template = TEMPLATE.read_bytes()
+
+    def expect(label, result, from_signature, **changes):
+        got = {key: len(getattr(result, key)) for key in changes}
+        ok = result.from_signature == from_signature and got == changes
+        print(f"{'ok  ' if ok else 'FAIL'} {label}")
+        if not ok:
+            failures.append(label)
+            print(f"     from_signature={result.from_signature}, {got}")
+
+    def case(label, func, pins=20):
+        with tempfile.TemporaryDirectory() as tmp:
+            src = Path(tmp) / "pins"
+            backup = Path(tmp) / "backup"
+            make_tree(src, pins)
+            func(src, backup, label)
+
+    def unchanged(src, backup, label):
+        for coarse in (False, True):
+            settle(src, coarse=coarse)
+            core.backup(src, backup, policy=None)
+            for name, policy in (("strict", dirsig.STRICT), ("quick", dirsig.QUICK)):
+                result, snap = core.backup(src, backup, policy=policy)
+                expect(f"{label}, {'coarse' if coarse else 'fine'} mtimes, {name}", result, True)
+                if snap is None:
+                    failures.append(f"{label}: no snapshot returned")
+
+    def edited_in_place(src, backup, label):
+        settle(src)
+        core.backup(src, backup)
+        pin = next(src.glob("*.lnk"))
+        data = pin.read_bytes()
+        pin.write_bytes(data[:-1] + bytes([data[-1] ^ 1]))  # same size, new mtime
+        expect(label, core.backup(src, backup)[0], False, updated=1)
+
+    def racy(src, backup, label):
+        # Coarse folder mtime: a pin added in the same 2 second tick as the
+        # recorded backup leaves the folder mtime unchanged
+        for policy_name, policy in (("strict", dirsig.STRICT), ("quick", dirsig.QUICK)):
+            when = settle(src, age=0, coarse=True)
+            core.backup(src, backup, policy=None)
+            new_pin = src / f"Racy {policy_name}.lnk"
+            new_pin.write_bytes(variant(template, 10_000 + len(policy_name)))
+            os.utime(new_pin, ns=(when, when))
+            os.utime(src, ns=(when, when))
+            expect(f"{label}, {policy_name}", core.backup(src, backup, policy=policy)[0],
+                   False, added=1)
+
+    def settled_coarse_add(src, backup, label):
+        settle(src, coarse=True)
+        core.backup(src, backup)
+        (src / "New.lnk").write_bytes(variant(template, 10_000))
+        settle(src, age=5, coarse=True)  # a later tick than the recorded one
+        expect(label, core.backup(src, backup, policy=dirsig.QUICK)[0], False, added=1)
+
+    def pin_removed(src, backup, label):
+        settle(src)
+        core.backup(src, backup)
+        next(src.glob("App*.lnk")).unlink()
+        expect(label, core.backup(src, backup, policy=dirsig.QUICK)[0], False, removed=1)
+
+    def mirror_damaged(src, backup, label):
+        settle(src)
+        core.backup(src, backup)
+        next(backup.glob("*.lnk")).unlink()
+        expect(label, core.backup(src, backup, policy=dirsig.QUICK)[0], False, added=1)
+
+    def snapshot_deleted(src, backup, label):
+        settle(src)
+        core.backup(src, backup)
+        for path in store_for(backup).snapshot_dir.glob("*.json"):
+            path.unlink()
+        result, snap = core.backup(src, backup, policy=dirsig.QUICK)
+        expect(label, result, False)
+        if snap is None:
+            failures.append(f"{label}: no snapshot written")
+
+    def mirror_only_first(src, backup, label):
+        settle(src)
+        core.backup(src, backup, snapshot=False)
+        result, snap = core.backup(src, backup)
+        expect(label, result, False)
+        if snap is None:
+            failures.append(f"{label}: no snapshot written")
+
+    def bad_signature(src, backup, label):
+        settle(src)
+        core.backup(src, backup)
+        sig_path = backup / dirsig.SIGNATURE_NAME
+        data = json.loads(sig_path.read_text(encoding="utf-8"))
+        sig_path.write_text("{\"version\": 1, \"sour", encoding="utf-8")  # torn write
+        expect(f"{label}: torn file", core.backup(src, backup)[0], False)
+        data["taken"] = time.time_ns() + 3600 * 10**9  # clock went backwards
+        sig_path.write_text(json.dumps(data), encoding="utf-8")
+        expect(f"{label}: taken in the future", core.backup(src, backup)[0], False)
+        other = src.parent / "other"
+        other.mkdir()
+        expect(f"{label}: other source", core.backup(other, backup)[0], False,
+               removed=len(list(src.glob("*.lnk"))) - 1)
+
+    def too_old(src, backup, label):
+        settle(src)
+        core.backup(src, backup)
+        sig_path = backup / dirsig.SIGNATURE_NAME
+        data = json.loads(sig_path.read_text(encoding="utf-8"))
+        data["taken"] -= (dirsig.QUICK.max_age + 1) * 10**9
+        sig_path.write_text(json.dumps(data), encoding="utf-8")
+        expect(label, core.backup(src, backup, policy=dirsig.QUICK)[0], False)
+
+    case("nothing changed is trusted", unchanged)
+    case("pin edited in place, strict", edited_in_place)
+    case("pin added in the recorded tick", racy)
+    case("pin added, coarse mtimes, quick", settled_coarse_add)
+    case("pin removed, quick", pin_removed)
+    case("mirror file deleted, quick", mirror_damaged)
+    case("snapshots deleted, quick", snapshot_deleted)
+    case("mirror-only run, then snapshot", mirror_only_first)
+    case("unusable signature", bad_signature)
+    case("quick signature older than max_age", too_old)
+    get_engine().shutdown()
+    print(f"{len(failures)} failures" if failures else "all signature checks passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
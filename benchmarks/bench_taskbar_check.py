@@ -0,0 +1,139 @@
+"""
+Accuracy and speed of the visual taskbar check on synthetic fixtures.
+
+    python benchmarks/bench_taskbar_check.py             # 3840x48 taskbar, 14 pins
+    python benchmarks/bench_taskbar_check.py --check     # exit 1 on a wrong verdict
+    python benchmarks/bench_taskbar_check.py --size 62x1040 --pins 10   # on the left edge
+    python benchmarks/bench_taskbar_check.py --save DIR  # also write the fixtures as PNG
+
+A reference is taken from a synthetic taskbar (start button, pinned icons,
+tray and clock) and compared with edits of it. The ones a restore leaves
+alone (clock, running-app indicators, a slightly different wallpaper tint)
+must match; the ones it would cause (a pin missing, added, moved or replaced)
+must not. Pins that reach into the last TRAY_FRACTION of the strip are not
+compared, so keep --pins below that. Runs anywhere Pillow and NumPy do; no
+desktop needed.
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image, ImageDraw, ImageEnhance  # noqa: E402
+
+from taskbar_saver.taskbar_check import TaskbarReference  # noqa: E402
+
+
+def icon(seed, size):
+    """A made-up application icon: a coloured tile with a simple glyph."""
+    rng = random.Random(seed)
+    img = Image.new("RGB", (size, size), (0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    base = tuple(rng.randrange(40, 256) for _ in range(3))
+    draw.rounded_rectangle([0, 0, size - 1, size - 1], radius=size // 5, fill=base)
+    glyph = tuple(255 - c for c in base)
+    kind = rng.randrange(3)
+    m = size // 4
+    if kind == 0:
+        draw.ellipse([m, m, size - m, size - m], fill=glyph)
+    elif kind == 1:
+        draw.rectangle([m, m, size - m, size // 2], fill=glyph)
+    else:
+        draw.polygon([(size // 2, m), (size - m, size - m), (m, size - m)], fill=glyph)
+    return img
+
+
+def taskbar(pins, width=3840, height=48, clock="12:00", running=(), tint=0):
+    """A taskbar with the given pin ids, from the start button on."""
+    if height > width:
+        # Vertical: draw it horizontally and turn it, start button at the top
+        return taskbar(pins, height, width, clock, running, tint).transpose(Image.Transpose.TRANSPOSE)
+    img = Image.new("RGB", (width, height), (28 + tint, 30 + tint, 36 + tint))
+    draw = ImageDraw.Draw(img)
+    size = height * 2 // 3
+    pad = (height - size) // 2
+    draw.rectangle([pad, pad, pad + size, pad + size], fill=(0, 120, 215))  # start button
+    x = pad * 3 + size
+    for i, pin in enumerate(pins):
+        img.paste(icon(pin, size), (x, pad))
+        if i in running:
+            draw.rectangle([x + size // 4, height - 3, x + size * 3 // 4, height - 1],
+                           fill=(120, 180, 255))
+        x += size + pad * 2
+    # Tray icons and the clock, as blocks of "text"
+    for i in range(5):
+        tx = width - 260 + i * 24
+        draw.rectangle([tx, height // 2 - 8, tx + 16, height // 2 + 8], fill=(200, 200, 200))
+    digits = sum(ord(c) for c in clock)
+    for i, c in enumerate(clock):
+        w = 6 + (ord(c) + digits) % 5
+        draw.rectangle([width - 120 + i * 12, height // 2 - 7, width - 120 + i * 12 + w,
+                        height // 2 + 7], fill=(230, 230, 230))
+    return img
+
+
+def fixtures(width, height, pins):
+    ids = list(range(1, pins + 1))
+    swapped = ids[:]
+    swapped[3], swapped[4] = swapped[4], swapped[3]
+    replaced = ids[:]
+    replaced[6] = 999
+    moved = ids[:]
+    moved.append(moved.pop(2))
+    base = taskbar(ids, width, height)
+    return base, [
+        ("recaptured", taskbar(ids, width, height), True),
+        ("clock changed", taskbar(ids, width, height, clock="23:59"), True),
+        ("apps running", taskbar(ids, width, height, running=(0, 2, 5, 9)), True),
+        ("tint shifted", taskbar(ids, width, height, tint=6), True),
+        ("dimmed 5%", ImageEnhance.Brightness(base).enhance(0.95), True),
+        ("pin missing", taskbar(ids[:5] + ids[6:], width, height), False),
+        ("pin added", taskbar(ids + [500], width, height), False),
+        ("pins swapped", taskbar(swapped, width, height), False),
+        ("pin replaced", taskbar(replaced, width, height), False),
+        ("pin moved to end", taskbar(moved, width, height), False),
+        ("no pins", taskbar([], width, height), False),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", default="3840x48", help="taskbar WIDTHxHEIGHT")
+    parser.add_argument("--pins", type=int, default=14)
+    parser.add_argument("--check", action="store_true", help="exit 1 if any verdict is wrong")
+    parser.add_argument("--save", type=Path, help="write the fixtures to this folder")
+    args = parser.parse_args()
+    width, height = (int(v) for v in args.size.lower().split("x"))
+
+    base, cases = fixtures(width, height, args.pins)
+    TaskbarReference.from_image(base)  # NumPy warm-up
+    start = time.perf_counter()
+    ref = TaskbarReference.from_image(base)
+    took = time.perf_counter() - start
+    size = len(str(ref.to_dict()))
+    print(f"reference of {width}x{height}: {took * 1000:.1f} ms, ~{size / 1024:.1f} KB as JSON")
+    if args.save:
+        args.save.mkdir(parents=True, exist_ok=True)
+        base.save(args.save / "reference.png")
+
+    wrong = 0
+    for label, img, same in cases:
+        start = time.perf_counter()
+        result = ref.compare(img)
+        took = time.perf_counter() - start
+        ok = result.matches == same
+        wrong += not ok
+        print(f"{label:<18}{'match' if result.matches else 'differs':<9}"
+              f"{'ok  ' if ok else 'WRONG'} {result}  ({took * 1000:.1f} ms)")
+        if args.save:
+            img.save(args.save / f"{label.replace(' ', '_')}.png")
+    if args.check:
+        return 1 if wrong else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
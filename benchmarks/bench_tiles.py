@@ -0,0 +1,102 @@
+"""
+Storage and reconstruct latency of the tile-deduplicated screenshot archive.
+
+    python benchmarks/bench_tiles.py                     # 24 frames of 3840x2160
+    python benchmarks/bench_tiles.py --frames 60 --size 1920x1080
+
+The corpus is a synthetic desktop session (see bench_screenshot): the clock
+changes every frame, a window moves around, and every --scene frames the
+desktop is a different one. Each frame is added to a TileStore and also saved
+as its own PNG (png:6, the default preset) for comparison; afterwards every
+frame is reconstructed, timed and compared with the original pixel for pixel.
+Needs Pillow and NumPy.
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+import numpy as np  # noqa: E402
+from PIL import ImageDraw  # noqa: E402
+
+from bench_screenshot import synthetic_desktop  # noqa: E402
+from taskbar_saver.screenshots import EncodeOptions, encode  # noqa: E402
+from taskbar_saver.tile_store import TileStore  # noqa: E402
+
+
+def session(width, height, frames, scene):
+    """Yield the frames of a desktop session."""
+    base = None
+    for i in range(frames):
+        if i % scene == 0:
+            base = synthetic_desktop(width, height, seed=i // scene)
+        frame = base.copy()
+        draw = ImageDraw.Draw(frame)
+        # Clock in the taskbar
+        draw.rectangle([width - 120, height - 40, width - 20, height - 8],
+                       fill=(40 + i * 7 % 200, 40, 40))
+        # A window dragged across the screen
+        x = (i * width // 17) % (width * 2 // 3)
+        y = height // 5 + (i * 37) % (height // 3)
+        draw.rectangle([x, y, x + width // 4, y + height // 4], fill=(235, 235, 240),
+                       outline=(90, 90, 90))
+        draw.rectangle([x, y, x + width // 4, y + 30], fill=(30, 90, 160))
+        yield frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=24)
+    parser.add_argument("--size", default="3840x2160", help="WIDTHxHEIGHT")
+    parser.add_argument("--scene", type=int, default=8, help="frames before the desktop changes")
+    args = parser.parse_args()
+    width, height = (int(v) for v in args.size.lower().split("x"))
+
+    png = EncodeOptions("png")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        store = TileStore(tmp / "archive")
+        png_bytes = raw_bytes = 0
+        add_times, originals = [], {}
+        for i, img in enumerate(session(width, height, args.frames, args.scene)):
+            raw_bytes += img.width * img.height * len(img.getbands())
+            png_bytes += encode(img, tmp / "frame.png", png)
+            start = time.perf_counter()
+            frame = store.add(img)
+            add_times.append(time.perf_counter() - start)
+            originals[frame.id] = np.asarray(img).copy()
+            print(f"frame {i:3d}: {frame.new_tiles:5d} new of {len(frame.grid)} tiles, "
+                  f"{frame.new_bytes / 2**20:7.2f} MB, added in {add_times[-1] * 1000:5.0f} ms")
+
+        times, failed = [], 0
+        for frame_id, original in originals.items():
+            start = time.perf_counter()
+            img = store.reconstruct(frame_id)
+            times.append(time.perf_counter() - start)
+            if not np.array_equal(np.asarray(img), original):
+                failed += 1
+                print(f"frame {frame_id} does not match the original")
+        export_start = time.perf_counter()
+        store.export(frame_id, tmp / "export.png")
+        export_time = time.perf_counter() - export_start
+
+        archive = store.disk_usage()
+        print(f"\n{args.frames} frames of {width}x{height}, {store.tile_count()} distinct tiles")
+        print(f"raw frames      {raw_bytes / 2**20:9.1f} MB")
+        print(f"one PNG each    {png_bytes / 2**20:9.1f} MB")
+        print(f"tile archive    {archive / 2**20:9.1f} MB  ({archive / png_bytes:.1%} of the PNGs)")
+        print(f"add             {statistics.mean(add_times) * 1000:7.0f} ms mean")
+        print(f"reconstruct     {statistics.mean(times) * 1000:7.0f} ms mean, "
+              f"{max(times) * 1000:.0f} ms max; as PNG {export_time * 1000:.0f} ms")
+        print("lossless: " + ("FAIL" if failed else "every frame identical"))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
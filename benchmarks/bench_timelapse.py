@@ -0,0 +1,138 @@
+"""
+Cost per frame and memory of the timelapse ring buffer, on synthetic frames.
+
+    python benchmarks/bench_timelapse.py                  # 200 grabs of 3840x2160
+    python benchmarks/bench_timelapse.py --check          # also verify ring and flush
+
+Frames come from the bench_tiles desktop session through a custom backend:
+each one is repeated --repeat times, as on a desktop that sits still between
+grabs, so most grabs must be dropped by frame differencing. Reports the time
+per grab (reduce, copy into the ring, difference), how many were kept, and
+per grab once the ring is full, the memory (tracemalloc) it kept and its
+peak: the ring is reused, so nothing is kept. Needs Pillow and NumPy; no
+desktop.
+
+--check also verifies that exactly the changed frames were kept, that the
+ring holds the newest `--capacity` of them in order, and that flush() writes
+them out pixel for pixel.
+"""
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import deque
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+import numpy as np  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from bench_tiles import session  # noqa: E402
+from taskbar_saver.timelapse import TimelapseRecorder  # noqa: E402
+
+
+class SessionBackend:
+    """Frames of the bench_tiles session, each repeated; time spent drawing them is kept apart."""
+    name = "frames"
+
+    def __init__(self, width, height, grabs, repeat, capacity, reduce):
+        self.repeat = repeat
+        self.expected = []                           # grab numbers that must be kept
+        self.recent = deque(maxlen=capacity)         # (grab number, frame as stored)
+        self.reduce = reduce
+        self.spent = 0.0
+        self._session = session(width, height, -(-grabs // repeat), 4)
+        self._frame = None
+        self._n = 0
+
+    def grab(self):
+        start = time.perf_counter()
+        if self._n % self.repeat == 0:
+            self._frame = next(self._session)
+            self.expected.append(self._n)
+            self.recent.append((self._n, self._frame.reduce(self.reduce) if self.reduce > 1
+                                else self._frame.copy()))
+        self._n += 1
+        img = self._frame.copy()
+        self.spent += time.perf_counter() - start
+        return img
+
+    def close(self):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", default="3840x2160", help="WIDTHxHEIGHT")
+    parser.add_argument("--grabs", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5, help="grabs per distinct frame")
+    parser.add_argument("--capacity", type=int, default=20)
+    parser.add_argument("--reduce", type=int, default=2)
+    parser.add_argument("--check", action="store_true")
+    args = parser.parse_args()
+    width, height = (int(v) for v in args.size.lower().split("x"))
+
+    backend = SessionBackend(width, height, args.grabs, args.repeat, args.capacity, args.reduce)
+    recorder = TimelapseRecorder(backend, capacity=args.capacity, reduce=args.reduce)
+    kept_at, times, retained, transient = [], [], [], []
+    tracemalloc.start()
+    for n in range(args.grabs):
+        spent = backend.spent
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        kept = recorder.capture(taken=1_700_000_000 + n)
+        times.append(time.perf_counter() - start - (backend.spent - spent))
+        after, peak = tracemalloc.get_traced_memory()
+        if kept:
+            kept_at.append(n)
+        if n >= args.capacity:
+            # NumPy and Python allocations; Pillow's image memory is not traced
+            retained.append(after - before)
+            transient.append(peak - before)
+    tracemalloc.stop()
+
+    ring = recorder.ring
+    frame = ring.shape[0] * ring.shape[1] * ring.shape[2]
+    print(f"{args.grabs} grabs of {width}x{height}, stored at {ring.shape[1]}x{ring.shape[0]}: "
+          f"{len(kept_at)} kept, {recorder.dropped} dropped as unchanged")
+    print(f"per grab        {np.mean(times) * 1000:6.1f} ms mean, "
+          f"{np.percentile(times, 95) * 1000:.1f} ms p95 (without drawing the frame)")
+    print(f"ring            {ring.slots.nbytes / 2**20:6.1f} MB for {args.capacity} frames "
+          f"(+1 spare) of {frame / 2**20:.1f} MB")
+    if retained:
+        print(f"after the first {args.capacity} grabs: {max(retained) / 2**20:.2f} MB kept by "
+              f"any grab, {max(transient) / 2**20:.1f} MB peak while grabbing")
+
+    if not args.check:
+        return 0
+    failures = []
+    if kept_at != backend.expected:
+        failures.append(f"kept grabs {kept_at[:10]}..., expected {backend.expected[:10]}...")
+    newest = [n for n, _ in backend.recent]
+    times_in_ring = [t - 1_700_000_000 for t, _ in ring.frames()]
+    if times_in_ring != newest:
+        failures.append(f"ring holds grabs {times_in_ring}, expected {newest}")
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        paths = recorder.flush(tmp)
+        flushed = time.perf_counter() - start
+        for path, (n, want) in zip(paths, backend.recent):
+            with Image.open(path) as got:
+                if not np.array_equal(np.asarray(got.convert("RGB")), np.asarray(want)):
+                    failures.append(f"{path.name} does not match grab {n}")
+        if len(paths) != len(newest):
+            failures.append(f"flushed {len(paths)} frames, expected {len(newest)}")
+    print(f"flush           {len(paths)} frames in {flushed * 1000:.0f} ms")
+    for failure in failures:
+        print("FAIL " + failure)
+    print("check: " + ("FAILED" if failures else "ok"))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
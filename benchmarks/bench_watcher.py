@@ -0,0 +1,141 @@
+"""
+Debouncing of the folder watcher, on the inotify and the poll backend.
+
+    python benchmarks/bench_watcher.py                # both backends, 3 rounds
+    python benchmarks/bench_watcher.py --check        # exit 1 on a wrong count
+    python benchmarks/bench_watcher.py --backend poll --debounce 0.5
+
+A DirectoryWatcher is started on a temporary pinned folder and fed bursts of
+.lnk changes the way Explorer makes them: several pins created, edited in
+place, renamed or deleted a few tens of milliseconds apart, and a slow burst
+of edits spaced well beyond the poll period but within the debounce time.
+Each burst must end in exactly one callback, no sooner than --debounce
+seconds after its last change. Reports that delay. inotify is only
+available on Linux; elsewhere it is reported as skipped. The Windows backend
+needs a Windows machine and is not covered here.
+"""
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from bench_suite import TEMPLATE, variant  # noqa: E402
+from taskbar_saver.watcher import DirectoryWatcher  # noqa: E402
+
+GAP = 0.03        # seconds between the changes of one burst
+SETTLE = 3        # debounce periods to wait for a late extra callback
+EARLY = 0.02      # timer slack allowed before the debounce time
+
+
+def bursts(folder, data, debounce):
+    """(label, function making the changes) for one round, in order."""
+    names = [f"App {i:06d}.lnk" for i in range(5)]
+
+    def create():
+        for i, name in enumerate(names):
+            (folder / name).write_bytes(variant(data, i))
+            time.sleep(GAP)
+
+    def edit():
+        for i, name in enumerate(names[:3]):
+            (folder / name).write_bytes(variant(data, i + 100) + b"\0" * 16)
+            time.sleep(GAP)
+
+    def edit_slowly():
+        for i, name in enumerate(names[:3]):
+            (folder / name).write_bytes(variant(data, i + 200))
+            time.sleep(debounce * 0.6)
+
+    def rename():
+        for name in names[3:]:
+            (folder / name).rename(folder / name.replace(".lnk", " (2).lnk"))
+            time.sleep(GAP)
+
+    def delete():
+        for path in sorted(folder.glob("*.lnk")):
+            path.unlink()
+            time.sleep(GAP)
+
+    return [("create 5", create), ("edit 3", edit),
+            ("edit 3 slowly", edit_slowly), ("rename 2", rename), ("delete all", delete)]
+
+
+def run(backend, rounds, debounce, interval):
+    """[(label, callbacks, delay or None)], or None if the backend is not available."""
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp)
+        calls = []
+        fired = threading.Event()
+
+        def callback():
+            calls.append(time.monotonic())
+            fired.set()
+
+        watcher = DirectoryWatcher(folder, callback, debounce=debounce, max_delay=debounce * 20,
+                                   backend=backend, poll_interval=interval)
+        watcher.start()
+        try:
+            if watcher.backend.name != backend:
+                return None  # make_backend() fell back to polling
+            data = TEMPLATE.read_bytes()
+            results = []
+            for _ in range(rounds):
+                for label, change in bursts(folder, data, debounce):
+                    before = len(calls)
+                    fired.clear()
+                    change()
+                    # The burst functions sleep after their last change
+                    last = time.monotonic() - (debounce * 0.6 if "slowly" in label else GAP)
+                    fired.wait(debounce + interval + 5.0)
+                    time.sleep(debounce * SETTLE)
+                    got = calls[before:]
+                    results.append((label, len(got), got[0] - last if got else None))
+            return results
+        finally:
+            watcher.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", choices=("inotify", "poll"), action="append",
+                        help="backend to run (repeatable, default both)")
+    parser.add_argument("--rounds", type=int, default=3, help="times every burst is made")
+    parser.add_argument("--debounce", type=float, default=0.3)
+    parser.add_argument("--interval", type=float, default=0.1, help="poll backend period")
+    parser.add_argument("--check", action="store_true",
+                        help="exit 1 unless every burst gave exactly one callback")
+    args = parser.parse_args()
+
+    failures = []
+    for backend in args.backend or ("inotify", "poll"):
+        results = run(backend, args.rounds, args.debounce, args.interval)
+        if results is None:
+            print(f"{backend:<8}skipped (not available here)")
+            continue
+        delays = [delay for _, count, delay in results if delay is not None]
+        for label, count, delay in results:
+            if count != 1:
+                failures.append(f"{backend}: {label} gave {count} callbacks")
+            elif delay < args.debounce - EARLY:
+                failures.append(f"{backend}: {label} called back {delay * 1000:.0f} ms after "
+                                f"the last change, before the debounce time")
+        print(f"{backend:<8}{len(results)} bursts, {sum(c for _, c, _ in results)} callbacks, "
+              f"delay after the last change {min(delays) * 1000:.0f}-{max(delays) * 1000:.0f} ms "
+              f"(debounce {args.debounce * 1000:.0f} ms)" if delays else
+              f"{backend:<8}{len(results)} bursts, no callbacks")
+    for failure in failures:
+        print("FAIL " + failure)
+    if args.check:
+        print("check: " + ("FAILED" if failures else "ok"))
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,3 @@
+# Helper modules for Task Bar Saver.
+# Kept in a package so build_exe.bat still finds the main script as the only
+# top-level .py file in the project folder.
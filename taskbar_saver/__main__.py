@@ -0,0 +1,5 @@
+import sys
+
+from taskbar_saver.cli import main
+
+sys.exit(main())
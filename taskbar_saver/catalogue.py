@@ -0,0 +1,234 @@
+"""
+Index of the Start Menu shortcuts installed on this machine, used to find a
+replacement when a backed-up pin points at a program that has moved.
+
+Folders are walked in parallel and every .lnk found is recorded with its
+target, arguments and description. The index is saved as JSON; on the next
+scan a shortcut whose size and mtime are unchanged is taken from the index
+instead of being parsed again, and shortcuts that disappeared are dropped.
+"""
+import os
+import json
+import difflib
+import ntpath
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from taskbar_saver.dedupe import COPY_SUFFIX
+from taskbar_saver.lnk import LnkError, parse_file
+
+INDEX_NAME = "start_menu_index.json"
+INDEX_VERSION = 1
+SCAN_WORKERS = 8
+START_MENU_SUBDIR = r"Microsoft\Windows\Start Menu\Programs"
+
+
+def default_roots(environ=None):
+    """The current user's and the all-users Start Menu, where they exist."""
+    environ = os.environ if environ is None else environ
+    roots = []
+    for var in ("APPDATA", "PROGRAMDATA"):
+        base = environ.get(var)
+        if base:
+            roots.append(Path(base) / START_MENU_SUBDIR)
+    return roots
+
+
+def product_name(name):
+    """'CCleaner 7 (2).lnk' -> 'ccleaner 7'."""
+    name = COPY_SUFFIX.sub(".lnk", name)
+    if name.lower().endswith(".lnk"):
+        name = name[:-4]
+    return " ".join(name.split()).casefold()
+
+
+def _norm_target(target):
+    return target.replace("/", "\\").rstrip("\\").casefold() if target else ""
+
+
+def _file_name(target):
+    return ntpath.basename(_norm_target(target))
+
+
+def _target_exists(target):
+    try:
+        return os.path.exists(os.path.expandvars(target))
+    except ValueError:
+        return False
+
+
+class Candidate:
+    def __init__(self, path, target, arguments, description):
+        self.path = path
+        self.target = target
+        self.arguments = arguments
+        self.description = description
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+
+class Replacement:
+    def __init__(self, pin, broken_target, candidate, score, reasons):
+        self.pin = pin
+        self.broken_target = broken_target
+        self.candidate = candidate
+        self.score = score
+        self.reasons = reasons
+
+    def __repr__(self):
+        return f"<Replacement {self.pin!r} -> {self.candidate.path!r} ({', '.join(self.reasons)})>"
+
+
+def _scan_dir(path, known):
+    """
+    One folder: (files, subdirs). files is [(path, record)] where record is
+    [size, mtime_ns, target, arguments, description], reused from known when
+    the shortcut is unchanged. Unreadable shortcuts get a None target.
+    """
+    files = []
+    subdirs = []
+    try:
+        it = os.scandir(path)
+    except OSError:
+        return files, subdirs
+    with it:
+        for entry in it:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                    continue
+                if not entry.name.lower().endswith(".lnk"):
+                    continue
+                st = entry.stat()
+            except OSError:
+                continue
+            old = known.get(entry.path)
+            if old and old[0] == st.st_size and old[1] == st.st_mtime_ns:
+                files.append((entry.path, old))
+                continue
+            try:
+                link = parse_file(entry.path)
+                record = [st.st_size, st.st_mtime_ns, link.target, link.arguments, link.name]
+            except (LnkError, OSError):
+                record = [st.st_size, st.st_mtime_ns, None, None, None]
+            files.append((entry.path, record))
+    return files, subdirs
+
+
+class Catalogue:
+    """
+    Start Menu shortcut index. scan() refreshes it, save() writes it to path,
+    suggest() picks a replacement for one broken pin.
+    """
+
+    def __init__(self, path=None, roots=None):
+        self.path = Path(path) if path else None
+        self.roots = [Path(r) for r in roots] if roots is not None else default_roots()
+        self.files = {}  # lnk path -> record, see _scan_dir
+        self.parsed = 0  # shortcuts parsed by the last scan (the rest came from the index)
+        if self.path:
+            self._load()
+        self._build()
+
+    def __len__(self):
+        return len(self.files)
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == INDEX_VERSION:
+            self.files = data.get("files", {})
+
+    def save(self):
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"version": INDEX_VERSION,
+                                "roots": [str(r) for r in self.roots],
+                                "files": self.files}, separators=(",", ":")))
+        os.replace(tmp, self.path)
+
+    def scan(self, workers=SCAN_WORKERS):
+        """Walk every root in parallel and bring the index up to date."""
+        known = self.files
+        files = {}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = {pool.submit(_scan_dir, str(root), known) for root in self.roots}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    found, subdirs = future.result()
+                    files.update(found)
+                    pending.update(pool.submit(_scan_dir, d, known) for d in subdirs)
+        self.parsed = sum(1 for path, record in files.items() if known.get(path) is not record)
+        self.files = files
+        self._build()
+        return self
+
+    def _build(self):
+        self.by_target = {}
+        self.by_file = {}
+        self.by_product = {}
+        for path, (_, _, target, arguments, description) in self.files.items():
+            if not target:
+                continue
+            cand = Candidate(path, target, arguments, description)
+            self.by_target.setdefault(_norm_target(target), []).append(cand)
+            self.by_file.setdefault(_file_name(target), []).append(cand)
+            self.by_product.setdefault(product_name(os.path.basename(path)), []).append(cand)
+
+    def suggest(self, pin_name, link, exists=_target_exists):
+        """
+        Best Start Menu shortcut to replace a pin whose target is gone, or
+        None. Candidates must point somewhere else that exists; they score for
+        the same executable file name, the same product name (shortcut name or
+        description) and the same arguments, with path similarity as tiebreak.
+
+        Start Menu shortcuts left pointing at the same missing target are
+        stale too, but their names still say which program the pin was, so
+        a pin renamed by hand can be matched through them.
+        """
+        broken = _norm_target(link.target)
+        scores = {}
+
+        def add(cands, points, reason):
+            for cand in cands:
+                entry = scores.setdefault(cand.path, [cand, 0, []])
+                entry[1] += points
+                entry[2].append(reason)
+
+        pin_product = product_name(pin_name)
+        if broken:
+            add(self.by_file.get(ntpath.basename(broken), []), 4, "same program file")
+            stale = {product_name(cand.name) for cand in self.by_target.get(broken, [])}
+            stale.discard(pin_product)
+            for product in sorted(stale):
+                add(self.by_product.get(product, []), 3, "same name as its old Start Menu entry")
+        add(self.by_product.get(pin_product, []), 3, "same name")
+        if link.name:
+            add(self.by_product.get(" ".join(link.name.split()).casefold(), []), 2,
+                "same description")
+
+        best = None
+        for cand, score, reasons in scores.values():
+            if _norm_target(cand.target) == broken or not exists(cand.target):
+                continue
+            if (cand.arguments or "") == (link.arguments or ""):
+                score += 1
+            similarity = difflib.SequenceMatcher(None, broken, _norm_target(cand.target)).ratio()
+            rank = (score, similarity, cand.path)
+            if best is None or rank > best[0]:
+                best = (rank, Replacement(pin_name, link.target, cand, score, reasons))
+        return best[1] if best else None
+
+
+def catalogue_for(backup_dir, roots=None):
+    """Catalogue whose index is kept inside a backup folder."""
+    return Catalogue(Path(backup_dir) / INDEX_NAME, roots=roots)
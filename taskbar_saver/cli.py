@@ -0,0 +1,369 @@
+"""
+Command-line interface for scheduled / headless runs.
+
+    python -m taskbar_saver backup  [--source DIR] [--backup DIR] [--full | --quick] [--capture-taskbar]
+    python -m taskbar_saver restore [--backup DIR] [--dest DIR] [--snapshot ID | --metadata FILE]
+                                    [--check-taskbar [--settle S]]
+    python -m taskbar_saver export  [--backup DIR] [--snapshot ID] [--output FILE]
+    python -m taskbar_saver diff    [--source DIR] [--backup DIR]
+    python -m taskbar_saver verify  [--backup DIR]
+    python -m taskbar_saver validate [--backup DIR] [--snapshot ID] [--timeout S]
+    python -m taskbar_saver repair  [--backup DIR] [--snapshot ID] [--root DIR ...]
+    python -m taskbar_saver list    [--backup DIR] [--snapshot ID]
+    python -m taskbar_saver dedupe  [--source DIR]
+    python -m taskbar_saver search  TEXT [--backup DIR] [--limit N]
+    python -m taskbar_saver screenshots [--backup DIR] [--export ID --output FILE] [--gc]
+    python -m taskbar_saver check-taskbar [--backup DIR] [--snapshot ID]
+    python -m taskbar_saver timelapse [--backup DIR] [--duration S] [--interval S] [--frames N]
+                                      [--taskbar] [--output DIR | --archive]
+
+Only imports the UI-free core, so it starts in milliseconds and works
+without a desktop session (or on Linux with explicit folders).
+"""
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+from taskbar_saver import core, dirsig
+
+
+def _source(args):
+    source = Path(args.source) if args.source else core.default_taskbar_dir()
+    if source is None:
+        raise SystemExit("APPDATA is not set, pass --source")
+    return source
+
+
+def cmd_backup(args):
+    source = _source(args)
+    if not source.exists():
+        print(f"Taskbar folder not found: {source}", file=sys.stderr)
+        return 2
+    policy = None if args.full else dirsig.QUICK if args.quick else dirsig.STRICT
+    result, snap = core.backup(source, args.backup, log=print, snapshot=not args.no_snapshot,
+                               policy=policy)
+    if result.changed:
+        print(f"Backed up pinned shortcuts: {len(result.added)} added, "
+              f"{len(result.updated)} updated, {len(result.removed)} removed.")
+    elif not result.errors:
+        print("No new shortcuts to save — everything already backed up.")
+    if args.capture_taskbar and snap is not None:
+        try:
+            core.record_taskbar(args.backup, snap.id)
+            print(f"Saved a picture of the taskbar with snapshot {snap.id}.")
+        except Exception as e:
+            print(f"Could not capture the taskbar: {e}", file=sys.stderr)
+            return 1
+    return 1 if result.errors else 0
+
+
+def cmd_restore(args):
+    dest = Path(args.dest) if args.dest else core.default_taskbar_dir()
+    if dest is None:
+        raise SystemExit("APPDATA is not set, pass --dest")
+    if args.metadata:
+        with open(args.metadata, "r", encoding="utf-8") as f:
+            records = json.load(f)
+        _, errors = core.restore_metadata(records, dest, log=print)
+        return 1 if errors else 0
+    try:
+        report = core.restore(args.backup, dest, snapshot_id=args.snapshot, log=print,
+                              replace=not args.merge)
+    except KeyError as e:
+        print(e.args[0], file=sys.stderr)
+        return 2
+    print(f"Restored {len(report)} shortcuts to {dest}")
+    if report.errors:
+        return 1
+    if args.check_taskbar:
+        # Give Explorer time to redraw the taskbar
+        time.sleep(args.settle)
+        return _check_taskbar(args.backup, args.snapshot)
+    return 0
+
+
+def _check_taskbar(backup_dir, snapshot_id):
+    try:
+        snap_id, result = core.check_taskbar(backup_dir, snapshot_id=snapshot_id)
+    except KeyError as e:
+        print(e.args[0], file=sys.stderr)
+        return 2
+    except Exception as e:
+        print(f"Could not capture the taskbar: {e}", file=sys.stderr)
+        return 2
+    verdict = "matches" if result.matches else "does NOT match"
+    print(f"Taskbar {verdict} snapshot {snap_id} ({result}).")
+    return 0 if result.matches else 1
+
+
+def cmd_check_taskbar(args):
+    return _check_taskbar(args.backup, args.snapshot)
+
+
+def cmd_export(args):
+    try:
+        records = core.export_metadata(args.backup, snapshot_id=args.snapshot,
+                                       log=lambda m: print(m, file=sys.stderr))
+    except KeyError as e:
+        print(e.args[0], file=sys.stderr)
+        return 2
+    text = json.dumps(records, indent=1, sort_keys=True, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"Exported {len(records)} shortcuts to {args.output}")
+    else:
+        print(text)
+    return 0
+
+
+def cmd_diff(args):
+    result = core.diff(_source(args), args.backup)
+    for name in result.added:
+        print(f"+ {name}")
+    for name in result.removed:
+        print(f"- {name}")
+    for name in result.changed:
+        print(f"~ {name}")
+    if result.clean:
+        print("Backup is up to date.")
+    return 0 if result.clean else 3
+
+
+def cmd_verify(args):
+    problems = core.verify(args.backup)
+    for where, name, problem in problems:
+        print(f"{where}: {name}: {problem}")
+    if not problems:
+        print("Backup verified, no problems found.")
+    return 1 if problems else 0
+
+
+def cmd_validate(args):
+    try:
+        report = core.validate(args.backup, snapshot_id=args.snapshot, timeout=args.timeout)
+    except KeyError as e:
+        print(e.args[0], file=sys.stderr)
+        return 2
+    for check in report.checks:
+        if check.status != "ok" or args.all:
+            detail = f"  ({check.detail})" if check.detail else ""
+            print(f"{check.status:<12}{check.name} -> {check.target or '?'}{detail}")
+    print(f"{report.summary()} in {report.elapsed:.2f}s")
+    return 0 if report.ok else 1
+
+
+def cmd_repair(args):
+    try:
+        repairs = core.suggest_repairs(args.backup, snapshot_id=args.snapshot, roots=args.root,
+                                       timeout=args.timeout, log=print)
+    except KeyError as e:
+        print(e.args[0], file=sys.stderr)
+        return 2
+    for check, repl in repairs:
+        print(f"{check.name}: {check.status} ({check.target})")
+        if repl:
+            print(f"  use {repl.candidate.path}")
+            print(f"      -> {repl.candidate.target}  ({', '.join(repl.reasons)})")
+        else:
+            print("  no replacement found")
+    if not repairs:
+        print("Every pin still points at an existing file.")
+    return 0 if all(repl for _, repl in repairs) else 1
+
+
+def cmd_list(args):
+    snaps = core.list_snapshots(args.backup)
+    if args.snapshot:
+        matches = [s for s in snaps if s.id == args.snapshot]
+        if not matches:
+            print(f"No snapshot named {args.snapshot}", file=sys.stderr)
+            return 2
+        for name in matches[0].names():
+            print(name)
+        return 0
+    for snap in snaps:
+        print(f"{snap.id}  {snap.created}  {len(snap.files)} shortcuts")
+    if not snaps:
+        print("No snapshots yet.")
+    return 0
+
+
+def cmd_dedupe(args):
+    result = core.duplicate_pins(_source(args))
+    for group in result.groups:
+        print(f"keep {group.kept}  ({group.reason})")
+        for name in group.dropped:
+            print(f"  drop {name}")
+    for name in result.unparsed:
+        print(f"unreadable, kept: {name}")
+    if not result.groups:
+        print("No duplicate pins.")
+    return 0
+
+
+def cmd_search(args):
+    hits = core.search(args.backup, " ".join(args.text), limit=args.limit,
+                       log=lambda m: print(m, file=sys.stderr))
+    for hit in hits:
+        span = hit.first if len(hit.snapshots) == 1 else f"{hit.first} .. {hit.last}"
+        print(f"{hit.name}  ->  {hit.target or '?'}")
+        print(f"    {len(hit.snapshots)} snapshots: {span}")
+    if not hits:
+        print("No pins found.")
+    return 0 if hits else 1
+
+
+def cmd_screenshots(args):
+    from taskbar_saver.tile_store import tile_store_for
+
+    store = tile_store_for(args.backup)
+    if args.export:
+        output = Path(args.output or f"{args.export}.png")
+        try:
+            start = time.perf_counter()
+            size = store.export(args.export, output)
+        except KeyError as e:
+            print(e.args[0], file=sys.stderr)
+            return 2
+        print(f"Wrote {output} ({size / 2**20:.1f} MB) in {time.perf_counter() - start:.2f}s")
+        return 0
+    if args.gc:
+        print(f"Removed {store.gc()} unused tile packs.")
+        return 0
+    frames = store.list()
+    for frame in frames:
+        print(f"{frame.id}  {frame.created}  {frame.width}x{frame.height}  "
+              f"{frame.new_tiles} new tiles, {frame.new_bytes / 1024:.0f} KB")
+    if frames:
+        print(f"{len(frames)} screenshots, {store.tile_count()} distinct tiles, "
+              f"{store.disk_usage() / 2**20:.1f} MB")
+    else:
+        print("No archived screenshots.")
+    return 0
+
+
+def cmd_timelapse(args):
+    from taskbar_saver.timelapse import TimelapseRecorder, timelapse_dir_for
+
+    recorder = TimelapseRecorder("taskbar" if args.taskbar else "desktop", capacity=args.frames,
+                                 interval=args.interval, reduce=args.reduce,
+                                 on_error=lambda e: print(f"Capture failed: {e}", file=sys.stderr))
+    print(f"Recording every {args.interval:g} s, keeping the last {args.frames} changes "
+          f"(Ctrl+C to stop early)...")
+    recorder.start()
+    try:
+        time.sleep(args.duration)
+    except KeyboardInterrupt:
+        pass
+    recorder.close()
+    print(f"{recorder.grabbed} grabs, {recorder.dropped} unchanged.")
+    if args.archive:
+        from taskbar_saver.tile_store import tile_store_for
+        ids = recorder.flush_to_store(tile_store_for(args.backup))
+        print(f"Archived {len(ids)} frames (see `screenshots`).")
+        return 0 if ids else 1
+    folder = Path(args.output) if args.output else timelapse_dir_for(args.backup)
+    paths = recorder.flush(folder)
+    print(f"Saved {len(paths)} frames to {folder}" if paths else "No frames captured.")
+    return 0 if paths else 1
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="taskbar_saver",
+                                     description="Back up and restore pinned taskbar shortcuts.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add(name, func, help, source=False, dest=False):
+        p = sub.add_parser(name, help=help)
+        p.add_argument("--backup", type=Path, default=core.default_backup_dir(),
+                       help="backup folder (default: taskbar_backup next to the program)")
+        if source:
+            p.add_argument("--source", help="pinned shortcuts folder (default: from APPDATA)")
+        if dest:
+            p.add_argument("--dest", help="folder to restore into (default: from APPDATA)")
+        p.set_defaults(func=func)
+        return p
+
+    p = add("backup", cmd_backup, "back up pinned shortcuts", source=True)
+    p.add_argument("--no-snapshot", action="store_true", help="update the mirror only")
+    check = p.add_mutually_exclusive_group()
+    check.add_argument("--full", action="store_true",
+                       help="ignore the saved folder signature and check every pin")
+    check.add_argument("--quick", action="store_true",
+                       help="trust the folder mtime alone; in-place edits of a pin wait "
+                            "for the next full check (at most a day)")
+    p.add_argument("--capture-taskbar", action="store_true",
+                   help="store a picture of the taskbar with the snapshot, for check-taskbar")
+
+    p = add("restore", cmd_restore, "restore shortcuts from a snapshot", dest=True)
+    p.add_argument("--snapshot", help="snapshot id (default: latest)")
+    p.add_argument("--merge", action="store_true", help="keep shortcuts not in the snapshot")
+    p.add_argument("--metadata", help="write shortcuts from an `export` file instead")
+    p.add_argument("--check-taskbar", action="store_true",
+                   help="afterwards, compare the taskbar with the snapshot's picture")
+    p.add_argument("--settle", type=float, default=3.0,
+                   help="seconds to wait before --check-taskbar looks (default: 3)")
+
+    p = add("export", cmd_export, "save shortcut metadata as JSON (restorable with --metadata)")
+    p.add_argument("--snapshot", help="snapshot id (default: latest)")
+    p.add_argument("--output", help="file to write (default: print)")
+
+    add("diff", cmd_diff, "show what a backup would change", source=True)
+    add("verify", cmd_verify, "check the backup against its hashes")
+
+    p = add("validate", cmd_validate, "check that backed-up pins still point at existing files")
+    p.add_argument("--snapshot", help="snapshot id (default: the backup mirror)")
+    p.add_argument("--timeout", type=float, default=2.0,
+                   help="seconds to wait for each drive, share or file (default: 2)")
+    p.add_argument("--all", action="store_true", help="also list pins that are fine")
+
+    p = add("repair", cmd_repair, "suggest Start Menu replacements for pins whose target is gone")
+    p.add_argument("--snapshot", help="snapshot id (default: the backup mirror)")
+    p.add_argument("--root", action="append", type=Path,
+                   help="Start Menu folder to search, repeatable (default: user and all users)")
+    p.add_argument("--timeout", type=float, default=2.0,
+                   help="seconds to wait for each drive, share or file (default: 2)")
+
+    p = add("list", cmd_list, "list snapshots, or the shortcuts of one")
+    p.add_argument("--snapshot", help="show the shortcuts of this snapshot")
+
+    add("dedupe", cmd_dedupe, "show pins that launch the same target", source=True)
+
+    p = add("search", cmd_search, "find pins by name or target across all snapshots")
+    p.add_argument("text", nargs="+", help="words to look for (substring, any case)")
+    p.add_argument("--limit", type=int, default=50)
+
+    p = add("screenshots", cmd_screenshots, "list archived screenshots or export one as PNG")
+    p.add_argument("--export", metavar="ID", help="rebuild this screenshot from its tiles")
+    p.add_argument("--output", help="file to write (default: ID.png)")
+    p.add_argument("--gc", action="store_true", help="delete tiles no screenshot uses")
+
+    p = add("timelapse", cmd_timelapse, "record the screen for a while and save the frames that changed")
+    p.add_argument("--duration", type=float, default=300.0, help="seconds to record (default: 300)")
+    p.add_argument("--interval", type=float, default=5.0, help="seconds between grabs (default: 5)")
+    p.add_argument("--frames", type=int, default=20, help="changed frames to keep (default: 20)")
+    p.add_argument("--reduce", type=int, default=2,
+                   help="store frames at 1/N of the screen size (default: 2)")
+    p.add_argument("--taskbar", action="store_true", help="record just the taskbar strip")
+    where = p.add_mutually_exclusive_group()
+    where.add_argument("--output", help="folder for the PNG frames (default: timelapse/<time> "
+                                        "in the backup folder)")
+    where.add_argument("--archive", action="store_true",
+                       help="add the frames to the screenshot tile archive instead")
+
+    p = add("check-taskbar", cmd_check_taskbar,
+            "compare the taskbar on screen with the picture stored with a snapshot")
+    p.add_argument("--snapshot", help="snapshot id (default: latest)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
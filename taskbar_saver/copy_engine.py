@@ -0,0 +1,336 @@
+import os
+import sys
+import stat
+import errno
+import queue
+import shutil
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# Copies are I/O bound (and mostly latency bound on network profiles),
+# so more workers than cores is fine.
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+BUFFER_SIZE = 1024 * 1024
+
+# copy_many() keeps at most workers * WINDOW_PER_WORKER copies queued
+WINDOW_PER_WORKER = 4
+
+# Linux FICLONE ioctl (btrfs, xfs with reflink=1, ...)
+FICLONE = 0x40049409
+
+# Errors that mean "this strategy does not work here", as opposed to a real
+# failure of the copy (permissions, missing source, disk full, ...).
+UNSUPPORTED_ERRNOS = {
+    errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.ENOTTY,
+    errno.EPERM, errno.EMLINK, getattr(errno, "EOPNOTSUPP", errno.EINVAL),
+    getattr(errno, "ENOTSUP", errno.EINVAL), getattr(errno, "EBADF", errno.EINVAL),
+}
+
+
+_SKIPPED = object()
+
+
+class StrategyUnsupported(Exception):
+    pass
+
+
+# ---- strategies -------------------------------------------------------------
+# Each takes open file objects (or paths for hardlink) and either copies the
+# whole file or raises StrategyUnsupported before anything was written.
+
+def _stat_or_none(path):
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
+
+
+def _hardlink(src, dst):
+    if os.path.lexists(dst):
+        os.unlink(dst)
+    try:
+        os.link(src, dst)
+    except OSError as e:
+        if e.errno in UNSUPPORTED_ERRNOS:
+            raise StrategyUnsupported(str(e))
+        raise
+
+
+def _reflink(fsrc, fdst, size):
+    if not sys.platform.startswith("linux"):
+        raise StrategyUnsupported("reflink needs Linux FICLONE")
+    import fcntl
+    try:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    except OSError as e:
+        if e.errno in UNSUPPORTED_ERRNOS:
+            raise StrategyUnsupported(str(e))
+        raise
+
+
+def _copy_file_range(fsrc, fdst, size):
+    if not hasattr(os, "copy_file_range"):
+        raise StrategyUnsupported("os.copy_file_range not available")
+    copied = 0
+    while copied < size:
+        try:
+            n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), size - copied)
+        except OSError as e:
+            if copied == 0 and e.errno in UNSUPPORTED_ERRNOS:
+                raise StrategyUnsupported(str(e))
+            raise
+        if n == 0:
+            break
+        copied += n
+    if copied == 0 and size:
+        raise StrategyUnsupported("copy_file_range copied nothing")
+
+
+def _sendfile(fsrc, fdst, size):
+    if not hasattr(os, "sendfile") or sys.platform == "win32":
+        raise StrategyUnsupported("os.sendfile not available")
+    offset = 0
+    while offset < size:
+        try:
+            n = os.sendfile(fdst.fileno(), fsrc.fileno(), offset, size - offset)
+        except OSError as e:
+            if offset == 0 and e.errno in UNSUPPORTED_ERRNOS:
+                raise StrategyUnsupported(str(e))
+            raise
+        if n == 0:
+            break
+        offset += n
+
+
+def _buffered(fsrc, fdst, size):
+    shutil.copyfileobj(fsrc, fdst, BUFFER_SIZE)
+
+
+KERNEL_STRATEGIES = {
+    "reflink": _reflink,
+    "copy_file_range": _copy_file_range,
+    "sendfile": _sendfile,
+    "buffered": _buffered,
+}
+STRATEGIES = ("hardlink",) + tuple(KERNEL_STRATEGIES)
+
+
+class CopyReport:
+    def __init__(self):
+        self.copied = []
+        self.errors = []
+        self.strategies = Counter()
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def __len__(self):
+        return len(self.copied)
+
+    def strategy_summary(self):
+        return ", ".join(f"{name} x{count}" for name, count in self.strategies.most_common())
+
+
+class CopyEngine:
+    """
+    Bounded thread-pool used for every bulk copy (backup, snapshot blobs,
+    restore). The pool is created on first use and reused across operations.
+
+    Each file is copied with the cheapest strategy that works between the two
+    filesystems: a hardlink when the caller says the source is immutable,
+    then reflink, copy_file_range, sendfile and finally a buffered copy. The
+    first strategy that works for a (source device, target device) pair is
+    remembered so later files skip the probing.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, copy_func=None, strategy="auto"):
+        self.workers = max(1, int(workers))
+        self.copy_func = copy_func
+        self.strategy = strategy
+        self._pool = None
+        self._lock = threading.Lock()
+        self._working = {}
+        self._dir_devs = {}
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers,
+                                                thread_name_prefix="copy")
+            return self._pool
+
+    def set_workers(self, workers):
+        # The pool is rebuilt lazily with the new size on the next batch
+        with self._lock:
+            self.workers = max(1, int(workers))
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+    def _dir_dev(self, path):
+        # One stat per target folder instead of one per copied file
+        dev = self._dir_devs.get(path)
+        if dev is None:
+            dev = self._dir_devs[path] = os.stat(path).st_dev
+        return dev
+
+    def _candidates(self, key, strategy, immutable):
+        if strategy != "auto":
+            return [strategy]
+        order = list(KERNEL_STRATEGIES)
+        if immutable:
+            order.insert(0, "hardlink")
+        known = self._working.get((key, immutable))
+        if known in order:
+            order.remove(known)
+            order.insert(0, known)
+        return order
+
+    def copy_file(self, src, dst, strategy=None, immutable=False, preserve_stat=True):
+        """
+        Copy one file like shutil.copy2 and return the name of the strategy
+        that did the work. immutable=True allows hardlinking, which is only
+        safe when neither side will ever be modified in place.
+        """
+        strategy = strategy or self.strategy
+        src, dst = os.fspath(src), os.fspath(dst)
+        dst_st = _stat_or_none(dst)
+        if dst_st is not None and stat.S_ISDIR(dst_st.st_mode):
+            dst = os.path.join(dst, os.path.basename(src))
+            dst_st = _stat_or_none(dst)
+        st = os.stat(src)
+        key = (st.st_dev, self._dir_dev(os.path.dirname(os.path.abspath(dst))))
+
+        last_error = None
+        for name in self._candidates(key, strategy, immutable):
+            if name == "hardlink":
+                if key[0] != key[1]:
+                    continue
+                try:
+                    _hardlink(src, dst)
+                except StrategyUnsupported as e:
+                    last_error = e
+                    continue
+            else:
+                # Never write through a hardlink into a shared blob
+                if dst_st is not None and dst_st.st_nlink > 1:
+                    os.unlink(dst)
+                    dst_st = None
+                try:
+                    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                        KERNEL_STRATEGIES[name](fsrc, fdst, st.st_size)
+                except StrategyUnsupported as e:
+                    last_error = e
+                    continue
+                if preserve_stat:
+                    # copystat() would stat src again; times and mode are
+                    # all a shortcut carries
+                    os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+                    os.chmod(dst, stat.S_IMODE(st.st_mode))
+            self._working[(key, immutable)] = name
+            return name
+
+        raise OSError(f"No copy strategy worked for {src}: {last_error}")
+
+    def copy_many(self, pairs, log=None, copy_func=None, immutable=False, job=None, total=None):
+        """
+        Copy every (src, dst) pair. Failures are collected per file in the
+        report and, if log is given, written to it as they happen. A custom
+        copy_func may return the strategy name it used for the report.
+
+        pairs may be a generator: it is consumed as the copies go, with at
+        most workers * WINDOW_PER_WORKER copies queued, so the first copies
+        start while the caller is still producing pairs and memory does not
+        grow with the batch.
+
+        job (see jobs.Job) receives progress after each file when the number
+        of pairs is known (len(pairs) or total); once it is cancelled the
+        remaining copies are skipped and job.check() raises.
+        """
+        func = copy_func or self.copy_func
+        if func is None:
+            func = lambda src, dst: self.copy_file(src, dst, immutable=immutable)
+        report = CopyReport()
+        if total is None and hasattr(pairs, "__len__"):
+            total = len(pairs)
+        self._dir_devs.clear()  # folders may have been remounted since the last batch
+        if job is not None:
+            inner = func
+
+            def func(src, dst):
+                if job.is_cancelled():
+                    return _SKIPPED
+                return inner(src, dst)
+
+        def done(src, dst, used):
+            if used is _SKIPPED:
+                return
+            report.copied.append((src, dst))
+            report.strategies[used if isinstance(used, str) else "custom"] += 1
+            if job is not None and total:
+                job.progress(len(report.copied), total)
+
+        def failed(src, e):
+            report.errors.append((src, e))
+            if log:
+                log(f"Failed to copy {src}: {e}")
+
+        if self.workers == 1 or (hasattr(pairs, "__len__") and len(pairs) == 1):
+            for src, dst in pairs:
+                try:
+                    done(src, dst, func(src, dst))
+                except Exception as e:
+                    failed(src, e)
+            if job is not None:
+                job.check()
+            return report
+
+        pool = self._executor()
+        window = self.workers * WINDOW_PER_WORKER
+        running = {}
+        finished = queue.SimpleQueue()  # futures in completion order
+
+        def collect(fut):
+            src, dst = running.pop(fut)
+            try:
+                done(src, dst, fut.result())
+            except Exception as e:
+                failed(src, e)
+
+        try:
+            for src, dst in pairs:
+                while len(running) >= window:
+                    collect(finished.get())
+                fut = pool.submit(func, src, dst)
+                running[fut] = (src, dst)
+                fut.add_done_callback(finished.put)
+        finally:
+            # Also when the producer raised (e.g. a cancelled job): never
+            # return while copies are still writing
+            while running:
+                collect(finished.get())
+        if job is not None:
+            job.check()
+        return report
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+
+_default_engine = None
+_default_lock = threading.Lock()
+
+
+def get_engine():
+    """Shared engine so backup, snapshot and restore reuse one pool."""
+    global _default_engine
+    with _default_lock:
+        if _default_engine is None:
+            _default_engine = CopyEngine()
+        return _default_engine
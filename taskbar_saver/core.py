@@ -0,0 +1,359 @@
+"""
+UI-free backup operations shared by the GUI and the command line.
+
+Nothing here imports tkinter, ttkbootstrap or Pillow, and no path is derived
+at import time: every function takes its source and destination folders as
+arguments, with default_taskbar_dir() / default_backup_dir() for callers that
+want the usual Windows locations.
+"""
+import os
+import time
+from pathlib import Path
+
+from taskbar_saver import dirsig
+from taskbar_saver.manifest import (MANIFEST_NAME, SyncResult, file_hash,
+                                    load_manifest, sync_backup)
+from taskbar_saver.snapshots import store_for
+from taskbar_saver.dedupe import find_duplicates
+from taskbar_saver.dirscan import scan
+from taskbar_saver.lnk_cache import cache_for
+from taskbar_saver.lnk import LnkError, parse_file
+
+TASKBAR_SUBDIR = r"Microsoft\Internet Explorer\Quick Launch\User Pinned\TaskBar"
+
+
+def default_taskbar_dir(appdata=None):
+    """The pinned taskbar folder of the current user, or None off Windows."""
+    appdata = appdata or os.getenv("APPDATA")
+    if not appdata:
+        return None
+    return Path(appdata) / TASKBAR_SUBDIR
+
+
+def default_backup_dir():
+    # Same default as the GUI: taskbar_backup next to the program
+    return Path(__file__).resolve().parent.parent / "taskbar_backup"
+
+
+def duplicate_pins(source_dir, log=None, cache=None, listing=None):
+    """
+    Names in source_dir to leave out of a backup because another pin launches
+    the same target with the same arguments (see dedupe.find_duplicates).
+    """
+    dupes = find_duplicates(source_dir, cache=cache, listing=listing)
+    if log:
+        for group in dupes.groups:
+            log(f"Skipping duplicate pin {', '.join(group.dropped)}: same target as "
+                f"{group.kept} (kept: {group.reason}).")
+    return dupes
+
+
+def backup(source_dir, backup_dir, log=None, job=None, snapshot=True, policy=dirsig.STRICT):
+    """
+    Incremental backup of source_dir into backup_dir, plus a history snapshot.
+    Pins that duplicate another pin's target are skipped. Returns
+    (SyncResult, Snapshot or None); result.duplicates holds the DedupeResult.
+    Parsed shortcut metadata is cached in the backup folder (lnk_cache.json).
+    Each folder is listed once (dirscan) and the listing is shared by the
+    duplicate filter, the mirror and the snapshot.
+
+    When the stored directory signature proves nothing changed (see dirsig
+    and its TrustPolicy), returns straight away with result.from_signature
+    set and result.duplicates None. policy=None always runs in full.
+    """
+    # Both taken before the listing, so a pin changed during the run never
+    # matches the signature recorded at the end
+    taken = time.time_ns()
+    source_mtime = dirsig.mtime(source_dir)
+    source = None
+    if policy is None or policy.check_entries:
+        source = scan(source_dir)  # needed either way
+    if policy is not None and dirsig.unchanged(source_dir, backup_dir, policy, snapshot,
+                                               source_mtime=source_mtime, listing=source):
+        result = SyncResult()
+        result.from_signature = True
+        result.duplicates = None
+        return result, (store_for(backup_dir).latest() if snapshot else None)
+
+    if source is None:
+        source = scan(source_dir)
+    existing = scan(backup_dir, stat=False)  # only the names are compared
+    cache = cache_for(backup_dir)
+    dupes = duplicate_pins(source_dir, log=log, cache=cache, listing=source)
+    skip = dupes.dropped.__contains__
+    result = sync_backup(source_dir, backup_dir, skip=skip, log=log, job=job,
+                         source=source, existing=existing)
+    result.duplicates = dupes
+    try:
+        cache.save()
+    except OSError as e:
+        # Only a speed-up: the next backup parses again
+        if log:
+            log(f"Could not save shortcut cache: {e}")
+    snap = None
+    if snapshot:
+        # No-op (returns the latest snapshot) when nothing changed
+        store = store_for(backup_dir)
+        snap = store.create(source_dir, skip=skip, log=log, job=job, listing=source,
+                            hashes=result.manifest)
+        if snap is not None and snap.fresh:
+            # An unchanged run hands back the latest snapshot, which is indexed
+            # already (or will be by the next search)
+            update_index(backup_dir, store=store, log=log, parsed=(snap.id, dupes.targets))
+    try:
+        # Only a complete run may vouch for the next one; a pin left out of the
+        # snapshot (failed blob copy) must be retried
+        pinned = {entry.name for entry in source if not skip(entry.name)}
+        if result.errors or (snapshot and (snap is None or set(snap.files) != pinned)):
+            dirsig.forget(backup_dir)
+        else:
+            dirsig.record(source_dir, backup_dir, source_mtime, source, taken,
+                          mirror=result.manifest, latest=snap.id if snap else None)
+    except OSError as e:
+        if log:
+            log(f"Could not save the folder signature: {e}")
+    return result, snap
+
+
+def update_index(backup_dir, store=None, log=None, parsed=None):
+    """Add new snapshots to the search index (pin_index.sqlite); cheap when up to date."""
+    # Only search needs SQLite, keep it out of every other code path
+    import sqlite3
+    from taskbar_saver.pin_index import index_for
+
+    store = store or store_for(backup_dir)
+    try:
+        with index_for(backup_dir) as index:
+            return index.update(store, log=log, parsed=parsed)
+    except sqlite3.Error as e:
+        # Search is a convenience: a broken index must not fail the backup
+        if log:
+            log(f"Could not update the search index: {e}")
+        return 0, 0
+
+
+def search(backup_dir, text, limit=50, log=None):
+    """Pins in any snapshot whose name or target contains text. Returns [SearchHit]."""
+    from taskbar_saver.pin_index import index_for
+
+    update_index(backup_dir, log=log)
+    with index_for(backup_dir) as index:
+        return index.search(text, limit=limit)
+
+
+def restore(backup_dir, dest_dir, snapshot_id=None, log=None, job=None, replace=True):
+    """
+    Restore shortcuts into dest_dir from a snapshot (latest by default) or,
+    when the backup has no history yet, from the mirrored .lnk files.
+    Returns the CopyReport.
+    """
+    store = store_for(backup_dir)
+    snap = store.open(snapshot_id) if snapshot_id else store.latest()
+    if snap is None:
+        # Older backups without history: make a snapshot of the mirror first
+        snap = store.create(backup_dir, log=log, job=job)
+    return store.restore(snap, dest_dir, replace=replace, log=log, job=job)
+
+
+def export_metadata(backup_dir, snapshot_id=None, log=None):
+    """
+    {name: record} for the shortcuts of a snapshot (latest by default, or the
+    mirror when there is no history), for lnk_writer.from_record(). Shortcuts
+    that cannot be parsed are left out and logged.
+    """
+    from taskbar_saver.lnk_writer import to_record
+
+    store = store_for(backup_dir)
+    snap = store.open(snapshot_id) if snapshot_id else store.latest()
+    if snap is not None:
+        paths = {name: snap.blob_path(name) for name in snap.names()}
+    else:
+        paths = {p.name: p for p in sorted(Path(backup_dir).glob("*.lnk"))}
+    records = {}
+    for name, path in paths.items():
+        try:
+            records[name] = to_record(parse_file(path))
+        except (LnkError, OSError) as e:
+            if log:
+                log(f"Skipping {name}: {e}")
+    return records
+
+
+def restore_metadata(records, dest_dir, log=None, job=None):
+    """
+    Write shortcuts regenerated from {name: record} into dest_dir, leaving
+    other files there alone. Returns (written, errors).
+    """
+    from taskbar_saver.lnk_writer import write_many
+
+    written, errors = write_many(records, dest_dir, log=log, job=job)
+    if log:
+        log(f"Wrote {len(written)} shortcuts from metadata to {dest_dir}")
+    return written, errors
+
+
+class DiffResult:
+    def __init__(self):
+        self.added = []      # pinned now, not in the backup
+        self.removed = []    # in the backup, no longer pinned
+        self.changed = []    # same name, different content
+
+    @property
+    def clean(self):
+        return not (self.added or self.removed or self.changed)
+
+
+def diff(source_dir, backup_dir):
+    """Compare the pinned folder with the backup without writing anything."""
+    backup_dir = Path(backup_dir)
+    manifest = load_manifest(backup_dir)
+    source = scan(source_dir)
+    backed_up = scan(backup_dir, stat=False).names()
+
+    result = DiffResult()
+    pinned = set()
+    # Read-only use of the cache: diff never writes to the backup
+    skip = find_duplicates(source_dir, cache=cache_for(backup_dir), listing=source).dropped
+    for entry in source.sorted():
+        name = entry.name
+        if name in skip:
+            continue
+        pinned.add(name)
+        if name not in backed_up:
+            result.added.append(name)
+            continue
+        st = entry.stat()
+        prev = manifest.get(name)
+        if prev and prev["size"] == st.st_size and prev["mtime_ns"] == st.st_mtime_ns:
+            continue
+        expected = prev["sha256"] if prev else file_hash(backup_dir / name)
+        if file_hash(entry.path) != expected:
+            result.changed.append(name)
+    result.removed = sorted(backed_up - pinned)
+    return result
+
+
+def verify(backup_dir):
+    """
+    Re-hash the backup mirror and every snapshot blob. Returns a list of
+    (where, name, problem) tuples; empty means the backup is intact.
+    """
+    backup_dir = Path(backup_dir)
+    problems = []
+
+    for name, entry in load_manifest(backup_dir).items():
+        path = backup_dir / name
+        if not path.exists():
+            problems.append((MANIFEST_NAME, name, "missing"))
+        elif file_hash(path) != entry["sha256"]:
+            problems.append((MANIFEST_NAME, name, "hash mismatch"))
+
+    store = store_for(backup_dir)
+    checked = {}
+    for snap in store.list():
+        for name, entry in snap.files.items():
+            digest = entry["sha256"]
+            if digest not in checked:
+                blob = store.blob_path(digest)
+                if not blob.exists():
+                    checked[digest] = "missing blob"
+                elif file_hash(blob) != digest:
+                    checked[digest] = "corrupt blob"
+                else:
+                    checked[digest] = None
+            if checked[digest]:
+                problems.append((snap.id, name, checked[digest]))
+    return problems
+
+
+def validate(backup_dir, snapshot_id=None, timeout=None):
+    """
+    Check whether the pins in a snapshot (or, without snapshot_id, the backup
+    mirror) still point at existing files, giving each up to timeout seconds
+    (validate.DEFAULT_TIMEOUT by default). Returns a ValidationReport.
+    """
+    # Loaded on first use, like the rest of the validate/repair path
+    from taskbar_saver.validate import (DEFAULT_TIMEOUT, validate_folder,
+                                        validate_snapshot)
+
+    if timeout is None:
+        timeout = DEFAULT_TIMEOUT
+    if snapshot_id:
+        return validate_snapshot(store_for(backup_dir).open(snapshot_id), timeout=timeout)
+    return validate_folder(backup_dir, timeout=timeout)
+
+
+def suggest_repairs(backup_dir, snapshot_id=None, roots=None, timeout=None,
+                    log=None):
+    """
+    Validate the backup (or a snapshot) and, for every pin whose target is
+    gone, look for a replacement in the Start Menu. The Start Menu index is
+    refreshed incrementally and kept in the backup folder. Returns
+    [(PinCheck, Replacement or None)].
+    """
+    from taskbar_saver.catalogue import catalogue_for
+
+    report = validate(backup_dir, snapshot_id=snapshot_id, timeout=timeout)
+    broken = report.broken
+    if not broken:
+        return []
+    catalogue = catalogue_for(backup_dir, roots=roots).scan()
+    if log:
+        log(f"Start Menu index: {len(catalogue)} shortcuts, {catalogue.parsed} read this time.")
+    try:
+        catalogue.save()
+    except OSError as e:
+        if log:
+            log(f"Could not save Start Menu index: {e}")
+    return [(check, catalogue.suggest(check.name, check.link)) for check in broken]
+
+
+def record_taskbar(backup_dir, snapshot_id, img=None):
+    """
+    Store a reference of the taskbar as it looks now (or of img, a capture of
+    the strip) with a snapshot, for check_taskbar() after a restore. Needs
+    Pillow and NumPy, and a desktop session unless img is given.
+    """
+    # The taskbar check is optional; the GUI must not pay for it at startup
+    from taskbar_saver.taskbar_check import TaskbarReference, grab_taskbar, references_for
+
+    if img is None:
+        img = grab_taskbar()
+        try:
+            ref = TaskbarReference.from_image(img)
+        finally:
+            img.close()
+    else:
+        ref = TaskbarReference.from_image(img)
+    references_for(backup_dir).save(snapshot_id, ref)
+    return ref
+
+
+def check_taskbar(backup_dir, snapshot_id=None, img=None):
+    """
+    Compare the taskbar as it looks now (or img) with the reference stored
+    with a snapshot (latest by default). Returns (snapshot id,
+    TaskbarComparison); KeyError when the snapshot has no reference.
+    """
+    from taskbar_saver.taskbar_check import grab_taskbar, references_for
+
+    if snapshot_id is None:
+        ids = store_for(backup_dir).ids()
+        if not ids:
+            raise KeyError("No snapshots yet")
+        snapshot_id = ids[-1]
+    ref = references_for(backup_dir).load(snapshot_id)
+    if ref is None:
+        raise KeyError(f"Snapshot {snapshot_id} has no taskbar reference "
+                       f"(back up with --capture-taskbar or from the window)")
+    if img is None:
+        img = grab_taskbar()
+        try:
+            return snapshot_id, ref.compare(img)
+        finally:
+            img.close()
+    return snapshot_id, ref.compare(img)
+
+
+def list_snapshots(backup_dir):
+    return store_for(backup_dir).list()
@@ -0,0 +1,97 @@
+import re
+
+from taskbar_saver.dirscan import scan
+from taskbar_saver.lnk import LnkError, parse_file
+
+# "App (2).lnk", "App - Copy.lnk", "App - Copy (3).lnk": names Explorer gives
+# to copies. Only used to decide which file of a group to keep.
+COPY_SUFFIX = re.compile(r"(\s\(\d+\)|\s-\s[^.]*\bcopy\b[^.]*)\.lnk$", re.IGNORECASE)
+
+
+def pin_key(link):
+    """What makes two pins the same: the target they launch and its arguments."""
+    target = link.target
+    if not target:
+        return None
+    target = target.replace("/", "\\").rstrip("\\").casefold()
+    arguments = " ".join((link.arguments or "").split()).casefold()
+    return target, arguments
+
+
+def link_fields(link):
+    """(target, arguments, working_dir, description): what a pin launches."""
+    return link.target, link.arguments, link.working_dir, link.name
+
+
+class DuplicateGroup:
+    def __init__(self, key, kept, dropped, reason):
+        self.key = key
+        self.kept = kept
+        self.dropped = dropped
+        self.reason = reason
+
+    def __repr__(self):
+        return f"<DuplicateGroup kept={self.kept!r} dropped={self.dropped!r} ({self.reason})>"
+
+
+class DedupeResult:
+    def __init__(self):
+        self.groups = []
+        self.unparsed = []  # shortcuts we could not read; always kept
+        self.targets = {}   # name -> link_fields() of every shortcut parsed
+
+    @property
+    def dropped(self):
+        return {name for group in self.groups for name in group.dropped}
+
+
+def _choose(entries):
+    """
+    Pick the file to keep from [(name, mtime_ns)] and say why: a name
+    without a copy suffix first, then the shortest name, then the oldest.
+    """
+    plain = [e for e in entries if not COPY_SUFFIX.search(e[0])]
+    if len(plain) == 1:
+        return plain[0][0], "only name without a copy suffix"
+    pool = plain or entries
+    shortest = min(len(e[0]) for e in pool)
+    pool_short = [e for e in pool if len(e[0]) == shortest]
+    if len(pool_short) == 1:
+        return pool_short[0][0], "shortest name"
+    oldest = min(pool_short, key=lambda e: (e[1], e[0]))
+    return oldest[0], "oldest file"
+
+
+def find_duplicates(folder, parse=parse_file, cache=None, listing=None):
+    """
+    One pass over folder: parse every .lnk, index it by pin_key() and report
+    each group of shortcuts that launch the same thing. Shortcuts that cannot
+    be parsed are never treated as duplicates. With an LnkCache, unchanged
+    shortcuts are not read again; listing (dirscan.scan(folder)) saves
+    listing the folder when the caller already did.
+    """
+    index = {}
+    result = DedupeResult()
+    if listing is None:
+        listing = scan(folder)
+    for entry in listing:
+        try:
+            link = cache.parse(entry) if cache is not None else parse(entry.path)
+            key = pin_key(link)
+            mtime = entry.stat().st_mtime_ns
+        except (LnkError, OSError):
+            key = None
+        if key is None:
+            result.unparsed.append(entry.name)
+            continue
+        result.targets[entry.name] = link_fields(link)
+        index.setdefault(key, []).append((entry.name, mtime))
+
+    for key, entries in index.items():
+        if len(entries) < 2:
+            continue
+        kept, reason = _choose(entries)
+        dropped = sorted(name for name, _ in entries if name != kept)
+        result.groups.append(DuplicateGroup(key, kept, dropped, reason))
+    result.groups.sort(key=lambda g: g.kept.casefold())
+    return result
@@ -0,0 +1,75 @@
+"""
+One os.scandir() pass per folder, shared by every stage of a backup.
+
+scan() lists the .lnk files of a folder once and stat()s each of them once.
+The DirEntry objects keep that stat result (on Windows it comes free with the
+directory listing), so duplicate filtering, the manifest comparison and the
+snapshot can all read size, mtime and inode without going back to the disk.
+
+COUNTERS counts the scandir and stat calls made here; benchmarks/
+bench_syscalls.py counts every file system call of a whole backup.
+"""
+import os
+from collections import Counter
+from pathlib import Path
+
+COUNTERS = Counter()
+
+
+class DirListing:
+    """The .lnk files of one folder: name -> os.DirEntry with its stat cached."""
+
+    def __init__(self, path, entries):
+        self.path = Path(path)
+        self.entries = entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, name):
+        return name in self.entries
+
+    def __iter__(self):
+        return iter(self.entries.values())
+
+    def names(self):
+        return set(self.entries)
+
+    def get(self, name):
+        return self.entries.get(name)
+
+    def sorted(self):
+        return [self.entries[name] for name in sorted(self.entries)]
+
+    def drop(self, name):
+        # Keep the listing true after the caller deleted a file
+        self.entries.pop(name, None)
+
+
+def scan(path, suffix=".lnk", stat=True):
+    """
+    DirListing of the regular files in path whose name ends with suffix
+    (case-insensitive). A missing folder gives an empty listing. stat=False
+    skips the stat() when only the names are needed.
+    """
+    entries = {}
+    COUNTERS["scandir"] += 1
+    try:
+        it = os.scandir(path)
+    except FileNotFoundError:
+        return DirListing(path, entries)
+    suffix = suffix.lower()
+    with it:
+        for entry in it:
+            if not entry.name.lower().endswith(suffix):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                if stat:
+                    COUNTERS["stat"] += 1
+                    entry.stat()  # cached on the entry from here on
+            except OSError:
+                continue
+            entries[entry.name] = entry
+    return DirListing(path, entries)
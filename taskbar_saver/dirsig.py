@@ -0,0 +1,233 @@
+"""
+Persisted signature of the pinned folder, so a backup with nothing to do can
+stop after a few stat() calls instead of listing both folders.
+
+After a complete backup, record() stores the pinned folder's mtime (taken
+before it was listed), a digest of the (name, size, mtime_ns) of its .lnk
+files, and the mtimes of the backup folder and its snapshot folder.
+unchanged() compares the live folders against it under a TrustPolicy:
+
+- Adding, removing or renaming a pin changes the folder mtime. Editing a
+  pin in place does not, so the default policy also compares the entry
+  digest (one scandir; the stats come with it on Windows).
+- A change made within the same mtime tick as the recorded one is invisible,
+  so a signature is only trusted when everything it recorded was already
+  `margin` old when it was taken. When every recorded mtime is a whole
+  second (FAT, SMB, HFS+ or some network shares) the margin is widened to
+  cover 2 second granularity and FAT's rounding up.
+
+The backup folder is written by the backup itself, so its mtimes are
+always fresh when recorded. While they are within the margin, the next run
+checks the mirror's file names and the latest snapshot id instead (one
+scandir of each folder, no stat) and then marks the signature as checked.
+
+Any doubt (missing or torn file, other source folder, clock gone backwards)
+means a full backup, which records a fresh signature.
+"""
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from taskbar_saver.dirscan import scan
+from taskbar_saver.snapshots import id_order, store_for
+
+SIGNATURE_NAME = "dir_signature.json"
+SIGNATURE_VERSION = 1
+
+FINE_MARGIN_NS = 1_000_000_000    # covers exFAT (10 ms) and coarse kernel clocks
+COARSE_MARGIN_NS = 4_000_000_000  # two ticks of FAT's 2 s, which rounds up
+
+
+class TrustPolicy:
+    """
+    When a stored signature may stand in for a full backup run.
+
+    check_entries compares the digest of the pinned files; without it only the
+    folder mtimes are compared and an in-place edit of a pin is picked up by
+    the first full run after max_age seconds. margin_ns overrides the margin
+    derived from the recorded mtimes.
+    """
+
+    def __init__(self, check_entries=True, max_age=None, margin_ns=None):
+        self.check_entries = check_entries
+        self.max_age = max_age
+        self.margin_ns = margin_ns
+
+
+STRICT = TrustPolicy()
+QUICK = TrustPolicy(check_entries=False, max_age=24 * 3600)
+
+
+def entries_digest(listing):
+    h = hashlib.sha256()
+    for entry in listing.sorted():
+        st = entry.stat()
+        h.update(f"{entry.name}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8", "surrogatepass"))
+    return h.hexdigest()
+
+
+def margin_for(mtimes):
+    """Racy-clean margin for a set of mtime_ns values."""
+    if any(m % 1_000_000_000 == 0 for m in mtimes):
+        return COARSE_MARGIN_NS
+    return FINE_MARGIN_NS
+
+
+def names_digest(names):
+    return hashlib.sha256("\0".join(sorted(names)).encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def mtime(path):
+    """mtime_ns of path, or None."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _backup_dirs(backup_dir):
+    return [Path(backup_dir), store_for(backup_dir).snapshot_dir]
+
+
+def _latest_snapshot(backup_dir):
+    ids = scan(store_for(backup_dir).snapshot_dir, suffix=".json", stat=False).names()
+    return max((name[:-len(".json")] for name in ids), key=id_order) if ids else None
+
+
+class DirSignature:
+    def __init__(self, data):
+        self.source = data.get("source")
+        self.source_mtime = data.get("source_mtime")
+        self.entries = data.get("entries")
+        self.newest = data.get("newest")      # newest mtime_ns among the pins
+        self.backup_mtimes = data.get("backup_mtimes", [])
+        self.mirror = data.get("mirror")      # names_digest of the mirrored .lnk files
+        self.latest = data.get("latest")      # latest snapshot id
+        self.taken = data.get("taken")
+        self.checked = data.get("checked")    # when backup_mtimes were last confirmed
+        self.snapshot = data.get("snapshot", False)
+
+    def to_dict(self):
+        return {"version": SIGNATURE_VERSION, "source": self.source,
+                "source_mtime": self.source_mtime, "entries": self.entries,
+                "newest": self.newest, "backup_mtimes": self.backup_mtimes,
+                "mirror": self.mirror, "latest": self.latest, "taken": self.taken,
+                "checked": self.checked, "snapshot": self.snapshot}
+
+    def racy(self, margin_ns=None):
+        # A change in the same tick as a recorded mtime would not show
+        mtimes = [self.source_mtime] + ([self.newest] if self.newest is not None else [])
+        margin = margin_ns if margin_ns is not None else margin_for(mtimes)
+        return self.taken - max(mtimes) < margin
+
+    def backup_racy(self, margin_ns=None):
+        mtimes = [m for m in self.backup_mtimes if m is not None]
+        if not mtimes:
+            return False
+        margin = margin_ns if margin_ns is not None else margin_for(mtimes)
+        return self.checked is None or self.checked - max(mtimes) < margin
+
+    def trusted(self, policy, now=None):
+        if self.taken is None or self.source_mtime is None:
+            return False
+        now = time.time_ns() if now is None else now
+        if now < self.taken:
+            return False
+        if policy.max_age is not None and now - self.taken > policy.max_age * 1_000_000_000:
+            return False
+        return not self.racy(policy.margin_ns)
+
+
+def load(backup_dir):
+    """The stored DirSignature, or None."""
+    try:
+        with open(Path(backup_dir) / SIGNATURE_NAME, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != SIGNATURE_VERSION:
+        return None
+    return DirSignature(data)
+
+
+def unchanged(source_dir, backup_dir, policy=STRICT, snapshot=True, source_mtime=None,
+              listing=None):
+    """
+    True when the stored signature proves that a backup of source_dir would
+    change nothing: a couple of stat() calls, plus one scandir of source_dir
+    when policy.check_entries. A caller that already has the folder's mtime
+    or listing can pass them in.
+    """
+    sig = load(backup_dir)
+    if sig is None or sig.source != str(Path(source_dir).resolve()):
+        return False
+    if snapshot and not sig.snapshot:
+        return False
+    if not sig.trusted(policy):
+        return False
+    if (source_mtime or mtime(source_dir)) != sig.source_mtime:
+        return False
+    if [mtime(p) for p in _backup_dirs(backup_dir)] != sig.backup_mtimes:
+        return False
+    if policy.check_entries and entries_digest(listing or scan(source_dir)) != sig.entries:
+        return False
+    if sig.backup_racy(policy.margin_ns):
+        checked = time.time_ns()
+        if names_digest(scan(backup_dir, stat=False).names()) != sig.mirror:
+            return False
+        if sig.snapshot and _latest_snapshot(backup_dir) != sig.latest:
+            return False
+        sig.checked = checked
+        _write(backup_dir, sig)
+    return True
+
+
+def _write(backup_dir, sig):
+    # Rewritten in place: the file already exists, so the backup folder's
+    # mtime does not change. A torn write only costs a full backup next time.
+    try:
+        with open(Path(backup_dir) / SIGNATURE_NAME, "w", encoding="utf-8") as f:
+            json.dump(sig.to_dict(), f, indent=1)
+    except OSError:
+        pass
+
+
+def record(source_dir, backup_dir, source_mtime, listing, taken, mirror, latest=None):
+    """
+    Store the signature after a complete backup. source_mtime and taken must
+    come from before listing was made, so a pin changed during the backup
+    never matches. mirror is the names of the backed-up shortcuts and latest
+    the id of the latest snapshot (None for a mirror-only run). The backup
+    folder mtimes are read last.
+    """
+    path = Path(backup_dir) / SIGNATURE_NAME
+    sig = DirSignature({
+        "source": str(Path(source_dir).resolve()),
+        "source_mtime": source_mtime,
+        "entries": entries_digest(listing),
+        "newest": max((e.stat().st_mtime_ns for e in listing), default=None),
+        "mirror": names_digest(mirror),
+        "latest": latest,
+        "taken": taken,
+        "snapshot": latest is not None,
+    })
+    # Create the file first and then rewrite it in place, so the folder
+    # mtime recorded here stays valid
+    if not path.exists():
+        path.touch()
+    checked = time.time_ns()
+    sig.backup_mtimes = [mtime(p) for p in _backup_dirs(backup_dir)]
+    sig.checked = checked
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(sig.to_dict(), f, indent=1)
+    return sig
+
+
+def forget(backup_dir):
+    """Drop the signature, so the next backup runs in full."""
+    try:
+        (Path(backup_dir) / SIGNATURE_NAME).unlink()
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,174 @@
+import queue
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+POLL_MS = 50
+MAX_EVENTS = 500    # handled per poll, the rest waits for the next one
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """
+    Handle passed to a running job. Everything it reports goes through the
+    runner's queue, so it is safe to call from the worker thread.
+    """
+
+    def __init__(self, runner, name):
+        self.runner = runner
+        self.name = name
+        self._cancel = threading.Event()
+        self.future = None
+
+    def log(self, msg):
+        self.runner._events.put(("log", self, msg))
+
+    def progress(self, done, total):
+        self.runner._events.put(("progress", self, (done, total)))
+
+    def cancel(self):
+        self._cancel.set()
+
+    def is_cancelled(self):
+        return self._cancel.is_set()
+
+    def check(self):
+        # Called by long loops between files
+        if self._cancel.is_set():
+            raise JobCancelled(self.name)
+
+
+class JobRunner:
+    """
+    Runs filesystem and encode work off the Tk main thread.
+
+    Jobs run one at a time on a single worker thread, so two backups can never
+    overlap. Log lines, progress and completion are queued by the worker and
+    delivered on the Tk thread by a master.after() poll, which is the only
+    place the callbacks are invoked.
+    """
+
+    def __init__(self, master, on_log=None, on_progress=None, on_busy=None, poll_ms=POLL_MS):
+        self.master = master
+        self.on_log = on_log
+        self.on_progress = on_progress
+        self.on_busy = on_busy
+        self.poll_ms = poll_ms
+        self._events = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job")
+        self._active = []
+        self._closed = False
+        self.master.after(self.poll_ms, self._drain)
+
+    def submit(self, func, *args, name="Job", on_done=None):
+        """
+        Run func(job, *args) on the worker. on_done(result) is called on the Tk
+        thread if the job finishes without being cancelled or failing.
+        """
+        job = Job(self, name)
+        self._active.append(job)
+        if self.on_busy and len(self._active) == 1:
+            self.on_busy(True)
+
+        def run():
+            try:
+                result = func(job, *args)
+            except JobCancelled:
+                self._events.put(("cancelled", job, None))
+            except Exception as e:
+                traceback.print_exc()
+                self._events.put(("failed", job, e))
+            else:
+                self._events.put(("done", job, (result, on_done)))
+
+        job.future = self._pool.submit(run)
+        return job
+
+    def post(self, func, *args):
+        """Run func(*args) on the Tk thread. Safe to call from any thread."""
+        self._events.put(("call", None, (func, args)))
+
+    @property
+    def busy(self):
+        return bool(self._active)
+
+    def cancel_all(self):
+        for job in self._active:
+            job.cancel()
+
+    def shutdown(self):
+        self._closed = True
+        self.cancel_all()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _finish(self, job):
+        if job in self._active:
+            self._active.remove(job)
+        if self.on_busy and not self._active:
+            self.on_busy(False)
+
+    def _drain(self):
+        if self._closed:
+            return
+        # Progress is only ever shown as "where it is now": keep the latest
+        # report per job and hand it over once per tick, so a job that
+        # reports every file cannot flood the Tk thread
+        progress = {}
+        handled = 0
+        try:
+            while handled < MAX_EVENTS:
+                try:
+                    kind, job, payload = self._events.get_nowait()
+                except queue.Empty:
+                    break
+                handled += 1
+                if kind == "progress":
+                    progress[job] = payload
+                    continue
+                if job in progress:
+                    # Keep the job's own order: progress, then its log line or end
+                    self._dispatch("progress", job, progress.pop(job))
+                self._dispatch(kind, job, payload)
+            for job, payload in progress.items():
+                self._dispatch("progress", job, payload)
+        finally:
+            # Whatever a callback did, polling must go on; come back at once
+            # while events are left over
+            more = not self._events.empty()
+            self.master.after(1 if more else self.poll_ms, self._drain)
+
+    def _dispatch(self, kind, job, payload):
+        try:
+            if kind == "log":
+                if self.on_log:
+                    self.on_log(payload)
+            elif kind == "progress":
+                if self.on_progress:
+                    self.on_progress(*payload)
+            elif kind == "call":
+                func, args = payload
+                func(*args)
+            elif kind == "cancelled":
+                self._finish(job)
+                if self.on_log:
+                    self.on_log(f"{job.name} canceled.")
+            elif kind == "failed":
+                self._finish(job)
+                if self.on_log:
+                    self.on_log(f"{job.name} failed: {payload}")
+            elif kind == "done":
+                self._finish(job)
+                result, on_done = payload
+                if on_done:
+                    on_done(result)
+        except Exception as e:
+            # A broken callback loses its own event, never the ones after it
+            traceback.print_exc()
+            if kind != "log" and self.on_log:
+                try:
+                    self.on_log(f"Error while handling {kind} event: {e}")
+                except Exception:
+                    traceback.print_exc()
@@ -0,0 +1,380 @@
+"""
+Dependency-free reader for Windows Shell Link (.lnk) files, per MS-SHLLINK.
+
+parse() works on anything that supports the buffer protocol (bytes,
+bytearray, memoryview, mmap) and reads it through a memoryview with
+struct.unpack_from, so the only copies made are the decoded strings.
+"""
+import mmap
+import os
+import struct
+import uuid
+
+HEADER_SIZE = 0x4C
+LINK_CLSID = uuid.UUID("00021401-0000-0000-c000-000000000046").bytes_le
+
+# LinkFlags
+HAS_LINK_TARGET_ID_LIST = 0x00000001
+HAS_LINK_INFO = 0x00000002
+HAS_NAME = 0x00000004
+HAS_RELATIVE_PATH = 0x00000008
+HAS_WORKING_DIR = 0x00000010
+HAS_ARGUMENTS = 0x00000020
+HAS_ICON_LOCATION = 0x00000040
+IS_UNICODE = 0x00000080
+FORCE_NO_LINK_INFO = 0x00000100
+HAS_EXP_STRING = 0x00000200
+HAS_EXP_ICON = 0x00004000
+
+# LinkInfoFlags
+VOLUME_ID_AND_LOCAL_BASE_PATH = 0x1
+COMMON_NETWORK_RELATIVE_LINK_AND_PATH_SUFFIX = 0x2
+
+# ExtraData block signatures
+ENVIRONMENT_VARIABLE_BLOCK = 0xA0000001
+CONSOLE_BLOCK = 0xA0000002
+TRACKER_BLOCK = 0xA0000003
+CONSOLE_FE_BLOCK = 0xA0000004
+SPECIAL_FOLDER_BLOCK = 0xA0000005
+DARWIN_BLOCK = 0xA0000006
+ICON_ENVIRONMENT_BLOCK = 0xA0000007
+SHIM_BLOCK = 0xA0000008
+PROPERTY_STORE_BLOCK = 0xA0000009
+VISTA_ID_LIST_BLOCK = 0xA000000A
+KNOWN_FOLDER_BLOCK = 0xA000000B
+
+DRIVE_TYPES = {0: "unknown", 1: "no_root_dir", 2: "removable", 3: "fixed",
+               4: "remote", 5: "cdrom", 6: "ramdisk"}
+
+_HEADER = struct.Struct("<I16sIIQQQIiIHHII")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_U32x2 = struct.Struct("<II")
+
+ANSI_CODEPAGE = "cp1252"
+
+
+class LnkError(ValueError):
+    pass
+
+
+class ShellLink:
+    """Parsed fields of one shortcut. Missing parts are None."""
+
+    def __init__(self):
+        self.flags = 0
+        self.file_attributes = 0
+        self.creation_time = 0      # FILETIME (100 ns since 1601)
+        self.access_time = 0
+        self.write_time = 0
+        self.file_size = 0
+        self.icon_index = 0
+        self.show_command = 1
+        self.hotkey = 0
+
+        self.id_list_path = None    # path rebuilt from the shell item IDs
+        self.id_list_count = 0
+
+        # LinkInfo
+        self.drive_type = None
+        self.drive_serial = None
+        self.volume_label = None
+        self.local_base_path = None
+        self.net_name = None
+        self.device_name = None
+        self.common_path_suffix = None
+
+        # StringData
+        self.name = None
+        self.relative_path = None
+        self.working_dir = None
+        self.arguments = None
+        self.icon_location = None
+
+        # ExtraData
+        self.env_target = None
+        self.icon_env_target = None
+        self.known_folder_id = None
+        self.known_folder_offset = None
+        self.known_folder_path = None  # ID list path the known folder stands for
+        self.special_folder_id = None
+        self.special_folder_offset = None
+        self.tracker_machine_id = None
+        self.extra_blocks = []      # signatures of every block seen
+
+    @property
+    def target(self):
+        """Best available target path, in the order Explorer resolves it."""
+        if self.local_base_path:
+            if self.common_path_suffix:
+                return self.local_base_path.rstrip("\\") + "\\" + self.common_path_suffix
+            return self.local_base_path
+        if self.net_name:
+            if self.common_path_suffix:
+                return self.net_name.rstrip("\\") + "\\" + self.common_path_suffix
+            return self.net_name
+        return self.env_target or self.id_list_path
+
+    def as_dict(self):
+        d = {k: v for k, v in vars(self).items() if v is not None}
+        d["target"] = self.target
+        return d
+
+    def __repr__(self):
+        return f"<ShellLink target={self.target!r} args={self.arguments!r}>"
+
+
+def _c_string(mv, offset, end):
+    """NUL-terminated ANSI string starting at offset (not past end)."""
+    if offset >= end:
+        raise LnkError("string offset out of range")
+    # Decoding to the end and cutting at the NUL runs in C, unlike a byte loop
+    return str(mv[offset:end], ANSI_CODEPAGE, "replace").split("\0", 1)[0]
+
+
+def _c_wstring(mv, offset, end):
+    """NUL-terminated UTF-16LE string starting at offset (not past end)."""
+    if offset >= end:
+        raise LnkError("string offset out of range")
+    end -= (end - offset) & 1
+    return str(mv[offset:end], "utf-16-le", "replace").split("\0", 1)[0]
+
+
+def _fixed_string(mv, offset, size, unicode):
+    raw = mv[offset:offset + size]
+    if unicode:
+        text = str(raw, "utf-16-le", "replace")
+    else:
+        text = str(raw, ANSI_CODEPAGE, "replace")
+    return text.split("\0", 1)[0] or None
+
+
+def _parse_id_list(mv, offset, end):
+    """
+    Rebuild a filesystem path from the shell items: a drive item ("C:\\")
+    followed by file entry items. Items that are not plain filesystem
+    entries (control panel, URIs, ...) leave the path as None. Also returns
+    the item count and {item offset: number of path parts before it}.
+    """
+    parts = []
+    count = 0
+    depths = {}
+    pos = offset
+    while pos + 2 <= end:
+        (size,) = _U16.unpack_from(mv, pos)
+        if size == 0:
+            break
+        if size < 3 or pos + size > end:
+            raise LnkError("bad shell item size")
+        count += 1
+        depths[pos - offset] = len(parts)
+        item = mv[pos:pos + size]
+        kind = item[2] & 0x70
+        if kind == 0x20 and size >= 4:
+            # Volume item: ANSI drive string like "C:\"
+            parts = [_c_string(item, 3, size).rstrip("\\")]
+        elif kind == 0x30 and size >= 15:
+            parts.append(_file_entry_name(item, size))
+        pos += size
+    return _join_parts(parts), count, depths
+
+
+def _join_parts(parts):
+    path = "\\".join(p for p in parts if p) if parts else None
+    if path and len(parts) == 1:
+        path += "\\"
+    return path
+
+
+def _file_entry_name(item, size):
+    # The long name lives in the 0xBEEF0004 extension block; its offset is the
+    # last u16 of the item. Fall back to the 8.3 primary name without it.
+    (ext,) = _U16.unpack_from(item, size - 2)
+    if 14 <= ext and ext + 8 <= size - 2:
+        ext_size, version, sig = struct.unpack_from("<HHI", item, ext)
+        name_offset = {3: 20, 7: 38, 8: 42}.get(version, 46 if version >= 9 else None)
+        if (sig == 0xBEEF0004 and ext + ext_size <= size
+                and name_offset is not None and name_offset < ext_size):
+            name = _c_wstring(item, ext + name_offset, ext + ext_size)
+            if name:
+                return name
+    if item[2] & 0x04:
+        return _c_wstring(item, 14, size)
+    return _c_string(item, 14, size)
+
+
+def _parse_link_info(link, mv, offset, end):
+    if offset + 28 > end:
+        raise LnkError("truncated LinkInfo")
+    size, header_size, li_flags = struct.unpack_from("<III", mv, offset)
+    if size < 28 or offset + size > end:
+        raise LnkError("bad LinkInfo size")
+    li_end = offset + size
+    (volume_off, base_off, net_off, suffix_off) = struct.unpack_from("<IIII", mv, offset + 12)
+    base_off_u = suffix_off_u = 0
+    if header_size >= 0x24:
+        if offset + 36 > li_end:
+            raise LnkError("truncated LinkInfo header")
+        base_off_u, suffix_off_u = _U32x2.unpack_from(mv, offset + 28)
+
+    if li_flags & VOLUME_ID_AND_LOCAL_BASE_PATH:
+        v = offset + volume_off
+        if v + 16 > li_end:
+            raise LnkError("truncated VolumeID")
+        v_size, drive_type, serial, label_off = struct.unpack_from("<IIII", mv, v)
+        v_end = min(v + v_size, li_end)
+        link.drive_type = DRIVE_TYPES.get(drive_type, str(drive_type))
+        link.drive_serial = f"{serial:08X}"
+        if label_off == 0x14 and v + 20 <= v_end:
+            (label_off_u,) = _U32.unpack_from(mv, v + 16)
+            link.volume_label = _c_wstring(mv, v + label_off_u, v_end) or None
+        elif label_off < v_size:
+            link.volume_label = _c_string(mv, v + label_off, v_end) or None
+        if base_off_u:
+            link.local_base_path = _c_wstring(mv, offset + base_off_u, li_end)
+        elif base_off:
+            link.local_base_path = _c_string(mv, offset + base_off, li_end)
+
+    if li_flags & COMMON_NETWORK_RELATIVE_LINK_AND_PATH_SUFFIX:
+        n = offset + net_off
+        if n + 20 > li_end:
+            raise LnkError("truncated CommonNetworkRelativeLink")
+        n_size, n_flags, name_off, device_off, _provider = struct.unpack_from("<IIIII", mv, n)
+        n_end = min(n + n_size, li_end)
+        if name_off > 0x14 and n + 28 <= n_end:
+            name_off_u, device_off_u = _U32x2.unpack_from(mv, n + 20)
+            link.net_name = _c_wstring(mv, n + name_off_u, n_end)
+            if n_flags & 0x1 and device_off_u:
+                link.device_name = _c_wstring(mv, n + device_off_u, n_end)
+        else:
+            link.net_name = _c_string(mv, n + name_off, n_end)
+            if n_flags & 0x1 and device_off:
+                link.device_name = _c_string(mv, n + device_off, n_end)
+
+    if suffix_off_u:
+        link.common_path_suffix = _c_wstring(mv, offset + suffix_off_u, li_end) or None
+    elif suffix_off:
+        link.common_path_suffix = _c_string(mv, offset + suffix_off, li_end) or None
+    return li_end
+
+
+def _parse_extra(link, mv, pos, end):
+    while pos + 4 <= end:
+        (size,) = _U32.unpack_from(mv, pos)
+        if size < 4:
+            break  # TerminalBlock
+        if size < 8 or pos + size > end:
+            raise LnkError("bad ExtraData block size")
+        (sig,) = _U32.unpack_from(mv, pos + 4)
+        link.extra_blocks.append(sig)
+        body = pos + 8
+        if sig in (ENVIRONMENT_VARIABLE_BLOCK, ICON_ENVIRONMENT_BLOCK) and size >= 0x314:
+            target = (_fixed_string(mv, body + 260, 520, True)
+                      or _fixed_string(mv, body, 260, False))
+            if sig == ENVIRONMENT_VARIABLE_BLOCK:
+                link.env_target = target
+            else:
+                link.icon_env_target = target
+        elif sig == KNOWN_FOLDER_BLOCK and size >= 0x1C:
+            link.known_folder_id = str(uuid.UUID(bytes_le=bytes(mv[body:body + 16])))
+            (link.known_folder_offset,) = _U32.unpack_from(mv, body + 16)
+        elif sig == SPECIAL_FOLDER_BLOCK and size >= 0x10:
+            link.special_folder_id, link.special_folder_offset = _U32x2.unpack_from(mv, body)
+        elif sig == TRACKER_BLOCK and size >= 0x60:
+            link.tracker_machine_id = _fixed_string(mv, body + 8, 16, False)
+        pos += size
+    return pos
+
+
+def parse(data):
+    """Parse a .lnk held in any buffer (bytes, memoryview, mmap)."""
+    mv = memoryview(data).cast("B") if not isinstance(data, memoryview) else data
+    try:
+        return _parse(mv)
+    except LnkError:
+        raise
+    except (struct.error, IndexError, ValueError) as e:
+        message = f"malformed shortcut: {e}"
+    # Raised outside the except block so no frame keeps a view of the buffer
+    raise LnkError(message)
+
+
+def _parse(mv):
+    end = len(mv)
+    if end < HEADER_SIZE:
+        raise LnkError("file too short for a ShellLinkHeader")
+    (header_size, clsid, flags, attrs, ctime, atime, wtime, fsize, icon_index,
+     show, hotkey, _r1, _r2, _r3) = _HEADER.unpack_from(mv, 0)
+    if header_size != HEADER_SIZE or clsid != LINK_CLSID:
+        raise LnkError("not a shell link (bad header)")
+
+    link = ShellLink()
+    link.flags = flags
+    link.file_attributes = attrs
+    link.creation_time, link.access_time, link.write_time = ctime, atime, wtime
+    link.file_size = fsize
+    link.icon_index = icon_index
+    link.show_command = show
+    link.hotkey = hotkey
+
+    pos = HEADER_SIZE
+    if flags & HAS_LINK_TARGET_ID_LIST:
+        (id_size,) = _U16.unpack_from(mv, pos)
+        pos += 2
+        if pos + id_size > end:
+            raise LnkError("truncated LinkTargetIDList")
+        link.id_list_path, link.id_list_count, depths = _parse_id_list(mv, pos, pos + id_size)
+        pos += id_size
+    else:
+        depths = {}
+
+    if flags & HAS_LINK_INFO and not flags & FORCE_NO_LINK_INFO:
+        pos = _parse_link_info(link, mv, pos, end)
+    elif flags & HAS_LINK_INFO:
+        (size,) = _U32.unpack_from(mv, pos)
+        pos += size
+
+    unicode = bool(flags & IS_UNICODE)
+    for flag, attr in ((HAS_NAME, "name"), (HAS_RELATIVE_PATH, "relative_path"),
+                       (HAS_WORKING_DIR, "working_dir"), (HAS_ARGUMENTS, "arguments"),
+                       (HAS_ICON_LOCATION, "icon_location")):
+        if not flags & flag:
+            continue
+        (count,) = _U16.unpack_from(mv, pos)
+        pos += 2
+        size = count * 2 if unicode else count
+        if pos + size > end:
+            raise LnkError(f"truncated {attr}")
+        raw = mv[pos:pos + size]
+        setattr(link, attr, str(raw, "utf-16-le" if unicode else ANSI_CODEPAGE, "replace"))
+        pos += size
+
+    _parse_extra(link, mv, pos, end)
+    depth = depths.get(link.known_folder_offset)
+    if depth and link.id_list_path:
+        link.known_folder_path = _join_parts(link.id_list_path.split("\\")[:depth])
+    return link
+
+
+def parse_file(path, use_mmap=False):
+    """
+    Parse a shortcut on disk. Shortcuts are a few KB, so a plain read is
+    usually cheaper; use_mmap maps the file instead of copying it.
+    """
+    with open(path, "rb") as f:
+        # An empty file cannot be mapped: read it, so it fails like a short one
+        if not use_mmap or os.fstat(f.fileno()).st_size == 0:
+            return parse(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            mv = memoryview(m)
+            try:
+                link = parse(mv)
+            except LnkError as e:
+                message = str(e)
+            else:
+                message = None
+            # The map can only close once no view of it is left
+            mv.release()
+    if message:
+        raise LnkError(message)
+    return link
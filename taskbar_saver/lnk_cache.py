@@ -0,0 +1,136 @@
+import os
+import json
+from collections import OrderedDict
+from itertools import islice
+from pathlib import Path
+
+from taskbar_saver.lnk import ShellLink, parse_file
+
+CACHE_NAME = "lnk_cache.json"
+CACHE_VERSION = 1
+MAX_ENTRIES = 200_000
+SAVE_CHUNK = 2000  # entries encoded per json.dumps() call
+
+# Every ShellLink attribute, stored as a list in this order to keep the file small
+FIELDS = tuple(vars(ShellLink()))
+
+
+def _pack(link):
+    return [getattr(link, f) for f in FIELDS]
+
+
+def _unpack(values):
+    link = ShellLink()
+    for field, value in zip(FIELDS, values):
+        setattr(link, field, value)
+    return link
+
+
+def stat_key(entry):
+    """(inode, size, mtime_ns) of a DirEntry as the cache key."""
+    st = entry.stat()
+    ino = entry.inode() or st.st_ino
+    return f"{ino}:{st.st_size}:{st.st_mtime_ns}"
+
+
+class LnkCache:
+    """
+    On-disk cache of parsed shortcut metadata.
+
+    Entries are keyed by the file's stat signature, so any edit (new size,
+    mtime or inode) is a miss and the stale entry for that path is dropped on
+    the next put. The newest max_entries are kept (LRU). Use parse(entry) with
+    os.scandir entries: a hit costs only the stat scandir already has.
+    """
+
+    def __init__(self, path=None, max_entries=MAX_ENTRIES):
+        self.path = Path(path) if path else None
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> [path, fields]
+        self._by_path = {}             # path -> key
+        self._dirty = False
+        if self.path:
+            self._load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != CACHE_VERSION or data.get("fields") != list(FIELDS):
+            return
+        # Oldest first, so a lowered max_entries keeps the most recent ones
+        for key, path, values in data.get("entries", [])[-self.max_entries:]:
+            self._entries[key] = [path, values]
+            self._by_path[path] = key
+
+    def save(self):
+        if not self.path or not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        # dumps() rather than dump(): the one-shot C encoder is several times
+        # faster. Chunks of entries keep the text in memory small.
+        head = json.dumps({"version": CACHE_VERSION, "fields": list(FIELDS)},
+                          separators=(",", ":"))
+        items = iter(self._entries.items())
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(head[:-1] + ',"entries":[')
+            sep = ""
+            while True:
+                chunk = [[key, path, values] for key, (path, values) in islice(items, SAVE_CHUNK)]
+                if not chunk:
+                    break
+                f.write(sep + json.dumps(chunk, separators=(",", ":"))[1:-1])
+                sep = ","
+            f.write("]}")
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+    def get(self, key):
+        item = self._entries.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return _unpack(item[1])
+
+    def put(self, key, path, link):
+        old = self._by_path.get(path)
+        if old is not None and old != key:
+            # The file changed: forget its previous signature
+            self._entries.pop(old, None)
+        self._entries[key] = [path, _pack(link)]
+        self._entries.move_to_end(key)
+        self._by_path[path] = key
+        while len(self._entries) > self.max_entries:
+            evicted, (evicted_path, _) = self._entries.popitem(last=False)
+            if self._by_path.get(evicted_path) == evicted:
+                del self._by_path[evicted_path]
+        self._dirty = True
+
+    def parse(self, entry):
+        """Parsed ShellLink for an os.DirEntry, from the cache when possible."""
+        key = stat_key(entry)
+        link = self.get(key)
+        if link is None:
+            link = parse_file(entry.path)
+            self.put(key, os.path.normcase(entry.path), link)
+        return link
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"{self.hits} hits, {self.misses} misses ({rate:.0%} hit rate), {len(self)} entries"
+
+
+def cache_for(backup_dir, max_entries=MAX_ENTRIES):
+    """Metadata cache kept inside a backup folder."""
+    return LnkCache(Path(backup_dir) / CACHE_NAME, max_entries=max_entries)
@@ -0,0 +1,317 @@
+"""
+Write Windows Shell Link (.lnk) files from parsed metadata, per MS-SHLLINK.
+
+build() is the inverse of lnk.parse() for the fields in ROUNDTRIP_FIELDS:
+parse(build(link)) gives them back unchanged. What is not kept by the parser
+(shell item timestamps, 8.3 names, the tracker and property store blocks) is
+not written; Windows rebuilds it the first time the shortcut is resolved.
+
+to_record() / from_record() turn a ShellLink into a small JSON-able dict, so
+a backup can keep metadata instead of the original bytes, and write_many()
+regenerates a folder of shortcuts from such records in one batch.
+"""
+import os
+import ntpath
+import struct
+import uuid
+from pathlib import Path
+
+from taskbar_saver.lnk import (ANSI_CODEPAGE, ENVIRONMENT_VARIABLE_BLOCK,
+                               FORCE_NO_LINK_INFO, HAS_ARGUMENTS,
+                               HAS_EXP_ICON, HAS_EXP_STRING,
+                               HAS_ICON_LOCATION, HAS_LINK_INFO,
+                               HAS_LINK_TARGET_ID_LIST, HAS_NAME,
+                               HAS_RELATIVE_PATH, HAS_WORKING_DIR,
+                               HEADER_SIZE, ICON_ENVIRONMENT_BLOCK,
+                               IS_UNICODE, KNOWN_FOLDER_BLOCK, LINK_CLSID,
+                               SPECIAL_FOLDER_BLOCK, ShellLink, parse)
+
+# Fields that survive parse(build(link))
+ROUNDTRIP_FIELDS = (
+    "file_attributes", "creation_time", "access_time", "write_time", "file_size",
+    "icon_index", "show_command", "hotkey", "id_list_path", "drive_type",
+    "drive_serial", "volume_label", "local_base_path", "net_name", "device_name",
+    "common_path_suffix", "name", "relative_path", "working_dir", "arguments",
+    "icon_location", "env_target", "icon_env_target", "known_folder_id",
+    "known_folder_path", "special_folder_id",
+)
+
+# Flags describing the layout; build() sets them from what it writes
+_LAYOUT_FLAGS = (HAS_LINK_TARGET_ID_LIST | HAS_LINK_INFO | HAS_NAME | HAS_RELATIVE_PATH
+                 | HAS_WORKING_DIR | HAS_ARGUMENTS | HAS_ICON_LOCATION | IS_UNICODE
+                 | FORCE_NO_LINK_INFO | HAS_EXP_STRING | HAS_EXP_ICON
+                 | 0x00001000   # HasDarwinID: Darwin block not written
+                 | 0x00020000)  # RunWithShimLayer: shim block not written
+
+MY_COMPUTER_CLSID = uuid.UUID("20d04fe0-3aea-1069-a2d8-08002b30309d").bytes_le
+DRIVE_TYPE_CODES = {"unknown": 0, "no_root_dir": 1, "removable": 2, "fixed": 3,
+                    "remote": 4, "cdrom": 5, "ramdisk": 6}
+FILE_ATTRIBUTE_DIRECTORY = 0x10
+
+_FILE_EXT = struct.Struct("<HHIIIHHQQHII")  # 0xBEEF0004 version 9, up to the long name
+
+
+def _ansi(text):
+    return text.encode(ANSI_CODEPAGE, "replace") + b"\0"
+
+
+def _wide(text):
+    return text.encode("utf-16-le") + b"\0\0"
+
+
+def _is_ansi(text):
+    try:
+        text.encode(ANSI_CODEPAGE)
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def _short_name(name):
+    """An 8.3-style primary name; the long name in the extension block wins."""
+    stem, ext = os.path.splitext(name)
+    if len(stem) <= 8 and len(ext) <= 4 and " " not in name and _is_ansi(name):
+        return name.upper()
+    clean = "".join(c for c in stem.upper() if c.isalnum())[:6] or "FILE"
+    return f"{clean}~1{ext[:4].upper()}"
+
+
+def _file_item(name, is_dir, size, attrs):
+    """Shell file entry item with a version 9 0xBEEF0004 extension block."""
+    short = _ansi(_short_name(name))
+    if len(short) & 1:
+        short += b"\0"
+    head_size = 14 + len(short)
+    ext = _FILE_EXT.pack(0, 9, 0xBEEF0004, 0, 0, 0x2E, 0, 0, 0, 0, 0, 0)
+    ext += _wide(name) + struct.pack("<H", head_size)
+    ext = struct.pack("<H", len(ext)) + ext[2:]
+    body = struct.pack("<BBIIH", 0x31 if is_dir else 0x32, 0,
+                       0 if is_dir else size & 0xFFFFFFFF, 0,
+                       FILE_ATTRIBUTE_DIRECTORY if is_dir else attrs & 0xFFFF)
+    item = body + short + ext
+    return struct.pack("<H", len(item) + 2) + item
+
+
+def _id_list(link):
+    """
+    (IDList bytes, {path depth: item offset}) for a drive path, or (None, {})
+    when id_list_path is not something we can rebuild.
+    """
+    path = link.id_list_path
+    drive, rest = ntpath.splitdrive(path or "")
+    if len(drive) != 2:
+        return None, {}
+    parts = [p for p in rest.split("\\") if p]
+    items = [struct.pack("<HBB", 20, 0x1F, 0x50) + MY_COMPUTER_CLSID,
+             struct.pack("<HB", 25, 0x2F) + (drive + "\\").encode("ascii", "replace").ljust(22, b"\0")]
+    offsets = {1: 20 + 25}  # "C:\" is one part deep; the next item follows the drive
+    pos = offsets[1]
+    for i, name in enumerate(parts):
+        last = i == len(parts) - 1
+        is_dir = not last or bool(link.file_attributes & FILE_ATTRIBUTE_DIRECTORY)
+        item = _file_item(name, is_dir, link.file_size, link.file_attributes)
+        items.append(item)
+        pos += len(item)
+        offsets[i + 2] = pos
+    data = b"".join(items) + b"\0\0"
+    return struct.pack("<H", len(data)) + data, offsets
+
+
+def _volume_id(link):
+    label = link.volume_label or ""
+    serial = int(link.drive_serial, 16) if link.drive_serial else 0
+    drive_type = DRIVE_TYPE_CODES.get(link.drive_type, 0)
+    if _is_ansi(label):
+        body = _ansi(label)
+        return struct.pack("<IIII", 16 + len(body), drive_type, serial, 16) + body
+    body = _wide(label)
+    return struct.pack("<IIIII", 20 + len(body), drive_type, serial, 0x14, 20) + body
+
+
+def _network_link(link):
+    strings = [_ansi(link.net_name)]
+    device = link.device_name
+    n_flags = 0x1 if device else 0
+    if device:
+        strings.append(_ansi(device))
+    unicode = not _is_ansi(link.net_name) or (device and not _is_ansi(device))
+    head = 28 if unicode else 20
+    offsets = []
+    pos = head
+    for s in strings:
+        offsets.append(pos)
+        pos += len(s)
+    wide = []
+    if unicode:
+        wide = [_wide(link.net_name)] + ([_wide(device)] if device else [])
+        wide_offsets = []
+        for s in wide:
+            wide_offsets.append(pos)
+            pos += len(s)
+    name_off = offsets[0]
+    device_off = offsets[1] if device else 0
+    head_data = struct.pack("<IIIII", pos, n_flags, name_off, device_off, 0)
+    if unicode:
+        head_data += struct.pack("<II", wide_offsets[0], wide_offsets[1] if device else 0)
+    return head_data + b"".join(strings) + b"".join(wide)
+
+
+def _link_info(link):
+    local = link.local_base_path
+    net = link.net_name
+    if not local and not net:
+        return None
+    suffix = link.common_path_suffix or ""
+    texts = [t for t in (local, suffix) if t]
+    unicode = not all(_is_ansi(t) for t in texts)
+    header_size = 0x24 if unicode else 0x1C
+    flags = (0x1 if local else 0) | (0x2 if net else 0)
+
+    pos = header_size
+    volume = base = network = b""
+    volume_off = base_off = net_off = 0
+    if local:
+        volume = _volume_id(link)
+        volume_off, pos = pos, pos + len(volume)
+        base = _ansi(local)
+        base_off, pos = pos, pos + len(base)
+    if net:
+        network = _network_link(link)
+        net_off, pos = pos, pos + len(network)
+    suffix_data = _ansi(suffix)
+    suffix_off, pos = pos, pos + len(suffix_data)
+    tail = b""
+    extra_offsets = b""
+    if unicode:
+        base_u = _wide(local) if local else b""
+        base_off_u = pos if local else 0
+        pos += len(base_u)
+        suffix_u = _wide(suffix)
+        suffix_off_u, pos = pos, pos + len(suffix_u)
+        tail = base_u + suffix_u
+        extra_offsets = struct.pack("<II", base_off_u, suffix_off_u)
+    header = struct.pack("<IIIIIII", pos, header_size, flags, volume_off, base_off,
+                         net_off, suffix_off) + extra_offsets
+    return header + volume + base + network + suffix_data + tail
+
+
+def _string_data(link):
+    flags = 0
+    data = []
+    for flag, attr in ((HAS_NAME, "name"), (HAS_RELATIVE_PATH, "relative_path"),
+                       (HAS_WORKING_DIR, "working_dir"), (HAS_ARGUMENTS, "arguments"),
+                       (HAS_ICON_LOCATION, "icon_location")):
+        value = getattr(link, attr)
+        if value is None:
+            continue
+        encoded = value.encode("utf-16-le")
+        flags |= flag
+        data.append(struct.pack("<H", len(encoded) // 2) + encoded)
+    return flags, b"".join(data)
+
+
+def _env_block(sig, target):
+    ansi = target.encode(ANSI_CODEPAGE, "replace")[:259].ljust(260, b"\0")
+    wide = target.encode("utf-16-le")[:518].ljust(520, b"\0")
+    return struct.pack("<II", 0x314, sig) + ansi + wide
+
+
+def _extra_data(link, depth_offsets):
+    flags = 0
+    blocks = []
+    if link.env_target:
+        flags |= HAS_EXP_STRING
+        blocks.append(_env_block(ENVIRONMENT_VARIABLE_BLOCK, link.env_target))
+    if link.icon_env_target:
+        flags |= HAS_EXP_ICON
+        blocks.append(_env_block(ICON_ENVIRONMENT_BLOCK, link.icon_env_target))
+    offset = None
+    kf_path = link.known_folder_path
+    if kf_path and (link.id_list_path or "").casefold().startswith(kf_path.rstrip("\\").casefold() + "\\"):
+        depth = len([p for p in kf_path.split("\\") if p])
+        offset = depth_offsets.get(depth)
+    if offset is not None and link.special_folder_id is not None:
+        blocks.append(struct.pack("<IIII", 0x10, SPECIAL_FOLDER_BLOCK,
+                                  link.special_folder_id, offset))
+    if offset is not None and link.known_folder_id:
+        blocks.append(struct.pack("<II", 0x1C, KNOWN_FOLDER_BLOCK)
+                      + uuid.UUID(link.known_folder_id).bytes_le + struct.pack("<I", offset))
+    return flags, b"".join(blocks) + b"\0\0\0\0"  # TerminalBlock
+
+
+def build(link):
+    """Serialise a ShellLink to .lnk bytes."""
+    id_list, depth_offsets = _id_list(link)
+    link_info = _link_info(link)
+    string_flags, strings = _string_data(link)
+    extra_flags, extra = _extra_data(link, depth_offsets)
+
+    flags = (link.flags & ~_LAYOUT_FLAGS) | IS_UNICODE | string_flags | extra_flags
+    if id_list:
+        flags |= HAS_LINK_TARGET_ID_LIST
+    if link_info:
+        flags |= HAS_LINK_INFO
+    header = struct.pack("<I16sIIQQQIiIHHII", HEADER_SIZE, LINK_CLSID, flags,
+                         link.file_attributes, link.creation_time, link.access_time,
+                         link.write_time, link.file_size & 0xFFFFFFFF, link.icon_index,
+                         link.show_command, link.hotkey, 0, 0, 0)
+    return b"".join((header, id_list or b"", link_info or b"", strings, extra))
+
+
+def write_file(link, path):
+    data = build(link)
+    tmp = Path(path).with_name(Path(path).name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+    return len(data)
+
+
+def to_record(link):
+    """Compact dict of the fields build() needs, None values left out."""
+    record = {f: getattr(link, f) for f in ROUNDTRIP_FIELDS if getattr(link, f) is not None}
+    record["flags"] = link.flags & ~_LAYOUT_FLAGS
+    return record
+
+
+def from_record(record):
+    link = ShellLink()
+    for field, value in record.items():
+        if field == "flags" or field in ROUNDTRIP_FIELDS:
+            setattr(link, field, value)
+    return link
+
+
+def roundtrip_errors(link):
+    """Fields that differ after parse(build(link)); empty when the writer is faithful."""
+    again = parse(build(link))
+    return [(f, getattr(link, f), getattr(again, f)) for f in ROUNDTRIP_FIELDS
+            if getattr(link, f) != getattr(again, f)]
+
+
+def write_many(records, dest_dir, log=None, job=None):
+    """
+    Regenerate shortcuts from {name: record} into dest_dir. Returns
+    (written, errors) where errors is [(name, message)].
+    """
+    dest_dir = Path(dest_dir)
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    errors = []
+    total = len(records)
+    for i, (name, record) in enumerate(records.items(), 1):
+        if job:
+            job.check()
+        try:
+            if os.path.basename(name) != name or not name.lower().endswith(".lnk"):
+                # Records may come from a file: never write outside dest_dir
+                raise ValueError("not a plain .lnk file name")
+            write_file(from_record(record), dest_dir / name)
+            written.append(name)
+        except (OSError, ValueError, TypeError, AttributeError, struct.error) as e:
+            errors.append((name, str(e)))
+            if log:
+                log(f"Could not write {name}: {e}")
+        if job and (i % 100 == 0 or i == total):
+            job.progress(i, total)
+    return written, errors
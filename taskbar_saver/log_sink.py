@@ -0,0 +1,93 @@
+import queue
+import logging
+import logging.handlers
+from collections import deque
+from pathlib import Path
+
+MAX_LINES = 1000
+FLUSH_MS = 16  # about one frame
+LOG_FILE_BYTES = 1024 * 1024
+LOG_FILE_COUNT = 3
+
+
+class FileMirror:
+    """
+    Rotating log file written by a background QueueListener, so the Tk thread
+    only ever puts records on a queue.
+    """
+
+    def __init__(self, path, max_bytes=LOG_FILE_BYTES, backups=LOG_FILE_COUNT):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+
+        self._queue = queue.SimpleQueue()
+        self.logger = logging.getLogger(f"taskbar_saver.{id(self)}")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.logger.addHandler(logging.handlers.QueueHandler(self._queue))
+        self._listener = logging.handlers.QueueListener(self._queue, handler)
+        self._listener.start()
+        self._handler = handler
+
+    def write(self, msg):
+        self.logger.info(msg)
+
+    def close(self):
+        self._listener.stop()
+        self._handler.close()
+
+
+class LogSink:
+    """
+    Buffered writer for the status ScrolledText.
+
+    Messages are queued and written in a single insert on the next flush
+    (one frame later), and the widget is trimmed to max_lines so it works as
+    a ring buffer. Must be called from the Tk thread; worker threads go
+    through jobs.JobRunner.
+    """
+
+    def __init__(self, widget, max_lines=MAX_LINES, flush_ms=FLUSH_MS, log_file=None):
+        self.widget = widget
+        self.max_lines = max_lines
+        self.flush_ms = flush_ms
+        # Anything beyond max_lines would be trimmed right away, so don't keep it
+        self._pending = deque(maxlen=max_lines)
+        self._scheduled = None
+        self.mirror = FileMirror(log_file) if log_file else None
+
+    def write(self, msg):
+        self._pending.append(msg)
+        if self.mirror:
+            self.mirror.write(msg)
+        if self._scheduled is None:
+            self._scheduled = self.widget.after(self.flush_ms, self.flush)
+
+    __call__ = write
+
+    def flush(self):
+        self._scheduled = None
+        if not self._pending:
+            return
+        text = "\n".join(self._pending) + "\n"
+        self._pending.clear()
+
+        w = self.widget
+        w.config(state="normal")
+        w.insert("end", text)
+        # "end-1c" is on the empty line after the last newline
+        lines = int(w.index("end-1c").split(".")[0]) - 1
+        if lines > self.max_lines:
+            w.delete("1.0", f"{lines - self.max_lines + 1}.0")
+        w.see("end")
+        w.config(state="disabled")
+
+    def close(self):
+        if self._scheduled is not None:
+            self.widget.after_cancel(self._scheduled)
+            self._scheduled = None
+        if self.mirror:
+            self.mirror.close()
@@ -0,0 +1,184 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+
+from taskbar_saver.copy_engine import get_engine
+from taskbar_saver.dirscan import scan
+
+# Stored next to the backed-up shortcuts. Not a .lnk, so the
+# .lnk listings used elsewhere never pick it up.
+MANIFEST_NAME = "backup_manifest.json"
+MANIFEST_VERSION = 1
+
+HASH_CHUNK = 1024 * 1024
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_manifest(backup_dir):
+    """
+    Return {name: {"size", "mtime_ns", "sha256"}} for the backup folder,
+    or an empty dict when there is no (readable) manifest yet.
+    """
+    path = Path(backup_dir) / MANIFEST_NAME
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != MANIFEST_VERSION:
+        return {}
+    return data.get("files", {})
+
+
+def save_manifest(backup_dir, files):
+    # Write to a temp file first so a crash never leaves a half-written manifest
+    path = Path(backup_dir) / MANIFEST_NAME
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": MANIFEST_VERSION, "files": files}, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _entry(st, digest):
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+
+
+class SyncResult:
+    def __init__(self):
+        self.added = []
+        self.updated = []
+        self.removed = []
+        self.unchanged = []
+        self.hashed = 0
+        self.errors = []
+        self.strategies = None
+        self.manifest = {}   # the manifest as saved: name -> sha256, size, mtime_ns
+        self.from_signature = False  # skipped: the folder signature proved no change
+
+    @property
+    def changed(self):
+        return bool(self.added or self.updated or self.removed)
+
+    @property
+    def copied(self):
+        return len(self.added) + len(self.updated)
+
+
+def sync_backup(source_dir, backup_dir, skip=None, log=None, engine=None, job=None,
+                source=None, existing=None):
+    """
+    Bring backup_dir in line with the .lnk files in source_dir, touching only
+    the files that actually differ.
+
+    A shortcut is considered unchanged when its size and mtime_ns match the
+    manifest. Otherwise it is hashed and only copied if the content differs.
+    Backup files whose source is gone are removed. skip(name) can filter out
+    names (e.g. duplicates); log(msg) receives per-file errors. Changed
+    files go to the shared copy engine as soon as they are hashed, so the
+    copies overlap the rest of the scan. job (see jobs.Job) gets progress
+    reports and can cancel the run between files.
+    source and existing are dirscan listings of source_dir and backup_dir;
+    each folder is scanned once here when they are not given.
+    """
+    source_dir = Path(source_dir)
+    backup_dir = Path(backup_dir)
+    backup_dir.mkdir(parents=True, exist_ok=True)
+    if source is None:
+        source = scan(source_dir)
+    if existing is None:
+        existing = scan(backup_dir)
+
+    old = load_manifest(backup_dir)
+    new = {}
+    result = SyncResult()
+    pending = {}  # src -> (name, manifest entry, replaces a backup file), until copied
+    keep = set()  # names that failed; never delete their old backup copy
+
+    def changed():
+        # Hashes one pin at a time and hands the ones to copy to the engine
+        # as it goes, so copying overlaps hashing
+        for i, entry in enumerate(source, 1):
+            name = entry.name
+            if skip is not None and skip(name):
+                continue
+            if job is not None:
+                job.check()
+                job.progress(i, len(source))
+            src = Path(entry.path)
+            prev = old.get(name)
+            try:
+                st = entry.stat()
+                dst_exists = name in existing
+
+                # Fast path: same size and mtime as last time, backup file still there
+                if (prev and dst_exists
+                        and prev["size"] == st.st_size
+                        and prev["mtime_ns"] == st.st_mtime_ns):
+                    new[name] = prev
+                    result.unchanged.append(name)
+                    continue
+
+                digest = file_hash(src)
+                result.hashed += 1
+
+                if prev is None and dst_exists:
+                    # Backup made before the manifest existed: check the copy itself
+                    prev_digest = file_hash(backup_dir / name)
+                    result.hashed += 1
+                else:
+                    prev_digest = prev["sha256"] if prev else None
+
+                if dst_exists and prev_digest == digest:
+                    # Touched but not edited, just refresh the recorded stat
+                    new[name] = _entry(st, digest)
+                    result.unchanged.append(name)
+                    continue
+            except Exception as e:
+                result.errors.append((name, e))
+                keep.add(name)
+                if prev:
+                    new[name] = prev
+                if log:
+                    log(f"Failed to backup {src}: {e}")
+                continue
+            pending[src] = (name, _entry(st, digest), dst_exists)
+            yield src, backup_dir / name
+
+    report = (engine or get_engine()).copy_many(changed(), log=log, job=job)
+    result.strategies = report.strategies
+    for src, _ in report.copied:
+        name, entry, replaced = pending.pop(src)
+        new[name] = entry
+        (result.updated if replaced else result.added).append(name)
+    for src, e in report.errors:
+        name = pending.pop(src)[0]
+        result.errors.append((name, e))
+        keep.add(name)
+        if name in old:
+            new[name] = old[name]
+
+    # Remove backed-up shortcuts that are no longer pinned
+    for name in sorted(existing.names() - new.keys() - keep):
+        dst = backup_dir / name
+        try:
+            dst.unlink()
+            existing.drop(name)
+            result.removed.append(name)
+        except Exception as e:
+            result.errors.append((name, e))
+            if log:
+                log(f"Failed to remove old backup {dst}: {e}")
+
+    if result.changed or new != old:
+        save_manifest(backup_dir, new)
+    result.manifest = new
+
+    return result
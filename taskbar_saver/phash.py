@@ -0,0 +1,148 @@
+"""
+Perceptual hashes of screenshots, to notice captures that look the same.
+
+fingerprint() is the DCT pHash: the frame is scaled down to 32x32 grayscale,
+transformed with a 2-D DCT (two matrix products in NumPy) and the 8x8 lowest
+frequencies are compared with their median, giving 64 bits that survive
+re-encoding, scaling and small changes such as a ticking clock. Two frames
+whose hashes differ in only a few bits (distance()) look alike.
+
+ScreenshotIndex keeps the hashes of the most recent saved screenshots in the
+backup folder (screenshot_hashes.json). It is small and bounded, so checking
+a capture costs the same however many screenshots were ever taken.
+
+At 32x32 the whole taskbar of a desktop is less than one pixel row, so a pin
+added, removed or moved changes the hash by a bit or two at most. Each entry
+can therefore also keep a taskbar_check.TaskbarReference of the capture's
+strip; find() given the new capture's strip only reports a screenshot whose
+reference matches it as well.
+
+NumPy and Pillow are imported on first use; without NumPy, fingerprint()
+raises ImportError and callers skip the check.
+"""
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+
+INDEX_NAME = "screenshot_hashes.json"
+INDEX_VERSION = 2      # 2 added the taskbar reference; version 1 entries have none
+MAX_ENTRIES = 64       # recent screenshots compared against
+HASH_SIZE = 8          # 8x8 low frequencies -> 64 bit hash
+SAMPLE_SIZE = 32       # frames are scaled to 32x32 before the DCT
+DEFAULT_DISTANCE = 4   # bits that may differ for two frames to count as the same
+
+_dct = {}
+
+
+def _dct_matrix(n):
+    # Orthonormal DCT-II as a matrix, so the 2-D transform is D @ X @ D.T
+    m = _dct.get(n)
+    if m is None:
+        import numpy as np
+        k = np.arange(n)[:, None]
+        i = np.arange(n)[None, :]
+        m = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+        m[0] /= np.sqrt(2.0)
+        m = _dct[n] = m.astype(np.float32)
+    return m
+
+
+def fingerprint(img):
+    """64-bit perceptual hash (int) of a PIL image."""
+    import numpy as np
+    from PIL import Image
+
+    # BOX with reducing_gap shrinks a 4K frame in a few ms; the grayscale
+    # conversion then only touches 32x32 pixels
+    small = img.resize((SAMPLE_SIZE, SAMPLE_SIZE), Image.Resampling.BOX, reducing_gap=2.0)
+    pixels = np.asarray(small.convert("L"), dtype=np.float32)
+    d = _dct_matrix(SAMPLE_SIZE)
+    low = (d @ pixels @ d.T)[:HASH_SIZE, :HASH_SIZE].ravel()
+    bits = low > np.median(low[1:])  # the DC term is just the brightness
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def distance(a, b):
+    """Number of bits in which two fingerprints differ."""
+    return (a ^ b).bit_count()
+
+
+class IndexedShot:
+    def __init__(self, fingerprint, path, created, taskbar=None):
+        self.fingerprint = fingerprint
+        self.path = path
+        self.created = created
+        self.taskbar = taskbar  # TaskbarReference of its taskbar strip, or None
+
+    def __repr__(self):
+        return f"<IndexedShot {self.fingerprint:016x} {self.path}>"
+
+
+class ScreenshotIndex:
+    """Fingerprints of the last max_entries saved screenshots, newest last."""
+
+    def __init__(self, path, max_entries=MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.entries = []
+        self._load()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") not in (1, INDEX_VERSION):
+            return
+        for fp, path, created, *rest in data.get("entries", [])[-self.max_entries:]:
+            taskbar = rest[0] if rest else None
+            if taskbar is not None:
+                from taskbar_saver.taskbar_check import TaskbarReference
+                taskbar = TaskbarReference.from_dict(taskbar)
+            self.entries.append(IndexedShot(int(fp, 16), path, created, taskbar))
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION,
+                       "entries": [[f"{e.fingerprint:016x}", e.path, e.created,
+                                    e.taskbar.to_dict() if e.taskbar is not None else None]
+                                   for e in self.entries]}, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def find(self, fp, max_distance=DEFAULT_DISTANCE, taskbar=None):
+        """
+        (IndexedShot, distance) of the most recent screenshot within
+        max_distance bits of fp whose file still exists, or None. With
+        taskbar (the strip of the new capture, a PIL image) the screenshot's
+        taskbar reference must match it too; one without a reference never
+        does.
+        """
+        for entry in reversed(self.entries):
+            d = distance(fp, entry.fingerprint)
+            if d > max_distance or not os.path.exists(entry.path):
+                continue
+            if taskbar is not None and (entry.taskbar is None
+                                        or not entry.taskbar.compare(taskbar).matches):
+                continue
+            return entry, d
+        return None
+
+    def add(self, fp, path, taskbar=None):
+        path = str(Path(path).resolve())
+        # A file saved again under the same name replaces its old entry
+        self.entries = [e for e in self.entries if e.path != path]
+        self.entries.append(IndexedShot(fp, path, datetime.now().isoformat(timespec="seconds"),
+                                        taskbar))
+        del self.entries[:-self.max_entries]
+
+
+def screenshot_index_for(backup_dir, max_entries=MAX_ENTRIES):
+    """Screenshot hash index kept inside a backup folder."""
+    return ScreenshotIndex(Path(backup_dir) / INDEX_NAME, max_entries=max_entries)
@@ -0,0 +1,237 @@
+"""
+SQLite index of every pin in every snapshot, for "which snapshots ever
+contained this app" searches.
+
+One row per (snapshot, pin) in `pins`, pointing at `entries`: each distinct
+(name, blob) pair once, with the parsed target metadata once per blob in
+`links` (blobs are content-addressed, so a shortcut kept across a hundred
+snapshots is parsed and indexed once). The FTS5 trigram table covers entries,
+not pins, so a search touches each distinct shortcut once however long the
+history. update() only reads snapshots the index has not seen and drops the
+ones that were deleted.
+"""
+import sqlite3
+from pathlib import Path
+
+from taskbar_saver.dedupe import link_fields
+from taskbar_saver.lnk import LnkError, parse_file
+from taskbar_saver.snapshots import id_order
+
+INDEX_NAME = "pin_index.sqlite"
+SCHEMA_VERSION = 1
+
+# snapshots.id_order() in SQL, as text: <time>_NNN. Ids of older stores have
+# the counter of more snapshots in the same second unpadded (_2 ... _10)
+SNAPSHOT_ORDER = ("CASE WHEN length({0}) > 16 "
+                  "THEN substr({0}, 1, 16) || substr('000' || substr({0}, 17), -3) "
+                  "ELSE {0} || '_000' END")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id TEXT PRIMARY KEY,
+    created TEXT,
+    pins INTEGER
+);
+CREATE TABLE IF NOT EXISTS links (
+    sha256 TEXT PRIMARY KEY,
+    target TEXT,
+    arguments TEXT,
+    working_dir TEXT,
+    description TEXT
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    sha256 TEXT NOT NULL REFERENCES links(sha256),
+    UNIQUE (name, sha256)
+);
+CREATE TABLE IF NOT EXISTS pins (
+    snapshot TEXT NOT NULL REFERENCES snapshots(id) ON DELETE CASCADE,
+    entry INTEGER NOT NULL REFERENCES entries(id),
+    PRIMARY KEY (snapshot, entry)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS pins_entry ON pins(entry, snapshot);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+    name, target, tokenize='trigram'
+);
+"""
+
+
+class SearchHit:
+    """One distinct (name, target) and the snapshots it appears in."""
+
+    def __init__(self, name, target, snapshots):
+        self.name = name
+        self.target = target
+        self.snapshots = snapshots  # ids, oldest first
+
+    @property
+    def first(self):
+        return self.snapshots[0]
+
+    @property
+    def last(self):
+        return self.snapshots[-1]
+
+    def __repr__(self):
+        return f"<SearchHit {self.name!r} in {len(self.snapshots)} snapshots>"
+
+
+def _fts_query(text):
+    """
+    FTS5 MATCH expression: every word of 3+ characters as a quoted substring
+    (the trigram tokenizer cannot match anything shorter), or None.
+    """
+    words = [w for w in text.split() if len(w) >= 3]
+    if not words:
+        return None
+    return " AND ".join('"' + w.replace('"', '""') + '"' for w in words)
+
+
+def _like(word):
+    return "%" + word.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+class PinIndex:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path))
+        self.db.execute("PRAGMA foreign_keys = ON")
+        self.db.execute("PRAGMA journal_mode = WAL")
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            # Built by a different release: it is only an index, rebuild it
+            self.db.executescript("DROP TABLE IF EXISTS entries_fts; DROP TABLE IF EXISTS pins; "
+                                  "DROP TABLE IF EXISTS entries; DROP TABLE IF EXISTS links; "
+                                  "DROP TABLE IF EXISTS snapshots;")
+        self.db.executescript(SCHEMA)
+        self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.db.execute("SELECT COUNT(*) FROM pins").fetchone()[0]
+
+    def snapshot_ids(self):
+        return {row[0] for row in self.db.execute("SELECT id FROM snapshots")}
+
+    def update(self, store, log=None, parsed=None):
+        """
+        Bring the index in line with a SnapshotStore. Returns (added, removed)
+        snapshot counts; both are 0 when nothing changed since the last call.
+        parsed is (snapshot id, {name: dedupe.link_fields()}) for a snapshot
+        whose shortcuts the caller has already parsed.
+        """
+        on_disk = store.ids()
+        indexed = self.snapshot_ids()
+        new = [snap_id for snap_id in on_disk if snap_id not in indexed]
+        gone = indexed - set(on_disk)
+        with self.db:
+            for snap_id in gone:
+                self.db.execute("DELETE FROM snapshots WHERE id = ?", (snap_id,))
+            if gone:
+                self._drop_orphans()
+            for snap_id in new:
+                try:
+                    known = parsed[1] if parsed and parsed[0] == snap_id else {}
+                    self._add(store.open(snap_id), log, known)
+                except (KeyError, OSError, ValueError) as e:
+                    if log:
+                        log(f"Could not index snapshot {snap_id}: {e}")
+        return len(new), len(gone)
+
+    def _drop_orphans(self):
+        # Entries only the deleted snapshots used
+        orphans = "SELECT id FROM entries WHERE id NOT IN (SELECT entry FROM pins)"
+        self.db.execute(f"DELETE FROM entries_fts WHERE rowid IN ({orphans})")
+        self.db.execute(f"DELETE FROM entries WHERE id IN ({orphans})")
+
+    def _entry(self, snap, name, digest, log, fields=None):
+        db = self.db
+        row = db.execute("SELECT id FROM entries WHERE name = ? AND sha256 = ?",
+                         (name, digest)).fetchone()
+        if row:
+            return row[0]
+        row = db.execute("SELECT target FROM links WHERE sha256 = ?", (digest,)).fetchone()
+        target = row[0] if row else self._add_link(snap, name, digest, log, fields)
+        entry = db.execute("INSERT INTO entries (name, sha256) VALUES (?, ?)",
+                           (name, digest)).lastrowid
+        db.execute("INSERT INTO entries_fts (rowid, name, target) VALUES (?, ?, ?)",
+                   (entry, name, target or ""))
+        return entry
+
+    def _add(self, snap, log, known):
+        self.db.execute("INSERT INTO snapshots (id, created, pins) VALUES (?, ?, ?)",
+                        (snap.id, snap.created, len(snap.files)))
+        self.db.executemany(
+            "INSERT OR IGNORE INTO pins (snapshot, entry) VALUES (?, ?)",
+            [(snap.id, self._entry(snap, name, entry["sha256"], log, known.get(name)))
+             for name, entry in snap.files.items()])
+
+    def _add_link(self, snap, name, digest, log, fields=None):
+        try:
+            values = fields or link_fields(parse_file(snap.blob_path(name)))
+        except (LnkError, OSError) as e:
+            if log:
+                log(f"Indexed {name} without target: {e}")
+            values = (None, None, None, None)
+        self.db.execute("INSERT INTO links (sha256, target, arguments, working_dir, description) "
+                        "VALUES (?, ?, ?, ?, ?)", (digest,) + values)
+        return values[0]
+
+    def search(self, text, limit=50):
+        """
+        Pins whose name or target contains every word of text (case-insensitive),
+        grouped by (name, target) with the snapshots they appear in. Words of
+        three or more characters go through the trigram index; shorter ones
+        filter the matches with LIKE.
+        """
+        words = text.split()
+        if not words:
+            return []
+        match = _fts_query(text)
+        short = [w for w in words if len(w) < 3]
+        where = []
+        params = []
+        if match:
+            where.append("entries.id IN (SELECT rowid FROM entries_fts WHERE entries_fts MATCH ?)")
+            params.append(match)
+        for w in short:
+            where.append("(entries.name LIKE ? ESCAPE '\\' "
+                         "OR COALESCE(links.target, '') LIKE ? ESCAPE '\\')")
+            params += [_like(w), _like(w)]
+        # The newest snapshot per entry comes from the (entry, snapshot) index,
+        # so only the entries that make the cut have their full history read.
+        # Plain MAX() finds the newest second; the counter is only compared
+        # among the snapshots of that second
+        rows = self.db.execute(
+            "SELECT entries.id, entries.name, links.target, "
+            f"(SELECT MAX({SNAPSHOT_ORDER.format('snapshot')}) FROM pins "
+            "WHERE entry = entries.id AND snapshot >= (SELECT substr(MAX(snapshot), 1, 15) "
+            "FROM pins WHERE entry = entries.id)) AS last "
+            "FROM entries JOIN links ON links.sha256 = entries.sha256 "
+            f"WHERE {' AND '.join(where)} AND last IS NOT NULL "
+            "ORDER BY last DESC, entries.name LIMIT ?", params + [limit]).fetchall()
+
+        # Several blobs can share a name and target (e.g. a re-saved shortcut)
+        hits = {}
+        for entry, name, target, _ in rows:
+            hit = hits.setdefault((name, target), SearchHit(name, target, []))
+            hit.snapshots.extend(r[0] for r in self.db.execute(
+                "SELECT snapshot FROM pins WHERE entry = ?", (entry,)))
+        for hit in hits.values():
+            hit.snapshots.sort(key=id_order)
+        return list(hits.values())
+
+
+def index_for(backup_dir):
+    """Pin index kept inside a backup folder."""
+    return PinIndex(Path(backup_dir) / INDEX_NAME)
@@ -0,0 +1,211 @@
+"""
+Screenshot encoding off the UI thread, with a choice of codec and effort.
+
+Pillow is only needed by the functions that touch images and is imported by
+the caller (ImageGrab) or by Image.save() itself, so importing this module
+stays cheap and works without it.
+
+A grabbed frame starts encoding into a temporary file straight away, while
+the user is still choosing where to save it (PendingScreenshot). The raw
+frame, which can be hundreds of MB on a multi-monitor 4K desk, is released
+as soon as it is encoded instead of being held for as long as the dialog is
+open.
+"""
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+
+class Codec:
+    def __init__(self, name, label, pil_format, suffixes, levels, default_level):
+        self.name = name
+        self.label = label
+        self.pil_format = pil_format
+        self.suffixes = suffixes          # the first one is used for new files
+        self.levels = levels              # range of valid effort levels
+        self.default_level = default_level
+
+    @property
+    def extension(self):
+        return self.suffixes[0]
+
+
+# level is zlib compress_level for PNG, the lossless method (effort) for WebP
+# and the quality for JPEG
+CODECS = {
+    "png": Codec("png", "PNG Image", "PNG", (".png",), range(0, 10), 6),
+    "webp": Codec("webp", "WebP Image (lossless)", "WEBP", (".webp",), range(0, 7), 4),
+    "jpeg": Codec("jpeg", "JPEG Image", "JPEG", (".jpg", ".jpeg"), range(1, 96), 90),
+}
+
+
+class EncodeOptions:
+    """
+    Codec, effort level and optimize flag for one screenshot. optimize adds
+    Pillow's extra pass for PNG and JPEG and the slowest setting for WebP.
+    """
+
+    def __init__(self, codec="png", level=None, optimize=False):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec {codec!r}, expected one of {', '.join(CODECS)}")
+        self.codec = CODECS[codec]
+        self.level = self.codec.default_level if level is None else int(level)
+        if self.level not in self.codec.levels:
+            levels = self.codec.levels
+            raise ValueError(f"{codec} level must be {levels.start}-{levels.stop - 1}, not {level}")
+        self.optimize = optimize
+
+    @classmethod
+    def parse(cls, text):
+        """From "png", "png:9", "png:9:optimize", "webp:6" or "jpeg:85"."""
+        parts = text.strip().lower().split(":")
+        optimize = len(parts) > 2 and parts[2] == "optimize"
+        if len(parts) > 2 and not optimize:
+            raise ValueError(f"Unknown encode option {parts[2]!r}")
+        return cls(parts[0], parts[1] if len(parts) > 1 and parts[1] else None, optimize)
+
+    @property
+    def extension(self):
+        return self.codec.extension
+
+    @property
+    def filetypes(self):
+        """For the filetypes argument of tkinter's save dialog."""
+        return [(self.codec.label, " ".join("*" + s for s in self.codec.suffixes))]
+
+    def save_kwargs(self):
+        name = self.codec.name
+        if name == "png":
+            kwargs = {"compress_level": self.level, "optimize": self.optimize}
+        elif name == "webp":
+            kwargs = {"lossless": True, "method": self.level, "quality": 100 if self.optimize else 80}
+        else:
+            kwargs = {"quality": self.level, "optimize": self.optimize}
+        kwargs["format"] = self.codec.pil_format
+        return kwargs
+
+    def __str__(self):
+        return f"{self.codec.name}:{self.level}" + (":optimize" if self.optimize else "")
+
+
+# Offered in the window, fastest first
+PRESETS = {
+    "PNG (fast)": EncodeOptions("png", 1),
+    "PNG": EncodeOptions("png", 6),
+    "PNG (smallest)": EncodeOptions("png", 9, optimize=True),
+    "WebP lossless": EncodeOptions("webp", 4),
+    "JPEG": EncodeOptions("jpeg", 90),
+}
+DEFAULT_PRESET = "PNG"
+
+
+def encode(img, path, options):
+    """
+    Write img to path with options, through a temporary file so a failed
+    encode never leaves a truncated image. Returns the file size.
+    """
+    path = Path(path)
+    if options.codec.name == "jpeg" and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")  # no alpha in JPEG
+    tmp = path.with_name(path.name + ".part")
+    try:
+        img.save(tmp, **options.save_kwargs())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+        raise
+    return path.stat().st_size
+
+
+class PendingScreenshot:
+    """
+    A grabbed frame on its way to a file chosen later. encode() and then
+    save_as() or discard() run on the job worker, in that order.
+
+    link_to names an earlier screenshot that looks the same (see phash):
+    save_as() then hardlinks it instead of writing the new encode, when the
+    volume allows.
+    """
+
+    def __init__(self, img, options, temp_dir=None):
+        self.options = options
+        self.width, self.height = img.size
+        self._img = img
+        fd, tmp = tempfile.mkstemp(prefix="screenshot_", suffix=options.extension, dir=temp_dir)
+        os.close(fd)
+        self.temp_path = Path(tmp)
+        self.size = None
+        self.seconds = None
+        self.error = None
+        self.fingerprint = None
+        self.taskbar = None     # TaskbarReference of its strip, indexed with the hash
+        self.link_to = None
+        self.linked = False
+
+    def encode(self):
+        img, self._img = self._img, None
+        if img is None:
+            return
+        start = time.perf_counter()
+        try:
+            self.size = encode(img, self.temp_path, self.options)
+        except Exception as e:
+            self.error = e
+            self.discard()
+        finally:
+            img.close()  # the raw frame is the big allocation, drop it now
+        self.seconds = time.perf_counter() - start
+
+    def save_as(self, dest):
+        """
+        Move the encoded file to dest, with the codec's extension. Returns the
+        final path; raises the encode error if there was one.
+        """
+        if self.link_to is not None:
+            linked = Path(dest).with_suffix(Path(self.link_to).suffix)
+            try:
+                os.link(self.link_to, linked)
+            except OSError:
+                pass  # other volume, FAT, name taken: save the new encode instead
+            else:
+                self.linked = True
+                self.discard()
+                return linked
+        self.encode()  # no-op unless encode() never ran
+        if self.error is not None:
+            raise self.error
+        dest = Path(dest)
+        if dest.suffix.lower() not in self.options.codec.suffixes:
+            dest = dest.with_name(dest.name + self.options.extension)
+        try:
+            os.replace(self.temp_path, dest)
+        except OSError:
+            # Other volume than the temp folder
+            shutil.move(str(self.temp_path), str(dest))
+        return dest
+
+    def discard(self):
+        if self._img is not None:
+            self._img.close()
+            self._img = None
+        try:
+            self.temp_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def describe(self):
+        if self.linked:
+            return f"linked to {self.link_to}, which looks the same"
+        if self.size is None:
+            size = "?"
+        elif self.size < 2**20:
+            size = f"{self.size / 1024:.0f} KB"
+        else:
+            size = f"{self.size / 2**20:.1f} MB"
+        seconds = f"{self.seconds:.1f} s" if self.seconds is not None else "?"
+        return f"{self.width}x{self.height}, {self.options}, {size}, encoded in {seconds}"
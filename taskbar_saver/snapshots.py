@@ -0,0 +1,283 @@
+import os
+import json
+import stat
+from datetime import datetime
+from pathlib import Path
+
+from taskbar_saver.copy_engine import get_engine
+from taskbar_saver.dirscan import scan
+from taskbar_saver.manifest import file_hash
+
+# Layout under the store root:
+#   blobs/<2 hex>/<sha256>   one file per distinct shortcut content
+#   snapshots/<id>.json      immutable manifest: name -> blob hash + stat
+SNAPSHOT_VERSION = 1
+
+
+def id_order(snap_id):
+    """
+    Sort key of a snapshot id: <time>, then <time>_002 ... for more in the
+    same second. Older stores have the counter unpadded, so _10 must not
+    sort before _2; anything that orders ids goes through this.
+    """
+    base, _, n = snap_id.rpartition("_")
+    if len(n) <= 3 and n.isdigit() and base.count("_") == 1:
+        return base, int(n)
+    return snap_id, 1
+
+
+class Snapshot:
+    def __init__(self, store, snap_id, data):
+        self.store = store
+        self.id = snap_id
+        self.created = data.get("created")
+        self.source = data.get("source")
+        self.files = data.get("files", {})
+        self.fresh = False  # written by the create() call that returned it
+
+    def __repr__(self):
+        return f"<Snapshot {self.id} ({len(self.files)} shortcuts)>"
+
+    def names(self):
+        return sorted(self.files)
+
+    def blob_path(self, name):
+        return self.store.blob_path(self.files[name]["sha256"])
+
+    def read(self, name):
+        with open(self.blob_path(name), "rb") as f:
+            return f.read()
+
+
+class SnapshotStore:
+    """
+    Versioned, content-addressed store for pin backups.
+
+    Every snapshot is a small JSON manifest pointing at blobs keyed by their
+    SHA-256, so shortcuts that did not change between backups are stored once
+    and never copied again.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.blob_dir = self.root / "blobs"
+        self.snapshot_dir = self.root / "snapshots"
+
+    def blob_path(self, digest):
+        return self.blob_dir / digest[:2] / digest
+
+    def has_blob(self, digest):
+        return self.blob_path(digest).exists()
+
+    def _store_blob(self, engine, src, dst):
+        tmp = dst.with_name(dst.name + ".tmp")
+        used = engine.copy_file(src, tmp)
+        os.replace(tmp, dst)
+        # Blobs are shared between snapshots and must never be edited in place
+        os.chmod(dst, stat.S_IREAD)
+        return used
+
+    # ---- snapshots ---------------------------------------------------------
+
+    def ids(self):
+        """Snapshot ids, oldest first, without reading the manifests."""
+        if not self.snapshot_dir.exists():
+            return []
+        return sorted((p.stem for p in self.snapshot_dir.glob("*.json")), key=id_order)
+
+    def list(self):
+        """Return all snapshots, oldest first."""
+        return [self.open(snap_id) for snap_id in self.ids()]
+
+    def latest(self):
+        ids = self.ids()
+        return self.open(ids[-1]) if ids else None
+
+    def open(self, snap_id):
+        path = self.snapshot_dir / f"{snap_id}.json"
+        if not path.exists():
+            raise KeyError(f"No snapshot named {snap_id}")
+        with open(path, "r", encoding="utf-8") as f:
+            return Snapshot(self, snap_id, json.load(f))
+
+    def _new_id(self):
+        base = datetime.now().strftime("%Y%m%d_%H%M%S")
+        snap_id, n = base, 1
+        while (self.snapshot_dir / f"{snap_id}.json").exists():
+            n += 1
+            snap_id = f"{base}_{n:03d}"
+        return snap_id
+
+    def create(self, source_dir, skip=None, log=None, only_if_changed=True, engine=None, job=None,
+               listing=None, hashes=None):
+        """
+        Snapshot the .lnk files in source_dir (or those of listing, a
+        dirscan.DirListing of it). hashes ({name: {"sha256", "size",
+        "mtime_ns"}}, e.g. SyncResult.manifest) supplies digests the caller
+        already computed for the same files.
+
+        Hashes are reused from the latest snapshot when size and mtime_ns still
+        match (blobs the latest snapshot refers to are taken to be present;
+        verify() checks that), and blobs already in the store are not copied
+        again. With only_if_changed, an identical pin set returns the latest
+        snapshot instead of writing a new one.
+        """
+        source_dir = Path(source_dir)
+        if listing is None:
+            listing = scan(source_dir)
+        previous = self.latest()
+        prev_files = previous.files if previous else {}
+
+        files = {}
+        new_blobs = {}  # digest -> source file
+        folders = set()
+
+        def blobs():
+            # New blobs go to the copy engine as soon as they are hashed
+            for i, entry in enumerate(listing.sorted(), 1):
+                name = entry.name
+                if skip is not None and skip(name):
+                    continue
+                if job is not None:
+                    job.check()
+                    job.progress(i, len(listing))
+                src = Path(entry.path)
+                try:
+                    st = entry.stat()
+                    prev = prev_files.get(name)
+                    known = hashes.get(name) if hashes else None
+                    fresh = False
+                    if (prev and prev["size"] == st.st_size
+                            and prev["mtime_ns"] == st.st_mtime_ns):
+                        # Its blob was stored when the previous snapshot was written
+                        digest = prev["sha256"]
+                    else:
+                        if (known and known["size"] == st.st_size
+                                and known["mtime_ns"] == st.st_mtime_ns):
+                            digest = known["sha256"]
+                        else:
+                            digest = file_hash(src)
+                        if digest not in new_blobs and not self.has_blob(digest):
+                            folder = self.blob_path(digest).parent
+                            if folder not in folders:
+                                folder.mkdir(parents=True, exist_ok=True)
+                                folders.add(folder)
+                            new_blobs[digest] = src
+                            fresh = True
+                    files[name] = {"sha256": digest, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+                except Exception as e:
+                    if log:
+                        log(f"Failed to snapshot {src}: {e}")
+                    continue
+                if fresh:
+                    yield src, self.blob_path(digest)
+
+        engine = engine or get_engine()
+        report = engine.copy_many(
+            blobs(), log=log, copy_func=lambda src, dst: self._store_blob(engine, src, dst),
+            job=job)
+        if report.errors:
+            # A snapshot must never point at a missing blob
+            failed = {src for src, _ in report.errors}
+            files = {name: entry for name, entry in files.items()
+                     if new_blobs.get(entry["sha256"]) not in failed}
+
+        if only_if_changed and previous is not None:
+            # Same pins as the latest snapshot (once failed blobs are left
+            # out): nothing to write
+            if _content(previous.files) == _content(files):
+                return previous
+
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        snap_id = self._new_id()
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "source": str(source_dir),
+            "files": files,
+        }
+        path = self.snapshot_dir / f"{snap_id}.json"
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+
+        if log:
+            msg = f"Snapshot {snap_id}: {len(files)} shortcuts, {len(report)} new blobs"
+            if report.strategies:
+                msg += f" (copied via {report.strategy_summary()})"
+            log(msg + ".")
+        snap = Snapshot(self, snap_id, data)
+        snap.fresh = True
+        return snap
+
+    def restore(self, snap_id, dest_dir, replace=True, log=None, engine=None, link=False, job=None):
+        """
+        Write the shortcuts of a snapshot into dest_dir. With replace, any
+        other .lnk files already in dest_dir are removed (full replace).
+
+        link=True hardlinks the blobs instead of copying them when dest_dir is
+        on the same volume. Only use it for read-only exports: the files share
+        the blob's data and read-only mode. Returns the copy report.
+        """
+        snap = self.open(snap_id) if isinstance(snap_id, str) else snap_id
+        dest_dir = Path(dest_dir)
+        dest_dir.mkdir(parents=True, exist_ok=True)
+
+        if replace:
+            for f in dest_dir.glob("*.lnk"):
+                if f.name in snap.files:
+                    continue
+                try:
+                    f.unlink()
+                except Exception as e:
+                    if log:
+                        log(f"Failed to remove existing shortcut {f}: {e}")
+
+        engine = engine or get_engine()
+        if link:
+            copy_func = lambda blob, dst: engine.copy_file(blob, dst, immutable=True)
+        else:
+            copy_func = lambda blob, dst: _restore_file(engine, blob, dst)
+        report = engine.copy_many(
+            ((snap.blob_path(name), dest_dir / name) for name in snap.names()),
+            log=log, copy_func=copy_func, job=job, total=len(snap.files))
+        if log and report.strategies:
+            log(f"Restored {len(report)} shortcuts (copied via {report.strategy_summary()}).")
+        return report
+
+    def delete(self, snap_id):
+        (self.snapshot_dir / f"{snap_id}.json").unlink()
+
+    def gc(self):
+        """Remove blobs no snapshot refers to. Returns the number removed."""
+        live = set()
+        for snap in self.list():
+            live.update(entry["sha256"] for entry in snap.files.values())
+        removed = 0
+        if not self.blob_dir.exists():
+            return 0
+        for blob in self.blob_dir.glob("*/*"):
+            if blob.name not in live:
+                os.chmod(blob, stat.S_IREAD | stat.S_IWRITE)
+                blob.unlink()
+                removed += 1
+        return removed
+
+
+def _restore_file(engine, blob, dst):
+    # No copystat: the restored shortcut must not inherit the read-only
+    # mode of the blob
+    tmp = dst.with_name(dst.name + ".tmp")
+    used = engine.copy_file(blob, tmp, preserve_stat=False)
+    os.replace(tmp, dst)
+    return used
+
+
+def _content(files):
+    return {name: entry["sha256"] for name, entry in files.items()}
+
+
+def store_for(backup_dir):
+    """Snapshot history kept inside a backup folder."""
+    return SnapshotStore(Path(backup_dir) / "history")
@@ -0,0 +1,299 @@
+"""
+Visual check that the taskbar shows the pins of a snapshot.
+
+When a snapshot is taken with the desktop available, a small reference of
+the taskbar strip is stored next to it (history/taskbar/<id>.json): a
+grayscale thumbnail whose short side is REF_SHORT_SIDE pixels and a 64 bin
+colour histogram, a few KB in all. After a restore, a fresh capture of the
+strip is compared with it:
+
+- SSIM over the thumbnails, computed with box windows from integral images,
+  both as the mean over the strip and as the worst square block along it.
+  A missing, added or moved pin shifts or replaces icons, which pulls at
+  least one block far down even when the mean barely moves.
+- The Hellinger distance between the colour histograms. Its coarse bins
+  make it jumpy under small brightness changes, so it only rejects a
+  capture of something else entirely (a full-screen window, say).
+
+The end of the strip (notification area and clock, TRAY_FRACTION of its
+length) changes by itself and is left out of both; so are pins that reach
+into it on a very full taskbar.
+
+Only taskbar_bbox() and grab_taskbar() need Windows and a desktop session;
+the comparison works on any PIL image and runs anywhere NumPy does. Both make
+the process DPI aware first (set_dpi_awareness()): SHAppBarMessage reports a
+DPI-unaware process scaled coordinates while ImageGrab captures physical
+pixels, so on a scaled display the command line would crop the wrong region
+and never match a reference taken by the window.
+"""
+import base64
+import json
+import os
+import zlib
+from pathlib import Path
+
+REF_SHORT_SIDE = 16            # thumbnail height of a horizontal taskbar, in px
+TRAY_FRACTION = 0.25           # end of the strip (tray, clock) that is not compared
+HIST_LEVELS = 4                # per channel -> 4**3 = 64 bin histogram
+SSIM_WINDOW = 7
+MIN_SSIM = 0.85                # mean over the strip
+MIN_BLOCK_SSIM = 0.85          # worst square block along the strip
+MAX_HISTOGRAM_DISTANCE = 0.35  # loose: only for a capture of something else entirely
+FALLBACK_THICKNESS = 48        # taskbar height assumed when it cannot be located
+REFERENCE_VERSION = 1
+
+_dpi_aware = False
+
+
+# ---- capture ------------------------------------------------------------------
+
+def set_dpi_awareness():
+    """
+    Make the process system DPI aware, once; a no-op off Windows. The window
+    calls it before it is created, everything else here before measuring or
+    grabbing the screen.
+    """
+    global _dpi_aware
+    if _dpi_aware or os.name != "nt":
+        return
+    _dpi_aware = True
+    import ctypes
+    try:
+        ctypes.windll.shcore.SetProcessDpiAwareness(1)
+    except (AttributeError, OSError):
+        try:
+            ctypes.windll.user32.SetProcessDPIAware()  # before Windows 8.1
+        except (AttributeError, OSError):
+            pass
+
+
+def taskbar_bbox():
+    """(left, top, right, bottom) of the Windows taskbar in screen pixels, or None."""
+    if os.name != "nt":
+        return None
+    set_dpi_awareness()
+    import ctypes
+    from ctypes import wintypes
+
+    class APPBARDATA(ctypes.Structure):
+        _fields_ = [("cbSize", wintypes.DWORD), ("hWnd", wintypes.HWND),
+                    ("uCallbackMessage", wintypes.UINT), ("uEdge", wintypes.UINT),
+                    ("rc", wintypes.RECT), ("lParam", wintypes.LPARAM)]
+
+    ABM_GETTASKBARPOS = 5
+    data = APPBARDATA()
+    data.cbSize = ctypes.sizeof(APPBARDATA)
+    try:
+        if not ctypes.windll.shell32.SHAppBarMessage(ABM_GETTASKBARPOS, ctypes.byref(data)):
+            return None
+    except (AttributeError, OSError):
+        return None
+    rc = data.rc
+    if rc.right <= rc.left or rc.bottom <= rc.top:
+        return None  # auto-hidden
+    return rc.left, rc.top, rc.right, rc.bottom
+
+
+def grab_taskbar():
+    """Screenshot of just the taskbar strip (the bottom of the screen if it cannot be found)."""
+    from PIL import ImageGrab
+
+    bbox = taskbar_bbox()  # makes the process DPI aware before grabbing
+    if bbox is not None:
+        return ImageGrab.grab(bbox=bbox, all_screens=True)
+    img = ImageGrab.grab()
+    try:
+        return crop_taskbar(img)
+    finally:
+        img.close()
+
+
+def crop_taskbar(img, bbox=None):
+    """
+    The taskbar strip of a capture of the primary screen: bbox (screen
+    pixels, as from taskbar_bbox()) clipped to img, or its bottom
+    FALLBACK_THICKNESS rows when there is no bbox or it lies off the capture.
+    """
+    if bbox is not None:
+        left, top = max(0, bbox[0]), max(0, bbox[1])
+        right, bottom = min(img.width, bbox[2]), min(img.height, bbox[3])
+        if right > left and bottom > top:
+            return img.crop((left, top, right, bottom))
+    return img.crop((0, max(0, img.height - FALLBACK_THICKNESS), img.width, img.height))
+
+
+# ---- comparison ---------------------------------------------------------------
+
+def pins_area(img):
+    """img without the tray end of the strip (right, or bottom for a vertical taskbar)."""
+    if img.width >= img.height:
+        return img.crop((0, 0, max(1, round(img.width * (1 - TRAY_FRACTION))), img.height))
+    return img.crop((0, 0, img.width, max(1, round(img.height * (1 - TRAY_FRACTION)))))
+
+
+def _thumbnail_size(width, height):
+    if width >= height:
+        return max(1, round(width * REF_SHORT_SIDE / height)), REF_SHORT_SIDE
+    return REF_SHORT_SIDE, max(1, round(height * REF_SHORT_SIDE / width))
+
+
+def _thumbnail(img, size):
+    import numpy as np
+    from PIL import Image
+    small = img.convert("L").resize(size, Image.Resampling.BOX)
+    return np.asarray(small, dtype=np.uint8)
+
+
+def _histogram(img):
+    import numpy as np
+    rgb = np.asarray(img.convert("RGB"), dtype=np.uint8).reshape(-1, 3) // (256 // HIST_LEVELS)
+    bins = (rgb[:, 0].astype(np.intp) * HIST_LEVELS + rgb[:, 1]) * HIST_LEVELS + rgb[:, 2]
+    counts = np.bincount(bins, minlength=HIST_LEVELS ** 3).astype(np.float64)
+    return counts / max(counts.sum(), 1.0)
+
+
+def _box_mean(x, size):
+    # Mean over every size x size window, from an integral image
+    import numpy as np
+    s = np.zeros((x.shape[0] + 1, x.shape[1] + 1))
+    s[1:, 1:] = x.cumsum(0).cumsum(1)
+    return (s[size:, size:] - s[:-size, size:] - s[size:, :-size] + s[:-size, :-size]) / (size * size)
+
+
+def ssim_map(a, b, window=SSIM_WINDOW):
+    """SSIM of every window position of two equally sized grayscale arrays."""
+    import numpy as np
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    window = max(1, min(window, *a.shape))
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    mu_a, mu_b = _box_mean(a, window), _box_mean(b, window)
+    var_a = _box_mean(a * a, window) - mu_a * mu_a
+    var_b = _box_mean(b * b, window) - mu_b * mu_b
+    cov = _box_mean(a * b, window) - mu_a * mu_b
+    return (((2 * mu_a * mu_b + c1) * (2 * cov + c2))
+            / ((mu_a * mu_a + mu_b * mu_b + c1) * (var_a + var_b + c2)))
+
+
+def ssim(a, b, window=SSIM_WINDOW):
+    """Mean SSIM of two equally sized grayscale arrays."""
+    return float(ssim_map(a, b, window).mean())
+
+
+def _worst_block(smap):
+    # Mean SSIM of consecutive square blocks along the strip, lowest one
+    import numpy as np
+    horizontal = smap.shape[1] >= smap.shape[0]
+    profile = smap.mean(axis=0 if horizontal else 1)
+    block = min(len(profile), max(1, smap.shape[0] if horizontal else smap.shape[1]))
+    usable = len(profile) // block * block
+    blocks = profile[:usable].reshape(-1, block).mean(axis=1)
+    if usable < len(profile):
+        blocks = np.append(blocks, profile[usable:].mean())
+    return float(blocks.min())
+
+
+def histogram_distance(h1, h2):
+    """Hellinger distance of two normalised histograms: 0 same, 1 disjoint."""
+    import numpy as np
+    bc = float(np.sqrt(np.asarray(h1) * np.asarray(h2)).sum())
+    return float(np.sqrt(max(0.0, 1.0 - bc)))
+
+
+class TaskbarComparison:
+    def __init__(self, ssim, block_ssim, histogram_distance, same_size):
+        self.ssim = ssim
+        self.block_ssim = block_ssim
+        self.histogram_distance = histogram_distance
+        self.same_size = same_size   # the strip had the same size in pixels
+
+    @property
+    def matches(self):
+        return (self.ssim >= MIN_SSIM and self.block_ssim >= MIN_BLOCK_SSIM
+                and self.histogram_distance <= MAX_HISTOGRAM_DISTANCE)
+
+    def __str__(self):
+        text = (f"SSIM {self.ssim:.3f}, worst block {self.block_ssim:.3f}, "
+                f"colour distance {self.histogram_distance:.3f}")
+        if not self.same_size:
+            text += ", taskbar size changed"
+        return text
+
+
+class TaskbarReference:
+    """Compact fingerprint of a taskbar capture; compare() checks a new one against it."""
+
+    def __init__(self, width, height, thumbnail, histogram):
+        self.width = width          # of the captured strip
+        self.height = height
+        self.thumbnail = thumbnail  # uint8 array, pins area only
+        self.histogram = histogram
+
+    @classmethod
+    def from_image(cls, img):
+        pins = pins_area(img)
+        return cls(img.width, img.height, _thumbnail(pins, _thumbnail_size(*pins.size)),
+                   _histogram(pins))
+
+    def compare(self, img):
+        # The capture is scaled to the reference thumbnail, so a taskbar that
+        # changed size is still compared (same_size reports it)
+        pins = pins_area(img)
+        height, width = self.thumbnail.shape
+        smap = ssim_map(self.thumbnail, _thumbnail(pins, (width, height)))
+        return TaskbarComparison(float(smap.mean()), _worst_block(smap),
+                                 histogram_distance(self.histogram, _histogram(pins)),
+                                 (img.width, img.height) == (self.width, self.height))
+
+    def to_dict(self):
+        height, width = self.thumbnail.shape
+        return {"version": REFERENCE_VERSION, "width": self.width, "height": self.height,
+                "thumbnail": [width, height,
+                              base64.b64encode(zlib.compress(self.thumbnail.tobytes(), 9)).decode()],
+                "histogram": [round(float(v), 6) for v in self.histogram]}
+
+    @classmethod
+    def from_dict(cls, data):
+        import numpy as np
+        width, height, pixels = data["thumbnail"]
+        thumb = np.frombuffer(zlib.decompress(base64.b64decode(pixels)), dtype=np.uint8)
+        return cls(data["width"], data["height"], thumb.reshape(height, width),
+                   np.asarray(data["histogram"], dtype=np.float64))
+
+
+class ReferenceStore:
+    """Taskbar references, one per snapshot id."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def path(self, snap_id):
+        return self.root / f"{snap_id}.json"
+
+    def has(self, snap_id):
+        return self.path(snap_id).exists()
+
+    def load(self, snap_id):
+        """The TaskbarReference of a snapshot, or None."""
+        try:
+            with open(self.path(snap_id), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != REFERENCE_VERSION:
+            return None
+        return TaskbarReference.from_dict(data)
+
+    def save(self, snap_id, ref):
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.path(snap_id)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(ref.to_dict(), f)
+        os.replace(tmp, path)
+
+
+def references_for(backup_dir):
+    """Taskbar references kept with the snapshot history of a backup folder."""
+    from taskbar_saver.snapshots import store_for
+    return ReferenceStore(store_for(backup_dir).root / "taskbar")
@@ -0,0 +1,281 @@
+"""
+Screenshot archive that stores each distinct 64x64 tile once.
+
+Consecutive desktop screenshots share most of their pixels (wallpaper,
+taskbar, windows that did not move), so instead of one image file per frame
+the archive cuts every frame into fixed tiles and only stores the tiles it
+has not seen before. A frame is its tile map: the size and mode of the
+image, the tiles it uses and where they are stored, and which tile goes in
+each grid cell. reconstruct() puts the frame back together pixel for pixel;
+export() writes it as PNG.
+
+Layout under the store root:
+    packs/<frame id>.pack    the tiles first stored by that frame, each one
+                             zlib-compressed after PNG's "Sub" filter
+    frames/<frame id>.json   tile map (immutable once written)
+    tiles.idx                digest -> pack, offset, length of every stored
+                             tile; append-only, one line per tile
+
+Tiles are cut out of the frame with a single NumPy reshape, and filtered and
+unfiltered as whole arrays. They are keyed by a 128-bit BLAKE2b of their
+pixels: the archive is lossless, so a tile is only ever shared with one that
+has exactly the same bytes.
+
+NumPy and Pillow are imported on first use.
+"""
+import hashlib
+import json
+import os
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+TILE_SIZE = 64
+ARCHIVE_VERSION = 1
+COMPRESS_LEVEL = 6
+
+_CHANNELS = {"L": 1, "RGB": 3, "RGBA": 4}
+
+
+def _tiles(img, size):
+    """(array of shape (count, size, size, channels), rows, cols) of img."""
+    import numpy as np
+
+    if img.mode not in _CHANNELS:
+        img = img.convert("RGB")
+    arr = np.asarray(img)
+    if arr.ndim == 2:
+        arr = arr[:, :, None]
+    height, width, channels = arr.shape
+    rows, cols = -(-height // size), -(-width // size)
+    if (rows * size, cols * size) != (height, width):
+        # Edge tiles are padded with black; reconstruct() crops it off
+        padded = np.zeros((rows * size, cols * size, channels), dtype=np.uint8)
+        padded[:height, :width] = arr
+        arr = padded
+    tiles = arr.reshape(rows, size, cols, size, channels).swapaxes(1, 2)
+    return np.ascontiguousarray(tiles).reshape(rows * cols, size, size, channels), rows, cols
+
+
+def _filter(tiles):
+    # PNG's Sub filter along each tile row: flat areas and gradients become
+    # runs of small numbers that zlib packs far better than raw pixels
+    out = tiles.copy()
+    out[:, :, 1:] -= tiles[:, :, :-1]
+    return out
+
+
+def _unfilter(filtered):
+    import numpy as np
+    return np.cumsum(filtered, axis=2, dtype=np.uint8)
+
+
+class TileFrame:
+    def __init__(self, store, frame_id, data):
+        self.store = store
+        self.id = frame_id
+        self.created = data.get("created")
+        self.width = data.get("width")
+        self.height = data.get("height")
+        self.mode = data.get("mode")
+        self.tile = data.get("tile", TILE_SIZE)
+        self.tiles = data.get("tiles", [])    # [digest, pack, offset, length] per distinct tile
+        self.grid = data.get("grid", [])      # index into tiles per cell, row by row
+        self.new_tiles = data.get("new_tiles", 0)
+        self.new_bytes = data.get("new_bytes", 0)
+
+    def __repr__(self):
+        return f"<TileFrame {self.id} {self.width}x{self.height} ({len(self.tiles)} tiles)>"
+
+
+class TileStore:
+    """Deduplicating screenshot archive, see the module docstring."""
+
+    def __init__(self, root, tile=TILE_SIZE):
+        self.root = Path(root)
+        self.tile = tile
+        self.pack_dir = self.root / "packs"
+        self.frame_dir = self.root / "frames"
+        self.index_path = self.root / "tiles.idx"
+        self._index = None
+
+    # ---- tile index --------------------------------------------------------
+
+    def _load_index(self):
+        if self._index is None:
+            index = {}
+            try:
+                with open(self.index_path, "r", encoding="ascii") as f:
+                    for line in f:
+                        parts = line.split()
+                        if len(parts) == 4:  # a torn last line is skipped
+                            index[parts[0]] = [parts[1], int(parts[2]), int(parts[3])]
+            except FileNotFoundError:
+                pass
+            self._index = index
+        return self._index
+
+    def tile_count(self):
+        return len(self._load_index())
+
+    # ---- frames ------------------------------------------------------------
+
+    def ids(self):
+        """Frame ids, oldest first."""
+        if not self.frame_dir.exists():
+            return []
+        return sorted(p.stem for p in self.frame_dir.glob("*.json"))
+
+    def list(self):
+        return [self.open(frame_id) for frame_id in self.ids()]
+
+    def open(self, frame_id):
+        path = self.frame_dir / f"{frame_id}.json"
+        if not path.exists():
+            raise KeyError(f"No archived screenshot named {frame_id}")
+        with open(path, "r", encoding="utf-8") as f:
+            return TileFrame(self, frame_id, json.load(f))
+
+    def _new_id(self):
+        base = datetime.now().strftime("%Y%m%d_%H%M%S")
+        frame_id, n = base, 1
+        while (self.frame_dir / f"{frame_id}.json").exists():
+            n += 1
+            frame_id = f"{base}_{n:03d}"  # sorts in order, as ids() needs
+        return frame_id
+
+    def add(self, img):
+        """Archive a PIL image. Returns its TileFrame."""
+        index = self._load_index()
+        tiles, rows, cols = _tiles(img, self.tile)
+        frame_id = self._new_id()
+
+        distinct = {}   # digest -> position in the frame's tile list
+        grid = []
+        new = []        # (digest, tile number) of tiles stored by this frame
+        for i in range(len(tiles)):
+            digest = hashlib.blake2b(tiles[i], digest_size=16).hexdigest()
+            pos = distinct.get(digest)
+            if pos is None:
+                pos = distinct[digest] = len(distinct)
+                if digest not in index:
+                    new.append((digest, i))
+            grid.append(pos)
+
+        locations = {}
+        pack_size = 0
+        if new:
+            self.pack_dir.mkdir(parents=True, exist_ok=True)
+            filtered = _filter(tiles[[i for _, i in new]])
+            pack = self.pack_dir / f"{frame_id}.pack"
+            tmp = pack.with_suffix(".tmp")
+            with open(tmp, "wb") as f:
+                for (digest, _), tile in zip(new, filtered):
+                    data = zlib.compress(tile.tobytes(), COMPRESS_LEVEL)
+                    locations[digest] = [frame_id, pack_size, len(data)]
+                    f.write(data)
+                    pack_size += len(data)
+            os.replace(tmp, pack)
+
+        data = {
+            "version": ARCHIVE_VERSION,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "width": img.width,
+            "height": img.height,
+            "mode": img.mode if img.mode in _CHANNELS else "RGB",
+            "tile": self.tile,
+            "tiles": [[digest] + (locations.get(digest) or index[digest]) for digest in distinct],
+            "grid": grid,
+            "new_tiles": len(new),
+            "new_bytes": pack_size,
+        }
+        self.frame_dir.mkdir(parents=True, exist_ok=True)
+        path = self.frame_dir / f"{frame_id}.json"
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+        # Last: a frame whose tiles did not make it into the index only means
+        # the next frame stores them again
+        if locations:
+            with open(self.index_path, "a", encoding="ascii") as f:
+                f.writelines(f"{d} {p} {o} {n}\n" for d, (p, o, n) in locations.items())
+            index.update(locations)
+        return TileFrame(self, frame_id, data)
+
+    def reconstruct(self, frame_id):
+        """The archived frame as a PIL image, identical to the one added."""
+        import numpy as np
+        from PIL import Image
+
+        frame = self.open(frame_id) if isinstance(frame_id, str) else frame_id
+        size, channels = frame.tile, _CHANNELS[frame.mode]
+        decoded = np.empty((len(frame.tiles), size, size, channels), dtype=np.uint8)
+        by_pack = {}
+        for pos, (_, pack, offset, length) in enumerate(frame.tiles):
+            by_pack.setdefault(pack, []).append((offset, length, pos))
+        for pack, entries in by_pack.items():
+            with open(self.pack_dir / f"{pack}.pack", "rb") as f:
+                for offset, length, pos in sorted(entries):
+                    f.seek(offset)
+                    raw = zlib.decompress(f.read(length))
+                    decoded[pos] = np.frombuffer(raw, dtype=np.uint8).reshape(size, size, channels)
+        cells = _unfilter(decoded)[np.asarray(frame.grid, dtype=np.intp)]
+        rows, cols = -(-frame.height // size), -(-frame.width // size)
+        arr = cells.reshape(rows, cols, size, size, channels).swapaxes(1, 2)
+        arr = arr.reshape(rows * size, cols * size, channels)[:frame.height, :frame.width]
+        if channels == 1:
+            arr = arr[:, :, 0]
+        return Image.fromarray(np.ascontiguousarray(arr))
+
+    def export(self, frame_id, path, options=None):
+        """Write an archived frame to path (PNG unless options says otherwise)."""
+        from taskbar_saver.screenshots import EncodeOptions, encode
+
+        img = self.reconstruct(frame_id)
+        try:
+            return encode(img, path, options or EncodeOptions("png"))
+        finally:
+            img.close()
+
+    def delete(self, frame_id):
+        (self.frame_dir / f"{frame_id}.json").unlink()
+
+    def disk_usage(self):
+        """Bytes used by packs, tile maps and the index."""
+        total = 0
+        for folder in (self.pack_dir, self.frame_dir):
+            if folder.exists():
+                total += sum(p.stat().st_size for p in folder.iterdir())
+        if self.index_path.exists():
+            total += self.index_path.stat().st_size
+        return total
+
+    def gc(self):
+        """
+        Remove packs no frame uses any more and rewrite the index without
+        their tiles. Returns the number of packs removed.
+        """
+        live = set()
+        for frame in self.list():
+            live.update(pack for _, pack, _, _ in frame.tiles)
+        index = {digest: loc for digest, loc in self._load_index().items() if loc[0] in live}
+        tmp = self.index_path.with_suffix(".tmp")
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(tmp, "w", encoding="ascii") as f:
+            f.writelines(f"{d} {p} {o} {n}\n" for d, (p, o, n) in index.items())
+        os.replace(tmp, self.index_path)
+        self._index = index
+        removed = 0
+        if self.pack_dir.exists():
+            for pack in self.pack_dir.glob("*.pack"):
+                if pack.stem not in live:
+                    pack.unlink()
+                    removed += 1
+        return removed
+
+
+def tile_store_for(backup_dir):
+    """Screenshot archive kept inside a backup folder."""
+    return TileStore(Path(backup_dir) / "screenshot_archive")
@@ -0,0 +1,308 @@
+"""
+Interval screenshots of the last few minutes, kept in memory until needed.
+
+TimelapseRecorder grabs a frame every `interval` seconds on a background
+thread and keeps the last `capacity` frames that differ from the one before
+in a FrameRing. When something goes wrong (a pin disappears, say), flush()
+writes them out in one batch, so what the desktop and taskbar looked like
+just before can be looked at afterwards.
+
+Memory stays flat however long it records: the ring is a single NumPy array
+of capacity + 1 frames allocated up front. Every grab is copied into the
+spare slot and, if it differs from the latest kept frame, the slot joins
+the ring and the oldest frame's slot becomes the spare; otherwise the next
+grab simply overwrites it. Frame differencing works on a strided view of
+both frames (every DIFF_STRIDE-th pixel) with preallocated scratch arrays.
+Frames are shrunk by `reduce` (2 = half width and height) before they are
+stored; the ring takes capacity x width x height x 3 / reduce**2 bytes.
+
+Frames come from a backend, an object with name, grab() -> PIL image and
+close(), so the recorder can be fed anything: make_backend() has the whole
+desktop ("desktop"), just the taskbar ("taskbar") and a list or iterator of
+ready-made frames ("frames", for benchmarks and tests).
+
+NumPy and Pillow are imported on first use.
+"""
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+RING_FRAMES = 20        # frames kept in memory
+INTERVAL = 5.0          # seconds between grabs
+REDUCE = 2              # frames are stored at 1/REDUCE of the screen's width and height
+DIFF_STRIDE = 2         # differencing looks at every DIFF_STRIDE-th row and column
+PIXEL_TOLERANCE = 8     # per channel, so dithering and cursor blink do not count
+MIN_CHANGED = 16        # sampled pixels that must change for a frame to be kept
+FLUSH_WORKERS = 4
+
+
+# ---- capture backends ---------------------------------------------------------
+
+class DesktopBackend:
+    name = "desktop"
+
+    def __init__(self, bbox=None):
+        from PIL import ImageGrab
+        self._grab = ImageGrab.grab
+        self.bbox = bbox
+
+    def grab(self):
+        return self._grab(bbox=self.bbox, all_screens=self.bbox is not None)
+
+    def close(self):
+        pass
+
+
+class TaskbarBackend:
+    name = "taskbar"
+
+    def grab(self):
+        from taskbar_saver.taskbar_check import grab_taskbar
+        return grab_taskbar()
+
+    def close(self):
+        pass
+
+
+class FrameBackend:
+    """Hands out ready-made frames (PIL images), then raises StopIteration."""
+    name = "frames"
+
+    def __init__(self, frames):
+        self._frames = iter(frames)
+
+    def grab(self):
+        return next(self._frames)
+
+    def close(self):
+        pass
+
+
+def make_backend(backend="desktop", frames=None):
+    if backend == "desktop":
+        return DesktopBackend()
+    if backend == "taskbar":
+        return TaskbarBackend()
+    if backend == "frames":
+        return FrameBackend(frames)
+    raise ValueError(f"Unknown capture backend {backend!r}")
+
+
+# ---- ring buffer --------------------------------------------------------------
+
+class FrameRing:
+    """The last `capacity` kept frames, in one preallocated array."""
+
+    def __init__(self, capacity, height, width, channels=3):
+        import numpy as np
+        self.capacity = capacity
+        self.shape = (height, width, channels)
+        # One spare slot for the frame being grabbed, so dropping it never
+        # costs a kept frame
+        self.slots = np.empty((capacity + 1,) + self.shape, dtype=np.uint8)
+        self.times = [None] * (capacity + 1)
+        self.order = []             # slot numbers, oldest first
+        self.spare = capacity
+        sample = self.slots[0, ::DIFF_STRIDE, ::DIFF_STRIDE].shape
+        self._high = np.empty(sample, dtype=np.uint8)
+        self._low = np.empty(sample, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.order)
+
+    def staging(self):
+        """The spare slot, to copy the next frame into."""
+        return self.slots[self.spare]
+
+    def latest(self):
+        return self.slots[self.order[-1]] if self.order else None
+
+    def changed(self):
+        """Whether the staged frame differs from the latest kept one."""
+        import numpy as np
+        latest = self.latest()
+        if latest is None:
+            return True
+        a = self.staging()[::DIFF_STRIDE, ::DIFF_STRIDE]
+        b = latest[::DIFF_STRIDE, ::DIFF_STRIDE]
+        # |a - b| in uint8 without a wider temporary
+        np.maximum(a, b, out=self._high)
+        np.minimum(a, b, out=self._low)
+        np.subtract(self._high, self._low, out=self._high)
+        return np.count_nonzero((self._high > PIXEL_TOLERANCE).any(axis=2)) >= MIN_CHANGED
+
+    def commit(self, taken):
+        """Keep the staged frame; the oldest one makes room when the ring is full."""
+        self.times[self.spare] = taken
+        self.order.append(self.spare)
+        if len(self.order) > self.capacity:
+            self.spare = self.order.pop(0)
+        else:
+            self.spare = next(i for i in range(self.capacity + 1)
+                              if i not in self.order)
+
+    def frames(self):
+        """[(taken, array)] oldest first; the arrays are views into the ring."""
+        return [(self.times[i], self.slots[i]) for i in self.order]
+
+    def clear(self):
+        self.order = []
+        self.spare = self.capacity
+
+
+# ---- recorder -----------------------------------------------------------------
+
+class TimelapseRecorder:
+    """
+    Grabs a frame from backend every `interval` seconds on a background
+    thread (or on each call of capture()) and keeps the ones that changed.
+    """
+
+    def __init__(self, backend="desktop", capacity=RING_FRAMES, interval=INTERVAL,
+                 reduce=REDUCE, on_error=None):
+        self.backend = make_backend(backend) if isinstance(backend, str) else backend
+        self.capacity = capacity
+        self.interval = interval
+        self.reduce = reduce
+        self.on_error = on_error
+        self.ring = None
+        self.grabbed = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def __len__(self):
+        return len(self.ring) if self.ring is not None else 0
+
+    def capture(self, taken=None):
+        """Grab one frame. Returns True if it was kept, False if it was unchanged."""
+        import numpy as np
+
+        img = self.backend.grab()
+        taken = time.time() if taken is None else taken
+        try:
+            if self.reduce > 1:
+                small = img.reduce(self.reduce)
+                img.close()
+                img = small
+            if img.mode != "RGB":
+                rgb = img.convert("RGB")
+                img.close()
+                img = rgb
+            with self._lock:
+                height, width = img.height, img.width
+                if self.ring is None or self.ring.shape[:2] != (height, width):
+                    # First frame, or the screen resolution changed: frames of
+                    # the old size are dropped with the old ring
+                    self.ring = FrameRing(self.capacity, height, width)
+                np.copyto(self.ring.staging(), np.asarray(img))
+                self.grabbed += 1
+                if not self.ring.changed():
+                    self.dropped += 1
+                    return False
+                self.ring.commit(taken)
+                return True
+        finally:
+            img.close()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="timelapse", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        self.backend.close()
+
+    def _run(self):
+        next_at = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                self.capture()
+            except StopIteration:
+                break  # a frame backend ran out
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(e)
+                else:
+                    traceback.print_exc()
+            # Fixed rate: a slow grab does not push every later one back
+            next_at += self.interval
+            self._stop.wait(max(0.0, next_at - time.monotonic()))
+
+    def snapshot(self):
+        """Copies of the kept frames as [(taken, PIL image)], oldest first."""
+        from PIL import Image
+        with self._lock:
+            if self.ring is None:
+                return []
+            return [(taken, Image.fromarray(arr.copy())) for taken, arr in self.ring.frames()]
+
+    def flush(self, folder, options=None, clear=False):
+        """
+        Write the kept frames to folder as frame_<time>.png (or as options
+        says), encoded in parallel. Returns the paths, oldest first.
+        """
+        from taskbar_saver.screenshots import EncodeOptions, encode
+
+        options = options or EncodeOptions("png", 1)
+        folder = Path(folder)
+        frames = self.snapshot()
+        if clear:
+            self.clear()
+        if not frames:
+            return []
+        folder.mkdir(parents=True, exist_ok=True)
+        paths = [folder / (f"frame_{datetime.fromtimestamp(taken):%Y%m%d_%H%M%S_%f}"[:-3]
+                           + options.extension) for taken, _ in frames]
+
+        def write(job):
+            (_, img), path = job
+            try:
+                encode(img, path, options)
+            finally:
+                img.close()
+
+        # Pillow releases the GIL while encoding
+        with ThreadPoolExecutor(max_workers=min(FLUSH_WORKERS, len(frames))) as pool:
+            list(pool.map(write, zip(frames, paths)))
+        return paths
+
+    def flush_to_store(self, store, clear=False):
+        """Add the kept frames to a tile_store.TileStore. Returns the frame ids."""
+        frames = self.snapshot()
+        if clear:
+            self.clear()
+        ids = []
+        for _, img in frames:
+            try:
+                ids.append(store.add(img).id)
+            finally:
+                img.close()
+        return ids
+
+    def clear(self):
+        with self._lock:
+            if self.ring is not None:
+                self.ring.clear()
+
+
+def timelapse_dir_for(backup_dir):
+    """Folder for a flush of the timelapse, named after the current time."""
+    return Path(backup_dir) / "timelapse" / datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -0,0 +1,234 @@
+"""
+Check that the targets of backed-up pins still exist before they are restored.
+
+Every target is stat()ed on a pool of daemon threads. Targets are grouped by
+volume (drive letter or \\\\server\\share) and each volume root is checked
+first, so one dead share costs a single timeout instead of one per pin. A
+check that takes longer than the timeout is reported as unreachable and left
+running in the background; os.stat() on a hung network path cannot be
+interrupted, and daemon threads never hold up the program's exit.
+"""
+import os
+import errno
+import ntpath
+import queue
+import threading
+import time
+from pathlib import Path
+
+from taskbar_saver.lnk import LnkError, parse_file
+
+OK = "ok"
+MISSING = "missing"
+UNREACHABLE = "unreachable"  # the volume or share cannot be reached
+UNCHECKED = "unchecked"      # unreadable shortcut or no file system target
+
+DEFAULT_TIMEOUT = 2.0
+DEFAULT_WORKERS = 16
+
+# Errors that mean the volume, not the file, is the problem
+_VOLUME_ERRNOS = {errno.ENODEV, errno.ENXIO, errno.EIO, errno.ETIMEDOUT,
+                  errno.EHOSTUNREACH, errno.ENETUNREACH, errno.ESTALE}
+# ERROR_NOT_READY, ERROR_BAD_NETPATH, ERROR_NETNAME_DELETED, ERROR_BAD_NET_NAME,
+# ERROR_NO_NET_OR_BAD_PATH, ERROR_NO_NETWORK
+_VOLUME_WINERRORS = {21, 53, 64, 67, 1222, 1231}
+
+_TIMED_OUT = object()
+
+
+class PinCheck:
+    def __init__(self, name, target, status, detail="", link=None):
+        self.name = name
+        self.target = target
+        self.status = status
+        self.detail = detail
+        self.link = link
+
+    def __repr__(self):
+        return f"<PinCheck {self.name!r} {self.status} {self.target!r}>"
+
+
+class ValidationReport:
+    def __init__(self):
+        self.checks = []
+        self.elapsed = 0.0
+
+    def by_status(self, status):
+        return [c for c in self.checks if c.status == status]
+
+    @property
+    def broken(self):
+        return [c for c in self.checks if c.status in (MISSING, UNREACHABLE)]
+
+    @property
+    def ok(self):
+        return not self.broken
+
+    def summary(self):
+        counts = {s: len(self.by_status(s)) for s in (OK, MISSING, UNREACHABLE, UNCHECKED)}
+        return ", ".join(f"{n} {s}" for s, n in counts.items() if n) or "no pins"
+
+
+def volume_root(target):
+    """
+    'C:\\' or '\\\\server\\share\\' for a Windows path, '/' for an absolute
+    path off Windows, None otherwise.
+    """
+    drive = ntpath.splitdrive(target)[0]
+    if drive:
+        return drive + "\\"
+    if os.name != "nt" and target.startswith("/"):
+        return "/"
+    return None
+
+
+def _is_volume_error(e):
+    return getattr(e, "winerror", None) in _VOLUME_WINERRORS or e.errno in _VOLUME_ERRNOS
+
+
+def _check_root(root):
+    try:
+        os.stat(root)
+    except FileNotFoundError:
+        return UNREACHABLE, "volume not found"
+    except PermissionError:
+        return OK, ""
+    except (OSError, ValueError) as e:
+        return UNREACHABLE, getattr(e, "strerror", None) or str(e)
+    return OK, ""
+
+
+def _check_target(target):
+    try:
+        os.stat(target)
+    except (FileNotFoundError, NotADirectoryError):
+        return MISSING, "target not found"
+    except PermissionError:
+        return OK, "exists (access denied)"
+    except OSError as e:
+        if _is_volume_error(e):
+            return UNREACHABLE, e.strerror or str(e)
+        return MISSING, e.strerror or str(e)
+    except ValueError:
+        # Embedded NUL from a damaged shortcut
+        return MISSING, "invalid path"
+    return OK, ""
+
+
+def run_checks(func, items, timeout=DEFAULT_TIMEOUT, workers=DEFAULT_WORKERS):
+    """
+    {item: func(item)} computed on daemon threads. An item whose call has been
+    running for longer than timeout maps to _TIMED_OUT, and a fresh worker takes
+    over the stuck one's place so the rest of the queue keeps moving.
+    """
+    items = list(dict.fromkeys(items))
+    results = {}
+    if not items:
+        return results
+    pending = queue.SimpleQueue()
+    for item in items:
+        pending.put(item)
+    started = {}  # item -> monotonic start, while running
+    cond = threading.Condition()
+
+    def worker():
+        while True:
+            try:
+                item = pending.get_nowait()
+            except queue.Empty:
+                return
+            with cond:
+                started[item] = time.monotonic()
+            value = func(item)
+            with cond:
+                started.pop(item, None)
+                results.setdefault(item, value)
+                cond.notify()
+
+    def spawn():
+        threading.Thread(target=worker, name="pin-check", daemon=True).start()
+
+    for _ in range(min(workers, len(items))):
+        spawn()
+
+    with cond:
+        while len(results) < len(items):
+            now = time.monotonic()
+            for item, start in list(started.items()):
+                if now - start >= timeout:
+                    del started[item]
+                    results[item] = _TIMED_OUT
+                    spawn()
+            if len(results) >= len(items):
+                break
+            deadlines = [start + timeout for start in started.values()]
+            wait = min(deadlines) - now if deadlines else 0.05
+            cond.wait(max(wait, 0.001))
+    return results
+
+
+def _expand(target):
+    # env_target keeps %VARIABLES%; expand them for the current user
+    return os.path.expandvars(target) if "%" in target else target
+
+
+def validate_links(links, timeout=DEFAULT_TIMEOUT, workers=DEFAULT_WORKERS):
+    """
+    Classify [(name, ShellLink or None)] by whether each target exists.
+    Returns a ValidationReport with one PinCheck per pin, in input order.
+    """
+    start = time.perf_counter()
+    report = ValidationReport()
+    targets = {}
+    for name, link in links:
+        target = link.target if link is not None else None
+        targets[name] = _expand(target) if target else None
+
+    roots = {t: volume_root(t) for t in targets.values() if t}
+    root_status = run_checks(_check_root, [r for r in roots.values() if r],
+                             timeout=timeout, workers=workers)
+    reachable = [t for t, r in roots.items() if r and root_status[r] is not _TIMED_OUT
+                 and root_status[r][0] == OK]
+    target_status = run_checks(_check_target, reachable, timeout=timeout, workers=workers)
+
+    for name, link in links:
+        target = targets[name]
+        if link is None:
+            check = PinCheck(name, None, UNCHECKED, "shortcut could not be read")
+        elif not target:
+            check = PinCheck(name, None, UNCHECKED, "no file system target")
+        elif roots[target] is None:
+            check = PinCheck(name, target, UNCHECKED, "not a drive or network path")
+        else:
+            root = roots[target]
+            status = root_status[root]
+            if status is _TIMED_OUT:
+                status = (UNREACHABLE, f"{root} did not answer within {timeout:g}s")
+            elif status[0] == OK:
+                status = target_status[target]
+                if status is _TIMED_OUT:
+                    status = (UNREACHABLE, f"no answer within {timeout:g}s")
+            check = PinCheck(name, target, *status)
+        check.link = link
+        report.checks.append(check)
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def _parse_or_none(path):
+    try:
+        return parse_file(path)
+    except (LnkError, OSError):
+        return None
+
+
+def validate_folder(folder, timeout=DEFAULT_TIMEOUT, workers=DEFAULT_WORKERS):
+    """Validate the .lnk files in a folder (e.g. the backup mirror)."""
+    links = [(p.name, _parse_or_none(p)) for p in sorted(Path(folder).glob("*.lnk"))]
+    return validate_links(links, timeout=timeout, workers=workers)
+
+
+def validate_snapshot(snap, timeout=DEFAULT_TIMEOUT, workers=DEFAULT_WORKERS):
+    """Validate the shortcuts stored in a snapshot."""
+    links = [(name, _parse_or_none(snap.blob_path(name))) for name in snap.names()]
+    return validate_links(links, timeout=timeout, workers=workers)
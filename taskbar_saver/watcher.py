@@ -0,0 +1,212 @@
+import os
+import sys
+import time
+import select
+import threading
+import traceback
+import ctypes
+import ctypes.util
+from pathlib import Path
+
+DEBOUNCE = 2.0       # quiet seconds required after the last change
+MAX_DELAY = 30.0     # never postpone a backup longer than this during a storm
+POLL_INTERVAL = 2.0  # fallback poll period
+WAKE_INTERVAL = 1.0  # how often blocking backends check for stop()
+
+
+def dir_signature(path):
+    """Cheap fingerprint of a folder: (name, size, mtime_ns) of every entry."""
+    try:
+        with os.scandir(path) as it:
+            return frozenset((e.name, st.st_size, st.st_mtime_ns)
+                             for e in it for st in (e.stat(),))
+    except OSError:
+        return None
+
+
+class PollBackend:
+    name = "poll"
+
+    def __init__(self, path, stop, interval=POLL_INTERVAL):
+        self.path = path
+        self.stop = stop
+        self.interval = interval
+        self.last = dir_signature(path)
+
+    def wait(self, timeout):
+        # Sleeps on the stop event, so stop() interrupts it immediately
+        if self.stop.wait(min(timeout, self.interval)):
+            return False
+        sig = dir_signature(self.path)
+        if sig != self.last:
+            self.last = sig
+            return True
+        return False
+
+    def close(self):
+        pass
+
+
+class InotifyBackend:
+    name = "inotify"
+
+    IN_MODIFY = 0x002
+    IN_ATTRIB = 0x004
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_DELETE_SELF = 0x400
+    IN_MOVE_SELF = 0x800
+    MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+            | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+    def __init__(self, path, stop):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), self.MASK) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f"inotify_add_watch failed for {path}")
+
+    def wait(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        # Drain every queued event; only "something changed" matters
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class WindowsBackend:
+    name = "win32"
+
+    FILE_NOTIFY_CHANGE_FILE_NAME = 0x01
+    FILE_NOTIFY_CHANGE_SIZE = 0x08
+    FILE_NOTIFY_CHANGE_LAST_WRITE = 0x10
+    WAIT_OBJECT_0 = 0
+    INVALID_HANDLE_VALUE = ctypes.c_void_p(-1).value
+
+    def __init__(self, path, stop):
+        self.k32 = ctypes.windll.kernel32
+        self.k32.FindFirstChangeNotificationW.restype = ctypes.c_void_p
+        self.handle = self.k32.FindFirstChangeNotificationW(
+            str(path), False,
+            self.FILE_NOTIFY_CHANGE_FILE_NAME | self.FILE_NOTIFY_CHANGE_SIZE
+            | self.FILE_NOTIFY_CHANGE_LAST_WRITE)
+        if not self.handle or self.handle == self.INVALID_HANDLE_VALUE:
+            raise OSError(f"FindFirstChangeNotification failed for {path}")
+
+    def wait(self, timeout):
+        handle = ctypes.c_void_p(self.handle)
+        if self.k32.WaitForSingleObject(handle, int(timeout * 1000)) != self.WAIT_OBJECT_0:
+            return False
+        self.k32.FindNextChangeNotification(handle)
+        return True
+
+    def close(self):
+        self.k32.FindCloseChangeNotification(ctypes.c_void_p(self.handle))
+
+
+def make_backend(path, stop, backend="auto", poll_interval=POLL_INTERVAL):
+    if backend == "auto":
+        if sys.platform == "win32":
+            candidates = [WindowsBackend]
+        elif sys.platform.startswith("linux"):
+            candidates = [InotifyBackend]
+        else:
+            candidates = []
+    elif backend == "poll":
+        candidates = []
+    else:
+        candidates = [{"inotify": InotifyBackend, "win32": WindowsBackend}[backend]]
+
+    for cls in candidates:
+        try:
+            return cls(path, stop)
+        except (OSError, AttributeError):
+            continue
+    return PollBackend(path, stop, poll_interval)
+
+
+class DirectoryWatcher:
+    """
+    Calls callback() on a background thread after TASKBAR_DIR (or any folder)
+    changes and then stays quiet for `debounce` seconds.
+
+    Uses FindFirstChangeNotification on Windows and inotify on Linux, so an
+    idle watcher just blocks in the kernel. Other platforms, or
+    folders the OS refuses to watch, fall back to a scandir signature poll.
+    """
+
+    def __init__(self, path, callback, debounce=DEBOUNCE, max_delay=MAX_DELAY,
+                 backend="auto", poll_interval=POLL_INTERVAL):
+        self.path = Path(path)
+        self.callback = callback
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.backend_name = backend
+        self.poll_interval = poll_interval
+        self.backend = None
+        self.triggers = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self.backend = make_backend(self.path, self._stop, self.backend_name, self.poll_interval)
+        self._thread = threading.Thread(target=self._run, name="watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        backend = self.backend
+        try:
+            idle_wait = max(WAKE_INTERVAL, getattr(backend, "interval", 0))
+            while not self._stop.is_set():
+                if not backend.wait(idle_wait):
+                    continue
+
+                # Debounce: wait for the burst to settle, bounded by max_delay.
+                # Quiet is measured against the clock, not one wait(): the
+                # poll backend returns after its interval, changed or not
+                first = time.monotonic()
+                quiet_until = first + self.debounce
+                while not self._stop.is_set():
+                    now = time.monotonic()
+                    deadline = min(quiet_until, first + self.max_delay)
+                    if now >= deadline:
+                        break
+                    if backend.wait(deadline - now):
+                        quiet_until = time.monotonic() + self.debounce
+                if self._stop.is_set():
+                    break
+
+                self.triggers += 1
+                try:
+                    self.callback()
+                except Exception:
+                    traceback.print_exc()
+        finally:
+            backend.close()